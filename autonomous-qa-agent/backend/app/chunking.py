@@ -0,0 +1,157 @@
+# backend/app/chunking.py
+
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from .config import CHUNK_SIZE, CHUNK_OVERLAP
+
+MD_HEADING = re.compile(r"^#{1,6}\s", re.MULTILINE)
+BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+class TextSegment(NamedTuple):
+    """A piece of extracted text and where it came from (page, slide, rows, ...)"""
+    text: str
+    provenance: Dict
+
+
+def split_sections(text: str, ext: str) -> List[str]:
+    """
+    Split a document into logical sections before chunking:
+    markdown by heading, json by top-level key, txt by paragraph.
+    """
+    ext = ext.lower()
+
+    if ext == ".md":
+        starts = [m.start() for m in MD_HEADING.finditer(text)]
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+        bounds = starts + [len(text)]
+        sections = [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+    elif ext == ".json":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+
+        if isinstance(data, dict):
+            sections = [json.dumps({k: v}, indent=2) for k, v in data.items()]
+        elif isinstance(data, list):
+            sections = [json.dumps(v, indent=2) for v in data]
+        else:
+            sections = BLANK_LINES.split(text)
+
+    elif ext == ".txt":
+        sections = BLANK_LINES.split(text)
+
+    else:
+        sections = [text]
+
+    return [s.strip() for s in sections if s.strip()]
+
+
+def _split_long(section: str, chunk_size: int, overlap: int) -> Iterator[Tuple[int, str]]:
+    """Slide a window over a section that does not fit in one chunk, yielding (offset, piece)"""
+    step = max(chunk_size - overlap, 1)
+    start = 0
+
+    while start < len(section):
+        end = min(start + chunk_size, len(section))
+
+        # Prefer breaking on whitespace so words are not cut in half
+        if end < len(section):
+            space = section.rfind(" ", start + step, end)
+            if space > start:
+                end = space
+
+        window = section[start:end]
+        yield start + len(window) - len(window.lstrip()), window.strip()
+
+        if end >= len(section):
+            break
+        start = max(end - overlap, start + 1)
+
+
+def _span(first: Dict, last: Dict) -> Dict:
+    """Provenance of a chunk: where its first segment came from, plus *_end keys if it spans more"""
+    span = dict(first)
+    for key, value in last.items():
+        if first.get(key) != value:
+            span[f"{key}_end"] = value
+    return span
+
+
+def _offsets(provenance: Dict, start: int, text: str) -> Dict:
+    return {**provenance, "text_start": start, "text_end": start + len(text)}
+
+
+def chunk_segments(segments: Iterable[TextSegment],
+                   chunk_size: int = CHUNK_SIZE,
+                   overlap: int = CHUNK_OVERLAP) -> Iterator[TextSegment]:
+    """
+    Pack consecutive segments into chunks of at most chunk_size characters.
+    Segments larger than a chunk are split with the given overlap.
+    Consumes the segment stream lazily, so only one chunk is held at a time.
+    Each chunk's provenance also gets text_start/text_end: its offsets in the
+    extracted document text as chunked (stripped segments joined by blank
+    lines), not in the raw file.
+    """
+    buffer = ""
+    first = last = None
+    start = pos = 0
+
+    for text, provenance in segments:
+        text = text.strip()
+        if not text:
+            continue
+        offset = pos
+        pos += len(text) + 2
+
+        if len(text) > chunk_size:
+            if buffer:
+                yield TextSegment(buffer, _offsets(_span(first, last), start, buffer))
+                buffer = ""
+            for piece_offset, piece in _split_long(text, chunk_size, overlap):
+                yield TextSegment(piece, _offsets(provenance, offset + piece_offset, piece))
+            continue
+
+        if buffer and len(buffer) + len(text) + 2 > chunk_size:
+            yield TextSegment(buffer, _offsets(_span(first, last), start, buffer))
+            buffer = ""
+
+        if not buffer:
+            first = provenance
+            start = offset
+        last = provenance
+        buffer = f"{buffer}\n\n{text}" if buffer else text
+
+    if buffer:
+        yield TextSegment(buffer, _offsets(_span(first, last), start, buffer))
+
+
+def chunk_id(filename: str, index: int) -> str:
+    return f"{filename}#chunk-{index}"
+
+
+def iter_segment_chunks(filename: str, segments: Iterable[TextSegment],
+                        chunk_size: int = CHUNK_SIZE,
+                        overlap: int = CHUNK_OVERLAP) -> Iterator[Dict]:
+    """Yield chunks of a streamed document with stable per-chunk ids and provenance metadata"""
+    for i, (chunk, provenance) in enumerate(chunk_segments(segments, chunk_size, overlap)):
+        yield {
+            "id": chunk_id(filename, i),
+            "text": chunk,
+            "metadata": {**provenance, "source": filename, "chunk": i}
+        }
+
+
+def iter_document_chunks(filename: str, text: str,
+                         chunk_size: int = CHUNK_SIZE,
+                         overlap: int = CHUNK_OVERLAP) -> Iterator[Dict]:
+    """Yield chunks of one in-memory document"""
+    sections = split_sections(text, os.path.splitext(filename)[1])
+    segments = (TextSegment(s, {"section": n}) for n, s in enumerate(sections, 1))
+    return iter_segment_chunks(filename, segments, chunk_size, overlap)
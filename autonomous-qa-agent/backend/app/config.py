@@ -0,0 +1,96 @@
+# backend/app/config.py
+
+import os
+
+# Chunking / embedding
+CHUNK_SIZE = int(os.getenv("QA_AGENT_CHUNK_SIZE", "800"))
+CHUNK_OVERLAP = int(os.getenv("QA_AGENT_CHUNK_OVERLAP", "120"))
+EMBED_BATCH_SIZE = int(os.getenv("QA_AGENT_EMBED_BATCH_SIZE", "32"))
+
+# Shared resources
+EMBEDDING_MODEL_NAME = os.getenv("QA_AGENT_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# "torch" (SentenceTransformer) or "onnx" (int8-quantized, onnxruntime on CPU)
+EMBEDDING_BACKEND = os.getenv("QA_AGENT_EMBEDDING_BACKEND", "torch")
+# Names the vectors a model/backend pair produces: query cache keys and the KB manifest
+EMBEDDING_ID = EMBEDDING_MODEL_NAME if EMBEDDING_BACKEND == "torch" else f"{EMBEDDING_MODEL_NAME}:{EMBEDDING_BACKEND}-int8"
+ONNX_MODEL_DIR = os.getenv("QA_AGENT_ONNX_MODEL_DIR",
+                           os.path.join(os.getcwd(), "models", EMBEDDING_MODEL_NAME.replace("/", "--") + "-onnx"))
+ONNX_THREADS = int(os.getenv("QA_AGENT_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+EMBED_MAX_SEQ_LENGTH = int(os.getenv("QA_AGENT_EMBED_MAX_SEQ_LENGTH", "256"))
+CHROMA_DIR = os.getenv("QA_AGENT_VECTOR_STORE", os.path.join(os.getcwd(), "vector_store"))
+COLLECTION_NAME = os.getenv("QA_AGENT_COLLECTION", "docs")
+# "chroma" or "local" (in-process memory-mapped store, see vector_store.py)
+VECTOR_BACKEND = os.getenv("QA_AGENT_VECTOR_BACKEND", "chroma")
+# Each backend keeps its own manifest, so switching backends re-embeds into the new store
+KB_MANIFEST_PATH = os.getenv("QA_AGENT_KB_MANIFEST", os.path.join(
+    CHROMA_DIR, "kb_manifest.json" if VECTOR_BACKEND == "chroma" else f"kb_manifest_{VECTOR_BACKEND}.json"))
+# Local store: switch from exact flat search to an HNSW graph (hnswlib) above this many vectors,
+# and compact once superseded rows make up this fraction of the file (and at least the minimum)
+VECTOR_HNSW_THRESHOLD = int(os.getenv("QA_AGENT_VECTOR_HNSW_THRESHOLD", "20000"))
+VECTOR_COMPACT_RATIO = float(os.getenv("QA_AGENT_VECTOR_COMPACT_RATIO", "0.3"))
+VECTOR_COMPACT_MIN_ROWS = int(os.getenv("QA_AGENT_VECTOR_COMPACT_MIN_ROWS", "256"))
+
+# Hybrid retrieval: a BM25 index over the same chunks, built by /build_kb next to the manifest.
+# Vector and BM25 rankings are merged with reciprocal rank fusion (RRF_K damps the top ranks);
+# prompts of at most LEXICAL_ONLY_MAX_TERMS words that are all exact tokens (codes like SAVE15,
+# element ids, selectors) and indexed skip embedding (0 = always embed)
+LEXICAL_INDEX_PATH = os.getenv("QA_AGENT_LEXICAL_INDEX", os.path.splitext(KB_MANIFEST_PATH)[0] + "_lexical.json")
+BM25_K1 = float(os.getenv("QA_AGENT_BM25_K1", "1.2"))
+BM25_B = float(os.getenv("QA_AGENT_BM25_B", "0.75"))
+RRF_K = int(os.getenv("QA_AGENT_RRF_K", "60"))
+LEXICAL_ONLY_MAX_TERMS = int(os.getenv("QA_AGENT_LEXICAL_ONLY_MAX_TERMS", "3"))
+
+# Context assembly: retrieved chunks are ordered by MMR (MMR_LAMBDA weighs relevance against
+# novelty), chunks at least DEDUP_SIMILARITY cosine-similar to one already picked are dropped,
+# and the context is cut to CONTEXT_TOKEN_BUDGET tokens (estimated at 4 characters per token)
+MMR_LAMBDA = float(os.getenv("QA_AGENT_MMR_LAMBDA", "0.7"))
+DEDUP_SIMILARITY = float(os.getenv("QA_AGENT_DEDUP_SIMILARITY", "0.95"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("QA_AGENT_CONTEXT_TOKEN_BUDGET", "1000"))
+
+# Uploads / extraction
+UPLOAD_CHUNK_SIZE = int(os.getenv("QA_AGENT_UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+EXTRACT_WORKERS = int(os.getenv("QA_AGENT_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+EXTRACT_PROCESSES = int(os.getenv("QA_AGENT_EXTRACT_PROCESSES", str(os.cpu_count() or 1)))
+EXTRACT_TIMEOUT = float(os.getenv("QA_AGENT_EXTRACT_TIMEOUT", "300"))
+
+# Background jobs
+KB_BUILD_WORKERS = int(os.getenv("QA_AGENT_KB_BUILD_WORKERS", "1"))
+JOB_HISTORY_LIMIT = int(os.getenv("QA_AGENT_JOB_HISTORY", "100"))
+CSV_BATCH_ROWS = int(os.getenv("QA_AGENT_CSV_BATCH_ROWS", "500"))
+MAX_SEGMENT_CHARS = int(os.getenv("QA_AGENT_MAX_SEGMENT_CHARS", str(64 * 1024)))
+
+# Caches
+QUERY_CACHE_SIZE = int(os.getenv("QA_AGENT_QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_PATH = os.getenv("QA_AGENT_QUERY_CACHE_PATH", "")  # empty = memory only
+RESULT_CACHE_SIZE = int(os.getenv("QA_AGENT_RESULT_CACHE_SIZE", "512"))
+
+# Batch endpoints
+MAX_BATCH_SIZE = int(os.getenv("QA_AGENT_MAX_BATCH_SIZE", "500"))
+
+# Test runner
+RUN_WORKERS = int(os.getenv("QA_AGENT_RUN_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Upper bound on browsers a single /run_tests request may start
+RUN_MAX_WORKERS = int(os.getenv("QA_AGENT_RUN_MAX_WORKERS", str(RUN_WORKERS)))
+RUN_TEST_TIMEOUT = float(os.getenv("QA_AGENT_RUN_TEST_TIMEOUT", "120"))
+REPORTS_DIR = os.getenv("QA_AGENT_REPORTS_DIR", os.path.join(os.getcwd(), "test_reports"))
+TARGET_SITE_DIR = os.getenv("QA_AGENT_TARGET_SITE", os.path.join(os.getcwd(), "target_site"))
+
+# HTML parsing: "lxml" or "html.parser"; empty = lxml when installed
+HTML_PARSER_BACKEND = os.getenv("QA_AGENT_HTML_PARSER", "")
+
+# Target pages: how often a URL target is re-fetched to check for changes, the fetch timeout,
+# and where fetched pages are kept on disk
+TARGET_URL_REVALIDATE = float(os.getenv("QA_AGENT_TARGET_URL_REVALIDATE", "5"))
+TARGET_FETCH_TIMEOUT = float(os.getenv("QA_AGENT_TARGET_FETCH_TIMEOUT", "10"))
+TARGET_CACHE_DIR = os.getenv("QA_AGENT_TARGET_CACHE", os.path.join(os.getcwd(), "target_cache"))
+# URL targets a client may name without registering them first: comma-separated prefixes such as
+# "https://staging.example.com/shop/" (empty = none). Other URLs need TARGETS.register()
+TARGET_URL_ALLOWLIST = [u.strip() for u in os.getenv("QA_AGENT_TARGET_URLS", "").split(",") if u.strip()]
+# Pages kept in the registry (least recently used ones beyond this are dropped; registered ones stay)
+TARGET_MAX_PAGES = int(os.getenv("QA_AGENT_TARGET_MAX_PAGES", "64"))
+TARGET_MAX_BYTES = int(os.getenv("QA_AGENT_TARGET_MAX_BYTES", str(5 * 1024 * 1024)))
+
+# Query embedding micro-batcher: concurrent encodes wait up to EMBED_MAX_WAIT_MS
+# for company, and a forward pass takes at most EMBED_MAX_BATCH texts
+EMBED_MAX_BATCH = int(os.getenv("QA_AGENT_EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("QA_AGENT_EMBED_MAX_WAIT_MS", "5"))
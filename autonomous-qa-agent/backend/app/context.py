@@ -0,0 +1,124 @@
+# backend/app/context.py
+#
+# Turns ranked retrieval candidates into the context handed to generation:
+# MMR ordering with near-duplicate removal, then trimming to a token budget.
+# Hits keep their chunk metadata so callers can ground on source filenames
+# instead of scanning the context text.
+
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from .config import MMR_LAMBDA, DEDUP_SIMILARITY, CONTEXT_TOKEN_BUDGET
+
+# Below this many tokens of room, a chunk is left out rather than cut down
+MIN_TRIMMED_TOKENS = 32
+
+
+class Hit(NamedTuple):
+    """
+    A retrieved chunk, where it came from and its fused rank score.
+    text_start/text_end are offsets into the text extracted from the source
+    document (see chunking.chunk_segments), not into the raw file.
+    """
+    id: str
+    text: str
+    source: str
+    text_start: Optional[int]
+    text_end: Optional[int]
+    score: float
+    metadata: Dict
+
+
+def make_hit(id_: str, text: str, metadata: Optional[Dict], score: float) -> Hit:
+    metadata = metadata or {}
+    return Hit(id_, text, metadata.get("source") or id_.split("#", 1)[0],
+               metadata.get("text_start"), metadata.get("text_end"), score, metadata)
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose and JSON with MiniLM/GPT-style tokenizers
+    return math.ceil(len(text) / 4)
+
+
+def mmr_select(hits: List[Hit], vectors: List[Optional[List[float]]], k: int,
+               lambda_: float = MMR_LAMBDA, dedup_similarity: float = DEDUP_SIMILARITY) -> List[Hit]:
+    """
+    Pick up to k hits (ranked best first) by maximal marginal relevance:
+    lambda * relevance - (1 - lambda) * similarity to the hits already picked.
+    Hits at least dedup_similarity cosine-similar to a picked hit are dropped.
+    Hits without a vector are never treated as duplicates.
+    """
+    if not hits:
+        return []
+
+    dim = next((len(v) for v in vectors if v is not None and len(v)), 0)
+    matrix = np.zeros((len(hits), dim), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None and len(vector) == dim:
+            matrix[i] = vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.clip(norms, 1e-12, None)
+    similarity = matrix @ matrix.T
+
+    top = max(hit.score for hit in hits) or 1.0
+    relevance = np.array([hit.score / top for hit in hits], dtype=np.float32)
+
+    picked: List[int] = []
+    left = list(range(len(hits)))
+    while left and len(picked) < k:
+        if picked:
+            redundancy = similarity[np.ix_(left, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(left), dtype=np.float32)
+
+        # Near-duplicates of something already picked add nothing
+        keep = redundancy < dedup_similarity
+        left = [i for i, ok in zip(left, keep) if ok]
+        redundancy = redundancy[keep]
+        if not left:
+            break
+
+        marginal = lambda_ * relevance[left] - (1 - lambda_) * redundancy
+        picked.append(left.pop(int(np.argmax(marginal))))
+
+    return [hits[i] for i in picked]
+
+
+def trim_to_budget(hits: List[Hit], budget: int = CONTEXT_TOKEN_BUDGET) -> List[Hit]:
+    """Keep hits in order while they fit in budget tokens; the first that does not is cut to fit"""
+    kept = []
+    remaining = budget
+    for hit in hits:
+        tokens = estimate_tokens(hit.text)
+        if tokens <= remaining:
+            kept.append(hit)
+            remaining -= tokens
+            continue
+
+        if remaining >= MIN_TRIMMED_TOKENS:
+            text = hit.text[:remaining * 4]
+            space = text.rfind(" ")
+            if space > 0:
+                text = text[:space]
+            text = text.rstrip()
+            end = hit.text_start + len(text) if hit.text_start is not None else None
+            kept.append(hit._replace(text=text, text_end=end))
+        break
+    return kept
+
+
+def assemble_context(hits: List[Hit]) -> str:
+    return "\n\n".join(hit.text for hit in hits)
+
+
+def hit_provenance(hit: Hit) -> Dict:
+    """JSON-friendly description of where a hit came from"""
+    return {"source": hit.source, "text_start": hit.text_start, "text_end": hit.text_end,
+            "score": round(hit.score, 6)}
+
+
+def grounding_source(hits: List[Hit]) -> Optional[str]:
+    """The document the context is grounded in: the source of the best hit"""
+    return hits[0].source if hits else None
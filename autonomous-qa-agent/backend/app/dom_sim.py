@@ -0,0 +1,464 @@
+# backend/app/dom_sim.py
+#
+# In-process executor for generated test cases. Steps are replayed against a
+# model of checkout.html, and the cart / coupon / shipping / payment /
+# validation logic of target_site/js/validation.js is re-implemented here,
+# so a smoke run takes well under a millisecond per test. A step the model
+# cannot judge marks its test "needs_browser", and the caller runs that
+# test with Selenium instead.
+
+import re
+import time
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from .cache import LRUCache
+from .generator import unique_test_cases
+from .html_parser import HtmlIndex, load_raw_html
+
+# Selector references inside step text: (id='coupon'), class='btn-add', class 'product-card'
+SELECTOR_REF = re.compile(r"\b(id|class)\s*=?\s*'\.?([\w-]+)'")
+QUOTED = re.compile(r"'([^']*)'")
+AMOUNT = re.compile(r"\$\d+(?:\.\d+)?")
+EMAIL_RE = re.compile(r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
+
+# What the Selenium templates type when a step gives no value
+DEFAULT_VALUES = {
+    "coupon": "SAVE15",
+    "name": "John Doe",
+    "email": "john.doe@example.com",
+    "address": "123 Main Street, City, State 12345",
+    "card-number": "4111111111111111",
+    "upi-id": "testuser@upi",
+}
+
+
+class NeedsBrowser(Exception):
+    """A step the simulator cannot judge; the test has to run in a real browser"""
+
+
+class PageModel(NamedTuple):
+    ids: FrozenSet[str]
+    classes: FrozenSet[str]
+    text: Dict[str, str]                   # id -> text content
+    ancestors: Dict[str, Tuple[str, ...]]  # id -> ids of itself and its enclosing elements
+    hidden: FrozenSet[str]                 # ids carrying the "hidden" class on load
+    products: Dict[str, Tuple[str, float]] # data-id -> (title, price)
+    radios: Dict[str, Tuple[str, str]]     # radio id -> (group name, value)
+    checked: Dict[str, str]                # group name -> value checked on load
+
+
+# Page models keyed by the sha256 of the page they were built from
+PAGE_MODELS = LRUCache(8)
+
+
+def page_model(raw_html: str) -> PageModel:
+    """Parse the page once; the model is shared by every simulated test"""
+    index = HtmlIndex.from_html(raw_html)
+
+    ids, text, ancestors = set(), {}, {}
+    for el_id, el in index.by_id.items():
+        if not el_id:
+            continue
+        ids.add(el_id)
+        text[el_id] = " ".join(el.get_text(" ").split())
+        ancestors[el_id] = (el_id,) + tuple(p.get("id") for p in el.parents if p.get("id"))
+    classes = set(index.by_class)
+    hidden = {el.get("id") for el in index.with_class("hidden") if el.get("id")}
+
+    products = {}
+    for card in index.with_class("product-card", "div"):
+        title = card.find(class_="p-title")
+        price = card.find(class_="p-price")
+        if price is not None and price.get("data-price"):
+            products[card.get("data-id")] = (title.get_text(strip=True) if title else card.get("data-id"),
+                                             float(price["data-price"]))
+
+    radios, checked = {}, {}
+    for radio in index.tagged("input", type="radio"):
+        radios[radio.get("id")] = (radio.get("name"), radio.get("value"))
+        if radio.has_attr("checked"):
+            checked[radio.get("name")] = radio.get("value")
+
+    return PageModel(frozenset(ids), frozenset(classes), text, ancestors,
+                     frozenset(hidden), products, radios, checked)
+
+
+def format_price(value: float) -> str:
+    return f"${value:.2f}"
+
+
+class CheckoutSimulation:
+    """State of one page load, updated the way validation.js updates the DOM"""
+
+    def __init__(self, page: PageModel):
+        self.page = page
+        self.cart: Dict[str, int] = {}
+        self.applied_coupon: Optional[str] = None
+        self.values: Dict[str, str] = {}
+        self.radio_state: Dict[str, str] = dict(page.checked)
+        self.hidden = set(page.hidden)
+        self.text: Dict[str, str] = {}
+        self.alerts: List[str] = []
+        self.last_id: Optional[str] = None
+        self.last_value: Optional[str] = None
+        self._show_payment_fields()
+
+    # --- page logic (mirrors validation.js) ---
+
+    def subtotal(self) -> float:
+        return sum(self.page.products[pid][1] * qty for pid, qty in self.cart.items())
+
+    def total(self) -> float:
+        total = self.subtotal() + (10 if self.radio_state.get("shipping") == "express" else 0)
+        if self.applied_coupon == "SAVE15":
+            total = round(total * 0.85, 2)
+        return total
+
+    def element_text(self, el_id: str) -> str:
+        if el_id == "subtotal":
+            return format_price(self.subtotal())
+        if el_id == "shipping":
+            return "$10.00" if self.radio_state.get("shipping") == "express" else "Free"
+        if el_id == "cart-total":
+            return format_price(self.total())
+        return self.text.get(el_id, self.page.text.get(el_id, ""))
+
+    def visible(self, el_id: str) -> bool:
+        return el_id in self.page.ids and not any(a in self.hidden for a in self.page.ancestors[el_id])
+
+    def add_to_cart(self, pid: str):
+        self.cart[pid] = self.cart.get(pid, 0) + 1
+
+    def type_into(self, el_id: str, value: str):
+        self.values[el_id] = value
+        self.last_id, self.last_value = el_id, value
+
+    def apply_coupon(self):
+        code = self.values.get("coupon", "").strip().upper()
+        if not code:
+            self.alerts.append("Enter a coupon code to apply.")
+        elif code == "SAVE15":
+            self.applied_coupon = "SAVE15"
+            self.alerts.append("Coupon applied: 15% OFF")
+        else:
+            self.applied_coupon = None
+            self.alerts.append("Invalid coupon")
+
+    def select_radio(self, el_id: str):
+        group, value = self.page.radios[el_id]
+        self.radio_state[group] = value
+        if group == "payment":
+            self._show_payment_fields()
+
+    def _show_payment_fields(self):
+        method = self.radio_state.get("payment")
+        for el_id, shown_for in (("card-fields", "card"), ("paypal-note", "paypal"), ("upi-fields", "upi")):
+            if method == shown_for:
+                self.hidden.discard(el_id)
+            else:
+                self.hidden.add(el_id)
+
+    def _set_error(self, el_id: str, message: Optional[str]):
+        if message is None:
+            self.hidden.add(el_id)
+        else:
+            self.text[el_id] = message
+            self.hidden.discard(el_id)
+
+    def pay_now(self):
+        name = self.values.get("name", "").strip()
+        email = self.values.get("email", "").strip()
+        ok = True
+
+        self._set_error("err-name", None if name else "Name required")
+        ok = ok and bool(name)
+
+        valid_email = bool(email and EMAIL_RE.match(email))
+        self._set_error("err-email", None if valid_email else "Valid email required")
+        ok = ok and valid_email
+
+        if not self.cart:
+            self.alerts.append("Cart is empty. Add items before checkout.")
+            ok = False
+        if not ok:
+            return
+
+        method = self.radio_state.get("payment")
+        if method == "card":
+            number = self.values.get("card-number", "").strip()
+            if len(number) < 8:
+                self.alerts.append("Enter a valid card number (demo).")
+                return
+        elif method == "upi":
+            upi = self.values.get("upi-id", "").strip()
+            if "@" not in upi:
+                self.alerts.append("Enter a valid UPI ID (e.g. example@upi).")
+                return
+
+        self.hidden.discard("payment-result")
+        self.text["payment-result"] = "Payment Successful! ✅"
+        self.applied_coupon = None
+
+
+# ------------------------------------------------------------------
+# Step interpretation
+# ------------------------------------------------------------------
+
+class _Step(NamedTuple):
+    text: str                 # original step
+    lower: str                # lower-cased, selector references removed
+    refs: Tuple[str, ...]     # referenced element ids / classes, in order
+    value: Optional[str]      # first quoted value outside selector references
+
+
+def _parse_step(step: str) -> _Step:
+    refs = tuple(m.group(2) for m in SELECTOR_REF.finditer(step))
+    stripped = SELECTOR_REF.sub("", step)
+    quoted = QUOTED.search(stripped)
+    return _Step(step, stripped.lower(), refs, quoted.group(1) if quoted else None)
+
+
+def _has(step: _Step, *words: str) -> bool:
+    return any(w in step.lower for w in words)
+
+
+def _check(ok: bool, detail: str) -> Tuple[bool, str]:
+    return ok, detail
+
+
+def _pick_product(sim: CheckoutSimulation, step: _Step) -> str:
+    for pid, (title, _) in sim.page.products.items():
+        if title.lower() in step.lower:
+            return pid
+    if not sim.page.products:
+        raise NeedsBrowser("no products found in the page")
+    return next(iter(sim.page.products))
+
+
+def _type(el_id: str, value_from_step: bool = True):
+    def action(sim: CheckoutSimulation, step: _Step):
+        if _has(step, "leave"):
+            value = ""
+        elif value_from_step and step.value is not None:
+            value = step.value
+        else:
+            value = DEFAULT_VALUES[el_id]
+        sim.type_into(el_id, value)
+        return _check(True, f"{el_id} = {value!r}")
+    return action
+
+
+def _select(el_id: str):
+    def action(sim: CheckoutSimulation, step: _Step):
+        if el_id not in sim.page.radios:
+            return _check(False, f"#{el_id} not found")
+        sim.select_radio(el_id)
+        return _check(True, f"selected #{el_id}")
+    return action
+
+
+def _add_to_cart(sim, step):
+    pid = _pick_product(sim, step)
+    sim.add_to_cart(pid)
+    return _check(True, f"added {sim.page.products[pid][0]} · total {sim.element_text('cart-total')}")
+
+
+def _apply_coupon(sim, step):
+    # "Apply coupon code 'SAVE15'" types the code first; "Click 'Apply' button" only clicks
+    if step.value is not None and _has(step, "coupon", "code"):
+        sim.type_into("coupon", step.value)
+    sim.apply_coupon()
+    return _check(True, f"alert: {sim.alerts[-1]}")
+
+
+def _pay_now(sim, step):
+    alerts_before = len(sim.alerts)
+    sim.pay_now()
+    outcome = "payment successful" if sim.visible("payment-result") else "payment blocked"
+    return _check(True, outcome + "".join(f" · alert: {a}" for a in sim.alerts[alerts_before:]))
+
+
+def _locate(sim, step):
+    missing = [r for r in step.refs if r not in sim.page.ids and r not in sim.page.classes]
+    return _check(not missing, f"missing {missing}" if missing else f"found {list(step.refs)}")
+
+
+def _noop(sim, step):
+    return _check(True, "nothing to simulate")
+
+
+# (keywords that must all be present as groups, action), first match wins
+ACTIONS: List[Tuple[Tuple[Tuple[str, ...], ...], Callable]] = [
+    ((("locate", "identify", "find"),), _locate),
+    ((("navigate", "open", "go to", "scroll", "wait"),), _noop),
+    ((("pay now",),), _pay_now),
+    ((("upi id",), ("enter", "fill", "type")), _type("upi-id")),
+    ((("card number",), ("enter", "fill", "type")), _type("card-number")),
+    ((("apply",),), _apply_coupon),
+    ((("coupon", "code"), ("enter", "type")), _type("coupon")),
+    ((("email",), ("enter", "fill", "type", "leave")), _type("email")),
+    ((("name",), ("enter", "fill", "type", "leave")), _type("name")),
+    ((("address",), ("enter", "fill", "type", "leave")), _type("address")),
+    ((("add",), ("cart",)), _add_to_cart),
+    ((("express",),), _select("ship-express")),
+    ((("standard",), ("click", "select", "choose")), _select("ship-standard")),
+    ((("paypal",), ("click", "select", "switch", "choose")), _select("pay-paypal")),
+    ((("upi",), ("click", "select", "switch", "choose")), _select("pay-upi")),
+    ((("card",), ("click", "select", "switch", "choose")), _select("pay-card")),
+]
+
+
+def _verify(sim: CheckoutSimulation, step: _Step) -> Tuple[bool, str]:
+    if step.refs:
+        sim.last_id = step.refs[-1]
+
+    # Radio state: "Standard ... is selected by default (id='ship-standard')"
+    radio_refs = [r for r in step.refs if r in sim.page.radios]
+    if radio_refs and _has(step, "selected", "checked", "default"):
+        group, value = sim.page.radios[radio_refs[0]]
+        return _check(sim.radio_state.get(group) == value, f"{group} = {sim.radio_state.get(group)}")
+
+    if _has(step, "error"):
+        if _has(step, "discount not applied", "coupon", "code"):
+            return _check(sim.applied_coupon is None, f"applied coupon: {sim.applied_coupon}")
+        targets = [r for r in step.refs if r.startswith("err-")] or ["err-name", "err-email"]
+        shown = [t for t in targets if sim.visible(t)]
+        ok = len(shown) == len(targets) if step.refs else bool(shown)
+        return _check(ok, f"visible errors: {shown}")
+
+    if _has(step, "success", "payment successful"):
+        expected = step.value or "Payment Successful"
+        ok = sim.visible("payment-result") and expected.lower() in sim.element_text("payment-result").lower()
+        return _check(ok, f"#payment-result {'visible' if sim.visible('payment-result') else 'hidden'}")
+
+    if _has(step, "discount", "15%"):
+        base = sim.subtotal() + (10 if sim.radio_state.get("shipping") == "express" else 0)
+        ok = sim.applied_coupon == "SAVE15" and sim.element_text("cart-total") == format_price(round(base * 0.85, 2))
+        return _check(ok, f"total {sim.element_text('cart-total')}")
+
+    if _has(step, "subtotal"):
+        amounts = AMOUNT.findall(step.text)
+        actual = sim.element_text("subtotal")
+        ok = sim.subtotal() > 0 if not amounts else actual == format_price(float(amounts[0][1:]))
+        return _check(ok, f"subtotal {actual}")
+
+    if _has(step, "shipping cost", "shipping charge") or "shipping" in step.refs:
+        if _has(step, "no additional"):
+            return _check(sim.total() == sim.subtotal(), f"total {sim.element_text('cart-total')}")
+        expected = [q for q in QUOTED.findall(SELECTOR_REF.sub("", step.text))] or AMOUNT.findall(step.text)
+        actual = sim.element_text("shipping")
+        return _check(any(e in actual for e in expected) if expected else True, f"shipping {actual}")
+
+    if _has(step, "total"):
+        actual = sim.element_text("cart-total")
+        if _has(step, "increases by"):
+            amounts = AMOUNT.findall(step.text)
+            delta = float(amounts[0][1:]) if amounts else 10.0
+            base = sim.subtotal() + delta
+            expected = round(base * 0.85, 2) if sim.applied_coupon == "SAVE15" else base
+            return _check(actual == format_price(expected), f"total {actual}")
+        return _check(bool(sim.cart) and actual == format_price(sim.total()), f"total {actual}")
+
+    if _has(step, "cart") and _has(step, "appears", "displays", "product", "item"):
+        return _check(bool(sim.cart), f"cart {sim.cart}")
+
+    if _has(step, "accept"):
+        return _check(bool(sim.last_value), f"{sim.last_id} = {sim.last_value!r}")
+
+    if _has(step, "mentions", "contains") and step.value and sim.last_id:
+        actual = sim.element_text(sim.last_id)
+        return _check(step.value.lower() in actual.lower(), f"#{sim.last_id}: {actual!r}")
+
+    ids = [r for r in step.refs if r in sim.page.ids]
+    if ids and _has(step, "visible", "displayed", "appears", "shown"):
+        shown = [i for i in ids if sim.visible(i)]
+        return _check(len(shown) == len(ids), f"visible: {shown}")
+
+    raise NeedsBrowser(step.text)
+
+
+def run_step(sim: CheckoutSimulation, step_text: str) -> Tuple[bool, str]:
+    """Apply or check one step; raises NeedsBrowser if it cannot be simulated"""
+    step = _parse_step(step_text)
+    if step.lower.lstrip().startswith(("verify", "check", "ensure", "confirm")):
+        return _verify(sim, step)
+
+    for groups, action in ACTIONS:
+        if all(_has(step, *group) for group in groups):
+            return action(sim, step)
+    raise NeedsBrowser(step_text)
+
+
+def _selector_present(page: PageModel, selector: str) -> bool:
+    if selector.startswith("#"):
+        return selector[1:] in page.ids
+    if selector.startswith("."):
+        return selector[1:] in page.classes
+    raise NeedsBrowser(f"selector {selector}")
+
+
+def simulate_test_case(test_case: Dict, page: PageModel) -> Dict:
+    """
+    Run one test case against the page model. Status is passed, failed or
+    needs_browser (with the step that could not be simulated).
+    """
+    start = time.perf_counter()
+    test_id = test_case.get("Test_ID", "TC-000")
+    steps_out = []
+    status, message = "passed", ""
+
+    try:
+        missing = [s for s in (test_case.get("Selectors_Used") or {}).values()
+                   if not _selector_present(page, s)]
+        if missing:
+            status, message = "failed", f"selectors not in page: {missing}"
+        else:
+            sim = CheckoutSimulation(page)
+            for step in test_case.get("Steps", []):
+                ok, detail = run_step(sim, step)
+                steps_out.append({"step": step, "ok": ok, "detail": detail})
+                if not ok:
+                    status, message = "failed", f"{step}: {detail}"
+                    break
+    except NeedsBrowser as e:
+        status, message = "needs_browser", f"cannot simulate: {e}"
+
+    return {
+        "test_id": test_id,
+        "status": status,
+        "message": message,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+        "steps": steps_out,
+    }
+
+
+def page_model_for(html_structure: Dict) -> Optional[PageModel]:
+    """Model of a parsed page, reading its HTML back from disk only when the model is not cached"""
+    digest = html_structure.get("sha256")
+    page = PAGE_MODELS.get(digest)
+    if page is None:
+        raw_html = load_raw_html(html_structure)
+        if not raw_html:
+            return None
+        page = page_model(raw_html)
+        PAGE_MODELS.put(digest, page)
+    return page
+
+
+def simulate_test_cases(test_cases: List[Dict], html_structure: Dict) -> List[Dict]:
+    """Simulate a batch against a parsed page (html_parser output)"""
+    page = page_model_for(html_structure) if html_structure.get("sha256") else None
+    if page is None:
+        return [{"test_id": tc.get("Test_ID", "TC-000"), "status": "needs_browser",
+                 "message": "HTML structure not loaded", "duration_ms": 0.0, "steps": []}
+                for tc in unique_test_cases(test_cases)]
+
+    return [simulate_test_case(tc, page) for tc in unique_test_cases(test_cases)]
+
+
+def summarize_simulation(results: List[Dict]) -> Dict:
+    counts = {status: 0 for status in ("passed", "failed", "needs_browser")}
+    for r in results:
+        counts[r["status"]] += 1
+    return {"total": len(results), **counts,
+            "duration_ms": round(sum(r["duration_ms"] for r in results), 3)}
@@ -0,0 +1,152 @@
+# backend/app/embedding_backends.py
+#
+# Embedding backends behind resources.get_embedding_model(). Every backend
+# has SentenceTransformer's encode(texts, batch_size=...) -> np.ndarray
+# signature, so rag.py, ingest_new.py and the batcher do not care which
+# one is loaded. QA_AGENT_EMBEDDING_BACKEND picks it:
+#
+#   torch  SentenceTransformer on PyTorch (default)
+#   onnx   the same model exported to ONNX, int8-quantized, on onnxruntime;
+#          needs onnxruntime, tokenizers and huggingface_hub but not torch
+
+import importlib.util
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from .config import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_THREADS, EMBED_MAX_SEQ_LENGTH
+
+# Modules each backend needs, checked without importing them
+BACKEND_REQUIREMENTS = {
+    "torch": ("sentence_transformers",),
+    "onnx": ("onnxruntime", "tokenizers", "huggingface_hub"),
+}
+
+
+def backend_available(name: str) -> bool:
+    return name in BACKEND_REQUIREMENTS and all(importlib.util.find_spec(m) for m in BACKEND_REQUIREMENTS[name])
+
+
+class TorchBackend:
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+
+def _hub_repo(model_name: str) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def prepare_onnx_model(model_name: str = EMBEDDING_MODEL_NAME, model_dir: str = ONNX_MODEL_DIR) -> Dict[str, str]:
+    """
+    Make sure model_dir holds tokenizer.json and an int8 model_int8.onnx.
+    Missing files are fetched from the model's Hugging Face repo (which
+    ships an fp32 onnx/model.onnx) and quantized here, once.
+    """
+    paths = {
+        "tokenizer": os.path.join(model_dir, "tokenizer.json"),
+        "fp32": os.path.join(model_dir, "model.onnx"),
+        "int8": os.path.join(model_dir, "model_int8.onnx"),
+    }
+    if os.path.exists(paths["tokenizer"]) and os.path.exists(paths["int8"]):
+        return paths
+
+    from huggingface_hub import hf_hub_download
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(model_dir, exist_ok=True)
+    repo = _hub_repo(model_name)
+    if not os.path.exists(paths["tokenizer"]):
+        hf_hub_download(repo, "tokenizer.json", local_dir=model_dir)
+    if not os.path.exists(paths["fp32"]):
+        downloaded = hf_hub_download(repo, "onnx/model.onnx", local_dir=model_dir)
+        os.replace(downloaded, paths["fp32"])
+
+    # Dynamic quantization: int8 weights, activations quantized per batch at run time
+    tmp_path = paths["int8"] + ".tmp"
+    quantize_dynamic(paths["fp32"], tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, paths["int8"])
+    print(f"✓ Quantized {repo} to {paths['int8']}")
+    return paths
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average of the non-padding token vectors, L2-normalized (what the sentence-transformers model does)"""
+    mask = attention_mask[:, :, None].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.clip(norms, 1e-12, None)
+
+
+class OnnxBackend:
+    name = "onnx"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, model_dir: str = ONNX_MODEL_DIR,
+                 threads: int = ONNX_THREADS, max_seq_length: int = EMBED_MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        paths = prepare_onnx_model(model_name, model_dir)
+
+        self.tokenizer = Tokenizer.from_file(paths["tokenizer"])
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.no_padding()  # padded per batch in encode()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(paths["int8"], options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(e.ids) for e in encodings)
+
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for row, e in enumerate(encodings):
+            input_ids[row, :len(e.ids)] = e.ids
+            attention_mask[row, :len(e.ids)] = 1
+
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feed)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Batch texts of similar length together so little padding is computed
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._encode_batch([texts[i] for i in idx])):
+                out[i] = vec
+
+        vectors = np.stack(out)
+        return vectors[0] if single else vectors
+
+
+BACKENDS = {"torch": TorchBackend, "onnx": OnnxBackend}
+
+
+def load_backend(name: str, model_name: str = EMBEDDING_MODEL_NAME):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown embedding backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name)
@@ -0,0 +1,182 @@
+# backend/app/embedding_service.py
+#
+# Micro-batching front for the shared embedding model. Request threads
+# submit texts and wait on a Future; a single scheduler thread collects
+# whatever arrives within max_wait_ms (or until max_batch texts are queued)
+# and encodes it in one forward pass. Identical texts from different callers
+# are encoded once.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from .config import EMBED_MAX_BATCH, EMBED_MAX_WAIT_MS
+from .resources import get_embedding_model
+
+
+class _Request:
+    __slots__ = ("texts", "future", "queued_at")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+def _bucket(size: int) -> str:
+    # Histogram buckets by upper bound: 1, 2, 4, 8, ...
+    bound = 1
+    while bound < size:
+        bound *= 2
+    return str(bound)
+
+
+class EmbeddingService:
+    """Batches concurrent encode() calls into shared forward passes"""
+
+    def __init__(self, max_batch: int = EMBED_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        # Read on every batch, so both can be changed while running
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self.encoded = 0
+        self.wait_ms = 0.0
+        self.max_wait_seen_ms = 0.0
+        self.encode_ms = 0.0
+        self.histogram: Dict[str, int] = {}
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for the next batch; the future resolves to one vector (list) per text"""
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result([])
+            return request.future
+
+        self._ensure_started()
+        self._queue.put(request)
+        return request.future
+
+    def encode(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        return self.submit(texts).result(timeout)
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Shutting down: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+
+        return batch
+
+    def _run(self, batch: List[_Request]):
+        started = time.perf_counter()
+        unique = list(dict.fromkeys(text for request in batch for text in request.texts))
+
+        try:
+            vectors = get_embedding_model().encode(unique, batch_size=max(len(unique), 1)).tolist()
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        finished = time.perf_counter()
+        found = dict(zip(unique, vectors))
+        for request in batch:
+            request.future.set_result([found[text] for text in request.texts])
+
+        waits = [(started - request.queued_at) * 1000 for request in batch]
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += sum(len(request.texts) for request in batch)
+            self.encoded += len(unique)
+            self.wait_ms += sum(waits)
+            self.max_wait_seen_ms = max(self.max_wait_seen_ms, *waits)
+            self.encode_ms += (finished - started) * 1000
+            bucket = _bucket(len(unique))
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def _loop(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = self._collect(request)
+            try:
+                self._run(batch)
+            except Exception as e:
+                print(f"Error in embedding batcher: {e}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def shutdown(self):
+        """Stop the scheduler after the queued batches; a later submit() starts it again"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join()
+
+    def configure(self, max_batch: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        if max_batch is not None:
+            self.max_batch = max(1, int(max_batch))
+        if max_wait_ms is not None:
+            self.max_wait_ms = max(0.0, float(max_wait_ms))
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait_ms,
+                "queued": self._queue.qsize(),
+                "batches": self.batches,
+                "requests": self.requests,
+                "texts": self.texts,
+                "encoded": self.encoded,
+                "avg_batch_size": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+                "avg_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "avg_queue_wait_ms": round(self.wait_ms / self.requests, 3) if self.requests else 0.0,
+                "max_queue_wait_ms": round(self.max_wait_seen_ms, 3),
+                "avg_encode_ms": round(self.encode_ms / self.batches, 3) if self.batches else 0.0,
+                # Forward passes by number of texts encoded, bucketed by upper bound
+                "batch_size_histogram": dict(sorted(self.histogram.items(), key=lambda kv: int(kv[0]))),
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
+
+
+EMBEDDINGS = EmbeddingService()
@@ -0,0 +1,193 @@
+# backend/app/extractors.py
+#
+# Per-format text extraction for uploads. extract_batch runs each file in a
+# worker process that imports this module, so it only depends on the standard
+# library, chunking and config; pandas and the document libraries are the
+# optional, format-specific extras.
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+from .chunking import TextSegment, MD_HEADING
+from .config import UPLOAD_CHUNK_SIZE, CSV_BATCH_ROWS, MAX_SEGMENT_CHARS
+
+try:
+    import fitz  # PyMuPDF
+except:
+    fitz = None
+
+try:
+    from docx import Document
+except:
+    Document = None
+
+try:
+    from pptx import Presentation
+except:
+    Presentation = None
+
+# Extracted segments of each upload are kept next to it, one JSON object per line
+SEGMENTS_DIR = ".segments"
+
+
+def _iter_pdf(p: Path) -> Iterator[TextSegment]:
+    # Pages are loaded one at a time, so a 500-page PDF never sits in memory at once
+    doc = fitz.open(str(p))
+    try:
+        for number, page in enumerate(doc, 1):
+            yield TextSegment(page.get_text(), {"page": number})
+    finally:
+        doc.close()
+
+
+def _iter_docx(p: Path) -> Iterator[TextSegment]:
+    for number, para in enumerate(Document(str(p)).paragraphs, 1):
+        yield TextSegment(para.text, {"paragraph": number})
+
+
+def _iter_pptx(p: Path) -> Iterator[TextSegment]:
+    for number, slide in enumerate(Presentation(str(p)).slides, 1):
+        texts = [shape.text for shape in slide.shapes if hasattr(shape, "text") and shape.text]
+        yield TextSegment("\n".join(texts), {"slide": number})
+
+
+def _iter_text_sections(p: Path, markdown: bool) -> Iterator[TextSegment]:
+    """Read a text file line by line, cutting sections at markdown headings or blank lines"""
+    buffer, size, start_line = [], 0, 1
+
+    with open(p, "r", encoding="utf-8", errors="ignore") as f:
+        for line_no, line in enumerate(f, 1):
+            boundary = MD_HEADING.match(line) if markdown else not line.strip()
+
+            if buffer and (boundary or size >= MAX_SEGMENT_CHARS):
+                yield TextSegment("".join(buffer), {"line": start_line})
+                buffer, size = [], 0
+
+            if not buffer:
+                start_line = line_no
+            if markdown or line.strip():
+                buffer.append(line)
+                size += len(line)
+
+    if buffer:
+        yield TextSegment("".join(buffer), {"line": start_line})
+
+
+def _iter_json(p: Path) -> Iterator[TextSegment]:
+    # The standard library has no incremental JSON parser; section by top-level key instead
+    try:
+        with open(p, "r", encoding="utf-8", errors="ignore") as f:
+            data = json.load(f)
+    except ValueError:
+        yield from _iter_text_sections(p, markdown=False)
+        return
+
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield TextSegment(json.dumps({key: value}, indent=2), {"key": str(key)})
+    elif isinstance(data, list):
+        for number, value in enumerate(data, 1):
+            yield TextSegment(json.dumps(value, indent=2), {"item": number})
+    else:
+        yield TextSegment(json.dumps(data, indent=2), {})
+
+
+def _iter_csv(p: Path) -> Iterator[TextSegment]:
+    import pandas as pd  # only paid for by workers that actually get a CSV
+
+    row = 1
+    for df in pd.read_csv(p, chunksize=CSV_BATCH_ROWS):
+        yield TextSegment("\n".join(df.astype(str).values.flatten()),
+                          {"row_start": row, "row_end": row + len(df) - 1})
+        row += len(df)
+
+
+def iter_text_segments(path: Union[str, Path]) -> Iterator[TextSegment]:
+    """
+    Lazily extract text from a file as a stream of segments:
+    PDF by page, DOCX by paragraph, PPTX by slide, CSV by row batch,
+    .md/.txt/.json by section. Each segment carries its provenance.
+    """
+    p = Path(path)
+    ext = p.suffix.lower()
+
+    if ext == ".pdf" and fitz:
+        segments = _iter_pdf(p)
+    elif ext == ".docx" and Document:
+        segments = _iter_docx(p)
+    elif ext in [".ppt", ".pptx"] and Presentation:
+        segments = _iter_pptx(p)
+    elif ext in [".txt", ".md"]:
+        segments = _iter_text_sections(p, markdown=ext == ".md")
+    elif ext == ".json":
+        segments = _iter_json(p)
+    elif ext == ".csv":
+        segments = _iter_csv(p)
+    else:
+        yield TextSegment("[UNSUPPORTED FILE TYPE]", {})
+        return
+
+    try:
+        for segment in segments:
+            if segment.text.strip():
+                yield segment
+    except Exception as e:
+        yield TextSegment(f"[ERROR Extracting Text: {e}]", {})
+
+
+def extract_text_from_path(path: Union[str, Path]) -> str:
+    """
+    Extract the full text of a file. Prefer iter_text_segments for large files.
+    """
+    return "\n".join(segment.text for segment in iter_text_segments(path))
+
+
+def segments_path_for(path: Union[str, Path]) -> Path:
+    p = Path(path)
+    return p.parent / SEGMENTS_DIR / f"{p.name}.jsonl"
+
+
+def file_hash(path: Union[str, Path], block_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def extract_segments_to_file(path: Union[str, Path]) -> Dict:
+    """
+    Stream the segments of an uploaded file into a JSONL sidecar so the KB
+    build can re-read them without holding the document in memory.
+    """
+    p = Path(path)
+    out_path = segments_path_for(p)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+    segments, chars = 0, 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for segment in iter_text_segments(p):
+            out.write(json.dumps(segment._asdict()) + "\n")
+            segments += 1
+            chars += len(segment.text)
+
+    return {
+        "filename": p.name,
+        "path": str(p),
+        "segments_path": str(out_path),
+        "segments": segments,
+        "chars": chars,
+        "hash": file_hash(p),
+    }
+
+
+def extract_worker(path: str, conn):
+    """Process target of ingest_new.extract_batch: extract one file and send back its summary"""
+    try:
+        result = extract_segments_to_file(path)
+    except Exception as e:
+        result = {"filename": Path(path).name, "path": path, "error": f"[ERROR Extracting Text: {e}]"}
+    conn.send(result)
+    conn.close()
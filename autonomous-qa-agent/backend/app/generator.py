@@ -1,10 +1,243 @@
-from typing import Dict
-from .llm_integration import generate_selenium_with_html
-from .rag import HTML_STRUCTURE
+import io
+import zipfile
+from typing import Dict, List, Optional, Tuple
+from .llm_integration import (
+    generate_selenium_with_html, generate_selenium_class, selenium_class_name,
+    selenium_method_name, SELENIUM_IMPORTS, DEFAULT_BASE_URL
+)
+from .targets import get_html_structure
 
 
-def create_selenium_script(test_case: Dict) -> str:
+BASE_URL_FIXTURE = '''@pytest.fixture(scope="session")
+def base_url():
+    return os.environ.get("NETCART_BASE_URL", {url!r})
+'''
+
+
+def base_url_fixture(html_structure: Dict) -> str:
+    return BASE_URL_FIXTURE.format(url=html_structure.get("url") or DEFAULT_BASE_URL)
+
+# Driver modes: (stdlib imports, selenium imports, fixtures)
+
+# One fresh Chrome per test
+PER_TEST_DRIVER = ("", "", '''@pytest.fixture
+def driver():
+    options = webdriver.ChromeOptions()
+    if os.environ.get("NETCART_HEADLESS") == "1":
+        options.add_argument("--headless=new")
+
+    drv = webdriver.Chrome(options=options)
+    drv.maximize_window()
+    yield drv
+    drv.quit()
+''')
+
+# Chrome sessions reused across the run, reset between tests
+POOLED_DRIVER = ("import queue\nimport threading\n",
+                 "from selenium.common.exceptions import WebDriverException\n", '''# Browsers per pytest process (each xdist worker gets its own pool)
+DRIVER_POOL_SIZE = int(os.environ.get("NETCART_DRIVER_POOL_SIZE", "1"))
+
+
+def new_driver():
+    options = webdriver.ChromeOptions()
+    if os.environ.get("NETCART_HEADLESS") == "1":
+        options.add_argument("--headless=new")
+
+    drv = webdriver.Chrome(options=options)
+    drv.maximize_window()
+    return drv
+
+
+class DriverPool:
+    """Chrome sessions shared by the whole test run; tests borrow one and give it back"""
+
+    def __init__(self, size):
+        self.size = max(size, 1)
+        self.idle = queue.Queue()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if len(self.drivers) < self.size:
+                drv = new_driver()
+                self.drivers.append(drv)
+                return drv
+
+        # Pool is full - wait for another test to hand a browser back
+        return self.idle.get()
+
+    def release(self, drv):
+        self.idle.put(drv)
+
+    def discard(self, drv):
+        with self.lock:
+            self.drivers.remove(drv)
+        try:
+            drv.quit()
+        except WebDriverException:
+            pass
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+        for drv in drivers:
+            try:
+                drv.quit()
+            except WebDriverException:
+                pass
+
+
+def reset_driver(drv, base_url):
+    """Clear what the previous test left behind and reload the page under test"""
+    try:
+        drv.switch_to.alert.dismiss()
+    except WebDriverException:
+        pass
+
+    drv.delete_all_cookies()
+    try:
+        drv.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        # about:blank and some file:// pages have no storage
+        pass
+    drv.get(base_url)
+
+
+@pytest.fixture(scope="session")
+def driver_pool():
+    pool = DriverPool(DRIVER_POOL_SIZE)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def driver(driver_pool, base_url):
+    drv = driver_pool.acquire()
+    try:
+        reset_driver(drv, base_url)
+    except WebDriverException:
+        # The session died in an earlier test - replace it
+        driver_pool.discard(drv)
+        drv = driver_pool.acquire()
+        reset_driver(drv, base_url)
+
+    yield drv
+    driver_pool.release(drv)
+''')
+
+DRIVER_MODES = {"per_test": PER_TEST_DRIVER, "pool": POOLED_DRIVER}
+
+
+def _driver_mode(driver_mode: str) -> Tuple[str, str, str]:
+    if driver_mode not in DRIVER_MODES:
+        raise ValueError(f"unknown driver mode {driver_mode!r}, expected one of {sorted(DRIVER_MODES)}")
+    return DRIVER_MODES[driver_mode]
+
+
+def create_conftest(driver_mode: str = "per_test", html_structure: Optional[Dict] = None) -> str:
+    """conftest.py with the base_url and driver fixtures for the given driver mode"""
+    stdlib_imports, selenium_imports, driver_fixtures = _driver_mode(driver_mode)
+    base_url = base_url_fixture(html_structure or {})
+
+    return f'''"""
+Shared pytest fixtures for generated NetCart tests.
+
+Set NETCART_BASE_URL to point at your checkout.html and NETCART_HEADLESS=1
+to run Chrome without a window. With the pooled driver mode,
+NETCART_DRIVER_POOL_SIZE sets how many browsers each pytest process keeps.
+"""
+
+import os
+{stdlib_imports}
+import pytest
+from selenium import webdriver
+{selenium_imports}
+
+{base_url}
+
+{driver_fixtures}'''
+
+
+def create_selenium_script(test_case: Dict, fast: bool = False, target: Optional[str] = None) -> str:
+    """
+    Generate Selenium script using YOUR actual checkout.html selectors
+    (or those of another registered target page).
+    fast=True leaves out the fixed pauses.
+    """
+    return generate_selenium_with_html(test_case, get_html_structure(target), fast)
+
+
+def unique_test_cases(test_cases: List[Dict]) -> List[Dict]:
+    """Batches mix prompts that all number from TC-001 - make ids unique per bundle"""
+    seen = {}
+    unique = []
+    for test_case in test_cases:
+        test_id = test_case.get("Test_ID", "TC-000")
+        seen[test_id] = seen.get(test_id, 0) + 1
+        if seen[test_id] > 1:
+            test_case = {**test_case, "Test_ID": f"{test_id}-{seen[test_id]}"}
+        unique.append(test_case)
+    return unique
+
+
+def _pytest_function(test_case: Dict) -> str:
+    return f'''def {selenium_method_name(test_case)}(driver, base_url):
+    test = {selenium_class_name(test_case)}(driver=driver, base_url=base_url)
+    assert test.{selenium_method_name(test_case)}(), {str(test_case.get("Test_ID", "TC-000")) + " failed"!r}
+'''
+
+
+def create_selenium_test_files(test_cases: List[Dict], driver_mode: str = "per_test",
+                               fast: bool = False, target: Optional[str] = None) -> List[Tuple[str, str]]:
     """
-    Generate Selenium script using YOUR actual checkout.html selectors.
+    One pytest file per test case plus a shared conftest.py holding the driver
+    setup. Each file is still runnable on its own with `python <file>`.
+    driver_mode "pool" reuses browsers across tests instead of starting one per test.
+    Returns (filename, source) pairs.
+
+    Generation is pure-Python string building, so it runs sequentially:
+    a thread pool would only contend for the GIL.
     """
-    return generate_selenium_with_html(test_case, HTML_STRUCTURE)
\ No newline at end of file
+    html_structure = get_html_structure(target)
+    files = [("conftest.py", create_conftest(driver_mode, html_structure))]
+    for test_case in unique_test_cases(test_cases):
+        source = generate_selenium_with_html(test_case, html_structure, fast)
+        source += "\n\n" + _pytest_function(test_case)
+        files.append((f"{selenium_method_name(test_case)}.py", source))
+    return files
+
+
+def create_selenium_test_module(test_cases: List[Dict], driver_mode: str = "per_test",
+                                fast: bool = False, target: Optional[str] = None) -> str:
+    """A single self-contained pytest module with one test function per case"""
+    stdlib_imports, selenium_imports, driver_fixtures = _driver_mode(driver_mode)
+    html_structure = get_html_structure(target)
+    test_cases = unique_test_cases(test_cases)
+
+    parts = [
+        f'"""\nNetCart Checkout - Generated Test Suite ({len(test_cases)} test cases)\n"""',
+        SELENIUM_IMPORTS + "\n" + stdlib_imports + "\nimport pytest\n" + selenium_imports,
+        base_url_fixture(html_structure),
+        driver_fixtures,
+    ]
+    for test_case in test_cases:
+        parts.append(generate_selenium_class(test_case, html_structure, fast))
+        parts.append(_pytest_function(test_case))
+
+    return "\n\n".join(parts)
+
+
+def create_selenium_bundle_zip(test_cases: List[Dict], driver_mode: str = "per_test",
+                               fast: bool = False, target: Optional[str] = None) -> bytes:
+    """Zip of create_selenium_test_files(test_cases, driver_mode, fast, target)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for filename, source in create_selenium_test_files(test_cases, driver_mode, fast, target):
+            zf.writestr(filename, source)
+    return buffer.getvalue()
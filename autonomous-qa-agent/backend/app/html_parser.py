@@ -1,57 +1,185 @@
-from bs4 import BeautifulSoup
+import hashlib
+import sys
+from bs4 import BeautifulSoup, Tag
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .config import HTML_PARSER_BACKEND
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+def default_backend() -> str:
+    """BeautifulSoup tree builder: QA_AGENT_HTML_PARSER if set, else lxml when installed"""
+    if HTML_PARSER_BACKEND:
+        return HTML_PARSER_BACKEND
+    return "lxml" if LXML_AVAILABLE else "html.parser"
+
+
+class HtmlIndex:
+    """
+    Elements of a page indexed by id, class, tag and name attribute,
+    built in one walk over the tree. Lists keep document order.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup = soup
+        self.by_id: Dict[str, Tag] = {}
+        self.by_class: Dict[str, List[Tag]] = {}
+        self.by_tag: Dict[str, List[Tag]] = {}
+        self.by_name: Dict[str, List[Tag]] = {}
+
+        for el in soup.descendants:
+            if not isinstance(el, Tag):
+                continue
+
+            self.by_tag.setdefault(el.name, []).append(el)
+
+            el_id = el.get('id')
+            if el_id is not None and el_id not in self.by_id:
+                self.by_id[el_id] = el
+
+            for cls in el.get('class') or ():
+                self.by_class.setdefault(cls, []).append(el)
+
+            name = el.get('name')
+            if name is not None:
+                self.by_name.setdefault(name, []).append(el)
+
+    @classmethod
+    def from_html(cls, html_content: str, backend: Optional[str] = None) -> "HtmlIndex":
+        return cls(BeautifulSoup(html_content, backend or default_backend()))
+
+    def get(self, el_id: str, tag: Optional[str] = None) -> Optional[Tag]:
+        el = self.by_id.get(el_id)
+        if el is not None and tag is not None and el.name != tag:
+            return None
+        return el
+
+    def with_class(self, cls: str, tag: Optional[str] = None) -> List[Tag]:
+        elements = self.by_class.get(cls, [])
+        return elements if tag is None else [el for el in elements if el.name == tag]
+
+    def tagged(self, tag: str, **attrs) -> List[Tag]:
+        elements = self.by_tag.get(tag, [])
+        if attrs:
+            elements = [el for el in elements if all(el.get(k) == v for k, v in attrs.items())]
+        return elements
+
+    def named(self, name: str, tag: Optional[str] = None) -> List[Tag]:
+        elements = self.by_name.get(name, [])
+        return elements if tag is None else [el for el in elements if el.name == tag]
+
+
+class Selector(NamedTuple):
+    """One element tests can target; attributes the element lacks are None"""
+    purpose: str
+    id: Optional[str] = None
+    cls: Optional[str] = None
+    data_id: Optional[str] = None
+    name: Optional[str] = None
+    type: Optional[str] = None
+    value: Optional[str] = None
+
+
+class PageSelectors(NamedTuple):
+    buttons: Tuple[Selector, ...] = ()
+    inputs: Tuple[Selector, ...] = ()
+    product_cards: Tuple[Selector, ...] = ()
+    cart_elements: Tuple[Selector, ...] = ()
+    # Elements whose visibility or text shows the outcome of an action
+    status_elements: Tuple[Selector, ...] = ()
+
+
+def _intern(value) -> Optional[str]:
+    # Attribute values repeat across elements and cached pages - keep one copy of each
+    if value is None:
+        return None
+    if isinstance(value, list):
+        value = " ".join(value)
+    return sys.intern(value)
+
+
+def _selector(purpose: str, **attrs) -> Selector:
+    return Selector(_intern(purpose), **{k: _intern(v) for k, v in attrs.items()})
+
+
+def empty_structure() -> Dict:
+    return {'selectors': PageSelectors(), 'features': (), 'sha256': None, 'html_path': None}
+
 
 def parse_html_structure(html_path: str) -> Dict:
     """
     Parse YOUR Netflix checkout.html and extract all selectors.
+    The raw HTML stays on disk; load_raw_html() reads it back when needed.
     """
     try:
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
+        with open(html_path, 'rb') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error parsing HTML: {e}")
+        return empty_structure()
+
+    structure = parse_html_content(content.decode('utf-8', errors='replace'))
+    structure['sha256'] = hashlib.sha256(content).hexdigest()
+    structure['html_path'] = str(html_path)
+    return structure
+
+
+def load_raw_html(html_structure: Dict) -> Optional[str]:
+    """
+    The HTML a structure was parsed from, read from disk on demand.
+    None when it is not available any more or the file has changed since.
+    """
+    path = html_structure.get('html_path')
+    if not path:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except OSError:
+        return None
+    if hashlib.sha256(content).hexdigest() != html_structure.get('sha256'):
+        return None
+    return content.decode('utf-8', errors='replace')
+
+
+def parse_html_content(html_content: str) -> Dict:
+    """
+    Extract selectors and features from an HTML document already in memory.
+    The caller records where the document lives (sha256, html_path).
+    """
+    try:
+        index = HtmlIndex.from_html(html_content)
         
-        selectors = {
-            'buttons': [],
-            'inputs': [],
-            'product_cards': [],
-            'cart_elements': []
-        }
+        buttons = []
+        inputs = []
+        product_cards = []
+        cart_elements = []
+        status_elements = []
         
         # Extract Add to Cart buttons
-        for btn in soup.find_all('button', class_='btn-add'):
-            selectors['buttons'].append({
-                'class': 'btn-add',
-                'data-id': btn.get('data-id'),
-                'purpose': 'add_to_cart'
-            })
+        for btn in index.with_class('btn-add', 'button'):
+            buttons.append(_selector('add_to_cart', cls='btn-add', data_id=btn.get('data-id')))
         
         # Extract Apply Coupon button
-        apply_btn = soup.find('button', id='apply-coupon')
+        apply_btn = index.get('apply-coupon', 'button')
         if apply_btn:
-            selectors['buttons'].append({
-                'id': 'apply-coupon',
-                'class': apply_btn.get('class'),
-                'purpose': 'apply_coupon'
-            })
+            buttons.append(_selector('apply_coupon', id='apply-coupon', cls=apply_btn.get('class')))
         
         # Extract Pay Now button
-        pay_btn = soup.find('button', id='pay-now')
+        pay_btn = index.get('pay-now', 'button')
         if pay_btn:
-            selectors['buttons'].append({
-                'id': 'pay-now',
-                'class': pay_btn.get('class'),
-                'purpose': 'payment'
-            })
+            buttons.append(_selector('payment', id='pay-now', cls=pay_btn.get('class')))
         
         # Extract View Cart button
-        view_cart = soup.find('button', id='view-cart')
+        view_cart = index.get('view-cart', 'button')
         if view_cart:
-            selectors['buttons'].append({
-                'id': 'view-cart',
-                'purpose': 'view_cart'
-            })
+            buttons.append(_selector('view_cart', id='view-cart'))
         
         # Extract input fields
         inputs_map = {
@@ -64,78 +192,71 @@ def parse_html_structure(html_path: str) -> Dict:
         }
         
         for inp_id, purpose in inputs_map.items():
-            inp = soup.find(attrs={'id': inp_id})
+            inp = index.get(inp_id)
             if inp:
-                selectors['inputs'].append({
-                    'id': inp_id,
-                    'name': inp.get('name'),
-                    'type': inp.get('type') or inp.name,
-                    'purpose': purpose
-                })
+                inputs.append(_selector(purpose, id=inp_id, name=inp.get('name'),
+                                        type=inp.get('type') or inp.name))
         
         # Extract radio buttons
-        for radio in soup.find_all('input', type='radio'):
-            selectors['inputs'].append({
-                'id': radio.get('id'),
-                'name': radio.get('name'),
-                'value': radio.get('value'),
-                'type': 'radio',
-                'purpose': f"{radio.get('name')} selection"
-            })
+        for radio in index.tagged('input', type='radio'):
+            inputs.append(_selector(f"{radio.get('name')} selection", id=radio.get('id'),
+                                    name=radio.get('name'), value=radio.get('value'), type='radio'))
         
         # Extract product cards
-        for card in soup.find_all('div', class_='product-card'):
-            selectors['product_cards'].append({
-                'data-id': card.get('data-id'),
-                'class': 'product-card'
-            })
+        for card in index.with_class('product-card', 'div'):
+            product_cards.append(_selector('product_card', cls='product-card', data_id=card.get('data-id')))
         
         # Extract cart elements
-        cart_elements = ['cart-items', 'subtotal', 'shipping', 'cart-total']
-        for elem_id in cart_elements:
-            elem = soup.find(id=elem_id)
-            if elem:
-                selectors['cart_elements'].append({
-                    'id': elem_id,
-                    'purpose': elem_id.replace('-', ' ')
-                })
+        for elem_id in ['cart-items', 'subtotal', 'shipping', 'cart-total']:
+            if index.get(elem_id):
+                cart_elements.append(_selector(elem_id.replace('-', ' '), id=elem_id))
+        
+        # Extract payment details panels and the result message
+        for elem_id in ['card-fields', 'paypal-note', 'upi-fields', 'payment-result']:
+            if index.get(elem_id):
+                status_elements.append(_selector(elem_id.replace('-', ' '), id=elem_id))
         
         return {
-            'selectors': selectors,
-            'raw_html': html_content,
-            'features': extract_features_from_html(soup)
+            'selectors': PageSelectors(tuple(buttons), tuple(inputs), tuple(product_cards), tuple(cart_elements),
+                                       tuple(status_elements)),
+            'features': tuple(_intern(f) for f in extract_features_from_html(index)),
+            'sha256': None,
+            'html_path': None,
         }
     
     except Exception as e:
         print(f"Error parsing HTML: {e}")
-        return {'selectors': {}, 'raw_html': '', 'features': []}
+        return empty_structure()
+
 
+def extract_features_from_html(index: HtmlIndex) -> List[str]:
+    """Extract features present in the HTML (accepts an HtmlIndex or a BeautifulSoup tree)"""
+    if isinstance(index, BeautifulSoup):
+        index = HtmlIndex(index)
 
-def extract_features_from_html(soup: BeautifulSoup) -> List[str]:
-    """Extract features present in the HTML"""
     features = []
     
     # Check for products
-    products = soup.find_all('div', class_='product-card')
+    products = index.with_class('product-card', 'div')
     if products:
         features.append(f"Product Catalog ({len(products)} products)")
     
     # Check for coupon
-    if soup.find(id='coupon'):
+    if index.get('coupon'):
         features.append("Discount Coupon System")
     
     # Check for shipping options
-    if soup.find('input', attrs={'name': 'shipping'}):
+    if index.named('shipping', 'input'):
         features.append("Shipping Method Selection")
     
     # Check for payment options
-    payment_radios = soup.find_all('input', attrs={'name': 'payment'})
+    payment_radios = index.named('payment', 'input')
     if payment_radios:
         methods = [r.get('value') for r in payment_radios]
         features.append(f"Payment Methods: {', '.join(methods)}")
     
     # Check for form validation
-    if soup.find_all('div', class_='input-error'):
+    if index.with_class('input-error', 'div'):
         features.append("Form Validation")
     
     return features
@@ -1,102 +1,308 @@
 # backend/app/ingest_new.py
 
 from pathlib import Path
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Callable, Iterator, Optional
 from fastapi import UploadFile
-import pandas as pd
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import multiprocessing.connection
 import os
+import threading
+import time
 
-try:
-    import fitz  # PyMuPDF
-except:
-    fitz = None
-
-try:
-    from docx import Document
-except:
-    Document = None
-
-try:
-    from pptx import Presentation
-except:
-    Presentation = None
+from .chunking import TextSegment, iter_document_chunks, iter_segment_chunks
+from .config import EMBED_BATCH_SIZE, UPLOAD_CHUNK_SIZE, EXTRACT_WORKERS, EXTRACT_PROCESSES, EXTRACT_TIMEOUT
+# Extraction lives in a module of its own: every worker process imports it, and it
+# stays free of fastapi, pandas and the embedding stack so workers start quickly
+from .extractors import extract_worker
+from .processes import mp_context
+from .manifest import content_hash, load_manifest, new_manifest, save_manifest, manifest_compatible, set_kb_version
+from .resources import DEPS_AVAILABLE, get_embedding_model, get_collection
+from .lexical_index import LEXICAL
 
 UPLOAD_DIR = Path("uploaded_files")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Serializes KB builds so the manifest and the collection stay in step
+_BUILD_LOCK = threading.Lock()
+
+# Caps extraction processes across concurrent uploads
+_EXTRACT_SLOTS = threading.BoundedSemaphore(EXTRACT_PROCESSES)
+
+# Text extraction is blocking (PyMuPDF, python-docx, ...) so it runs on this pool, off the event loop
+_EXTRACT_POOL = None
+_EXTRACT_POOL_LOCK = threading.Lock()
+
+
+def _get_extract_pool() -> ThreadPoolExecutor:
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is None:
+            _EXTRACT_POOL = ThreadPoolExecutor(max_workers=EXTRACT_WORKERS, thread_name_prefix="extract")
+        return _EXTRACT_POOL
 
-async def save_uploaded_file(file: UploadFile, dest_dir: Union[str, Path] = UPLOAD_DIR) -> Path:
+
+async def save_uploaded_file(file: UploadFile,
+                             dest_dir: Union[str, Path] = UPLOAD_DIR,
+                             chunk_size: int = UPLOAD_CHUNK_SIZE) -> Path:
+    """Stream an upload to disk in fixed-size chunks without blocking the event loop"""
     dest_dir = Path(dest_dir)
     dest_dir.mkdir(parents=True, exist_ok=True)
 
-    file_path = dest_dir / file.filename
-    content = await file.read()
+    file_path = dest_dir / Path(file.filename).name
+    out = await run_in_threadpool(open, file_path, "wb")
 
-    with open(file_path, "wb") as f:
-        f.write(content)
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            await run_in_threadpool(out.write, chunk)
+    finally:
+        await run_in_threadpool(out.close)
 
     return file_path
 
-def extract_text_from_path(path: Union[str, Path]) -> str:
+
+async def extract_batch_async(paths: List[Union[str, Path]]) -> List[Dict]:
+    """Run extract_batch from the extraction thread pool, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_extract_pool(), extract_batch, paths)
+
+
+def shutdown_extract_pool():
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is not None:
+            _EXTRACT_POOL.shutdown(wait=False)
+            _EXTRACT_POOL = None
+
+
+def _failed(path: Union[str, Path], reason: str) -> Dict:
+    return {"filename": Path(path).name, "path": str(path), "error": f"[ERROR Extracting Text: {reason}]"}
+
+
+def extract_batch(paths: List[Union[str, Path]],
+                  workers: int = EXTRACT_PROCESSES,
+                  timeout: float = EXTRACT_TIMEOUT) -> List[Dict]:
     """
-    Extract text from various file types including .md and .json
+    Extract many files in parallel worker processes and return their
+    extract_segments_to_file summaries in input order.
+
+    Each file runs in its own short-lived process, at most `workers` at a
+    time across the whole server, so a parser that hangs is killed after
+    `timeout` seconds and one that crashes (e.g. a corrupt PDF taking
+    PyMuPDF down) only fails its own file. Failed files come back as
+    {"filename", "path", "error"}.
     """
-    p = Path(path)
-    ext = p.suffix.lower()
+    ctx = mp_context()
+    results = [None] * len(paths)
+    pending = list(enumerate(paths))
+    running = {}
 
     try:
-        if ext == ".pdf" and fitz:
-            doc = fitz.open(str(p))
-            return "\n".join([page.get_text() for page in doc])
-
-        if ext == ".docx" and Document:
-            return "\n".join([para.text for para in Document(str(p)).paragraphs])
-
-        if ext in [".ppt", ".pptx"] and Presentation:
-            ppt = Presentation(str(p))
-            out = []
-            for slide in ppt.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text:
-                        out.append(shape.text)
-            return "\n".join(out)
-
-        if ext == ".txt":
-            return p.read_text(encoding="utf-8", errors="ignore")
-        
-        if ext == ".md":
-            # Markdown files - read as plain text
-            return p.read_text(encoding="utf-8", errors="ignore")
-        
-        if ext == ".json":
-            # JSON files - read as plain text
-            return p.read_text(encoding="utf-8", errors="ignore")
-
-        if ext == ".csv":
-            df = pd.read_csv(p)
-            return "\n".join(df.astype(str).values.flatten())
-
-        return "[UNSUPPORTED FILE TYPE]"
-    except Exception as e:
-        return f"[ERROR Extracting Text: {e}]"
-
-
-def build_vector_store_from_texts(items: List[Dict]) -> int:
-    try:
-        import chromadb
-        from sentence_transformers import SentenceTransformer
-    except:
-        return len(items)
+        while pending or running:
+            while pending and len(running) < workers and _EXTRACT_SLOTS.acquire(blocking=not running):
+                index, path = pending.pop(0)
+                recv, send = ctx.Pipe(duplex=False)
+                proc = ctx.Process(target=extract_worker, args=(str(path), send), daemon=True)
+                try:
+                    proc.start()
+                except Exception:
+                    _EXTRACT_SLOTS.release()
+                    raise
+                send.close()
+                running[index] = (proc, recv, time.monotonic() + timeout, path)
+
+            if not running:
+                continue
+
+            next_deadline = min(deadline for _, _, deadline, _ in running.values())
+            handles = [h for proc, recv, _, _ in running.values() for h in (recv, proc.sentinel)]
+            multiprocessing.connection.wait(handles, timeout=max(next_deadline - time.monotonic(), 0))
+
+            now = time.monotonic()
+            for index, (proc, recv, deadline, path) in list(running.items()):
+                if recv.poll():
+                    try:
+                        results[index] = recv.recv()
+                    except EOFError:
+                        results[index] = _failed(path, "worker exited without a result")
+                elif not proc.is_alive():
+                    results[index] = _failed(path, f"worker crashed (exit code {proc.exitcode})")
+                elif now >= deadline:
+                    proc.terminate()
+                    results[index] = _failed(path, f"timed out after {timeout:g}s")
+                else:
+                    continue
+
+                proc.join()
+                recv.close()
+                _EXTRACT_SLOTS.release()
+                del running[index]
+    finally:
+        for proc, recv, _, _ in running.values():
+            proc.terminate()
+            proc.join()
+            recv.close()
+            _EXTRACT_SLOTS.release()
+
+    return results
+
+
+def iter_saved_segments(segments_path: Union[str, Path]) -> Iterator[TextSegment]:
+    with open(segments_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            yield TextSegment(record["text"], record["provenance"])
+
+
+def iter_item_chunks(item: Dict) -> Iterator[Dict]:
+    """Chunks of a KB item: streamed from its segment sidecar, or from in-memory text"""
+    if item.get("segments_path"):
+        return iter_segment_chunks(item["filename"], iter_saved_segments(item["segments_path"]))
+    return iter_document_chunks(item["filename"], item["text"])
+
+
+def item_size(item: Dict) -> int:
+    return item["chars"] if "chars" in item else len(item["text"])
+
+
+def _embed_and_upsert(collection, model, chunks: List[Dict], batch_size: int) -> int:
+    docs = [c["text"] for c in chunks]
+    vecs = model.encode(docs, batch_size=batch_size).tolist()
+
+    collection.upsert(
+        ids=[c["id"] for c in chunks],
+        embeddings=vecs,
+        documents=docs,
+        metadatas=[c["metadata"] for c in chunks]
+    )
+    LEXICAL.upsert([c["id"] for c in chunks], docs, [c["metadata"] for c in chunks], [c["hash"] for c in chunks])
+    return len(chunks)
+
+
+def build_vector_store_from_texts(items: List[Dict],
+                                  batch_size: int = EMBED_BATCH_SIZE,
+                                  prune: bool = False,
+                                  progress: Optional[Callable] = None) -> Dict:
+    """
+    Incrementally sync documents into the vector store.
+
+    Each document is chunked and every chunk is hashed; only chunks whose
+    hash differs from the persisted manifest are embedded (in bounded
+    batches). Chunks that disappeared from a changed document are deleted,
+    and with prune=True so are documents that are no longer in items.
+    progress(docs=, chunks=, bytes_processed=) is called as work completes
+    and may raise to abort the build between batches.
+    The BM25 index (lexical_index.py) gets the same writes and deletes; documents
+    it does not fully cover yet are indexed there without re-embedding.
+    Returns counts of added, skipped and removed chunks.
+    """
+    stats = {"added": 0, "skipped": 0, "removed": 0}
+    report = progress or (lambda **counts: None)
+
+    if not DEPS_AVAILABLE:
+        return stats
+
+    embeddings = get_embedding_model()
+    collection = get_collection()
+
+    with _BUILD_LOCK:
+        manifest = load_manifest()
+        version = manifest.get("kb_version", 0)
+        touched = False
+
+        try:
+            # Vectors from another model or chunking setup are stale - rebuild everything
+            if not manifest_compatible(manifest):
+                for entry in manifest["documents"].values():
+                    collection.delete(ids=list(entry["chunks"]))
+                LEXICAL.clear()
+                manifest = new_manifest()
+                touched = True
+
+            documents = manifest["documents"]
+
+            for item in items:
+                filename = item["filename"]
+                doc_hash = item.get("hash") or content_hash(item["text"])
+                entry = documents.get(filename)
+
+                if entry and entry["hash"] == doc_hash:
+                    stats["skipped"] += len(entry["chunks"])
+                    if not LEXICAL.covers(entry["chunks"]):
+                        # Embedded before the lexical index existed (or it was lost)
+                        chunks = list(iter_item_chunks(item))
+                        LEXICAL.upsert([c["id"] for c in chunks], [c["text"] for c in chunks],
+                                       [c["metadata"] for c in chunks], [content_hash(c["text"]) for c in chunks])
+                        touched = True
+                    report(docs=1, bytes_processed=item_size(item))
+                    continue
+
+                if entry:
+                    old_chunks = entry["chunks"]
+                else:
+                    # Not tracked yet - clear anything left by pre-manifest builds
+                    old_chunks = {}
+                    touched = True
+                    collection.delete(ids=[filename])
+                    collection.delete(where={"source": filename})
+                    LEXICAL.delete(where={"source": filename})
+
+                new_chunks = {}
+                pending = []
+                for chunk in iter_item_chunks(item):
+                    chunk_hash = content_hash(chunk["text"])
+                    new_chunks[chunk["id"]] = chunk_hash
+                    chunk["hash"] = chunk_hash
+
+                    if old_chunks.get(chunk["id"]) == chunk_hash:
+                        stats["skipped"] += 1
+                        continue
+
+                    pending.append(chunk)
+                    if len(pending) >= batch_size:
+                        report()
+                        written = _embed_and_upsert(collection, embeddings, pending, batch_size)
+                        stats["added"] += written
+                        report(chunks=written)
+                        pending = []
+
+                if pending:
+                    report()
+                    written = _embed_and_upsert(collection, embeddings, pending, batch_size)
+                    stats["added"] += written
+                    report(chunks=written)
 
-    embeddings = SentenceTransformer("all-MiniLM-L6-v2")
+                stale = [cid for cid in old_chunks if cid not in new_chunks]
+                if stale:
+                    collection.delete(ids=stale)
+                    LEXICAL.delete(ids=stale)
+                    stats["removed"] += len(stale)
 
-    client = chromadb.PersistentClient(path="vector_store")
-    collection = client.get_or_create_collection("docs")
+                documents[filename] = {"hash": doc_hash, "chunks": new_chunks}
+                save_manifest(manifest)
+                report(docs=1, bytes_processed=item_size(item))
 
-    docs = [item["text"] for item in items]
-    ids = [item["filename"] for item in items]
-    vecs = embeddings.encode(docs).tolist()
+            if prune:
+                keep = {item["filename"] for item in items}
+                for filename in [f for f in documents if f not in keep]:
+                    stale = list(documents.pop(filename)["chunks"])
+                    if stale:
+                        collection.delete(ids=stale)
+                        LEXICAL.delete(ids=stale)
+                    stats["removed"] += len(stale)
 
-    collection.upsert(ids=ids, embeddings=vecs, documents=docs)
+        finally:
+            # Any write to the collection - even from a cancelled or failed build -
+            # bumps the KB version so cached retrieval results are invalidated
+            if touched or stats["added"] or stats["removed"]:
+                manifest["kb_version"] = version + 1
+                set_kb_version(version + 1)
+            save_manifest(manifest)
+            LEXICAL.save()
 
-    return len(items)
+    return stats
@@ -0,0 +1,156 @@
+# backend/app/jobs.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .config import KB_BUILD_WORKERS, JOB_HISTORY_LIMIT
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's work function once cancellation was requested"""
+
+
+class Job:
+    """State and progress counters of one background job"""
+
+    def __init__(self, kind: str, total_bytes: int = 0, total_docs: int = 0):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+        self.total_docs = total_docs
+        self.total_bytes = total_bytes
+        self.docs_extracted = 0
+        self.bytes_processed = 0
+        self.chunks_embedded = 0
+
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def report(self, docs: int = 0, chunks: int = 0, bytes_processed: int = 0):
+        """Progress callback for the work function; raises JobCancelled when cancelled"""
+        with self._lock:
+            self.docs_extracted += docs
+            self.chunks_embedded += chunks
+            self.bytes_processed += bytes_processed
+
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self) -> bool:
+        if self.finished:
+            return False
+
+        self._cancel.set()
+        # A job that has not started yet is dropped from the queue immediately
+        if self._future is not None and self._future.cancel():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+        return True
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+
+            throughput = self.chunks_embedded / elapsed if elapsed > 0 else 0.0
+
+            eta = None
+            if self.status == "running" and self.total_bytes and self.bytes_processed:
+                remaining = max(self.total_bytes - self.bytes_processed, 0)
+                eta = round(elapsed * remaining / self.bytes_processed, 1)
+
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": {
+                    "docs_total": self.total_docs,
+                    "docs_extracted": self.docs_extracted,
+                    "chunks_embedded": self.chunks_embedded,
+                    "bytes_total": self.total_bytes,
+                    "bytes_processed": self.bytes_processed,
+                },
+                "elapsed_seconds": round(elapsed, 2),
+                "chunks_per_second": round(throughput, 2),
+                "eta_seconds": eta,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool. KB builds are CPU-heavy (embedding
+    uses every core), so by default only one runs at a time and the rest queue.
+    """
+
+    def __init__(self, max_workers: int = KB_BUILD_WORKERS, history: int = JOB_HISTORY_LIMIT):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._history = history
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, fn: Callable[[Job], Dict]) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+            job._future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def shutdown(self):
+        # Cancelling every job also drops the ones still queued in the executor
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job: Job, fn: Callable[[Job], Dict]):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job)
+            job.status = "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _evict(self):
+        # Keep a bounded history; never drop jobs that are still queued or running
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        while len(self._jobs) > self._history and finished:
+            del self._jobs[finished.pop(0)]
@@ -0,0 +1,211 @@
+# backend/app/lexical_index.py
+#
+# BM25 inverted index over the same chunks as the vector store, kept in step
+# with it by build_vector_store_from_texts. Exact tokens such as coupon codes
+# ("SAVE15") and element ids are matched here, where embeddings blur them;
+# rag.py fuses both rankings with reciprocal rank fusion.
+
+import json
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .config import LEXICAL_INDEX_PATH, BM25_K1, BM25_B, LEXICAL_ONLY_MAX_TERMS
+from .vector_store import metadata_matches
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# Surrounding punctuation a code is often quoted with: 'SAVE15', (TC-001)
+QUOTES = "'\"`()[],;:"
+
+
+def is_exact_token(word: str) -> bool:
+    """
+    Words that name something exactly rather than describe it: codes with
+    digits (SAVE15, TC-001), upper-case names (UPI), ids joined by - or _
+    (cart-total, pay_now) and CSS selectors (#coupon, .btn-add).
+    """
+    word = word.strip(QUOTES)
+    if not word:
+        return False
+    return (word[0] in "#." or any(c.isdigit() for c in word)
+            or "-" in word.strip("-") or "_" in word.strip("_")
+            or (len(word) > 1 and word.isupper()))
+
+
+class LexicalIndex:
+    """Incremental BM25 index, persisted as per-chunk term frequencies"""
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = False
+
+        self._docs: Dict[str, Dict] = {}               # id -> {"hash", "metadata", "tf"}
+        self._postings: Dict[str, Dict[str, int]] = {}  # term -> {id: tf}
+        self._lengths: Dict[str, int] = {}             # id -> number of terms
+        self._total_len = 0
+
+    # --------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for id_, doc in json.load(f).get("docs", {}).items():
+                            self._add(id_, doc)
+                except (OSError, ValueError) as e:
+                    # The next /build_kb re-indexes whatever is missing
+                    print(f"⚠ Warning: could not read lexical index ({e}), starting empty")
+                    self._docs, self._postings, self._lengths, self._total_len = {}, {}, {}, 0
+            self._loaded = True
+
+    def save(self):
+        """Write the index atomically if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"docs": self._docs}, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    # --------------------------------------------------------------
+    # Updates (same shape as the collection calls they mirror)
+    # --------------------------------------------------------------
+
+    def _add(self, id_: str, doc: Dict):
+        self._docs[id_] = doc
+        for term, tf in doc["tf"].items():
+            self._postings.setdefault(term, {})[id_] = tf
+        self._lengths[id_] = sum(doc["tf"].values())
+        self._total_len += self._lengths[id_]
+
+    def _remove(self, id_: str):
+        doc = self._docs.pop(id_, None)
+        if doc is None:
+            return
+        for term in doc["tf"]:
+            postings = self._postings[term]
+            del postings[id_]
+            if not postings:
+                del self._postings[term]
+        self._total_len -= self._lengths.pop(id_)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict], hashes: List[str]):
+        self._ensure_loaded()
+        with self._lock:
+            for id_, text, metadata, hash_ in zip(ids, documents, metadatas, hashes):
+                tf = {}
+                for term in tokenize(text):
+                    tf[term] = tf.get(term, 0) + 1
+                self._remove(id_)
+                self._add(id_, {"hash": hash_, "metadata": metadata, "tf": tf})
+            self._dirty = True
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        self._ensure_loaded()
+        with self._lock:
+            doomed = [i for i in (ids or []) if i in self._docs]
+            if where:
+                doomed += [i for i, doc in self._docs.items() if metadata_matches(doc["metadata"], where)]
+            for id_ in doomed:
+                self._remove(id_)
+            self._dirty = self._dirty or bool(doomed)
+
+    def clear(self):
+        self._ensure_loaded()
+        with self._lock:
+            self._dirty = self._dirty or bool(self._docs)
+            self._docs, self._postings, self._lengths, self._total_len = {}, {}, {}, 0
+
+    def covers(self, chunks: Dict[str, str]) -> bool:
+        """True if every chunk id -> hash in chunks is indexed with that hash"""
+        self._ensure_loaded()
+        with self._lock:
+            return all(self._docs.get(id_, {}).get("hash") == hash_ for id_, hash_ in chunks.items())
+
+    # --------------------------------------------------------------
+    # Search
+    # --------------------------------------------------------------
+
+    def keyword_only(self, prompt: str) -> bool:
+        """
+        Pure keyword lookups - at most LEXICAL_ONLY_MAX_TERMS words, each an
+        exact token (see is_exact_token) found in the index - are answered
+        from this index alone, without embedding the prompt. Prompts with
+        ordinary words ("apply discount code") always go to vector search too.
+        """
+        words = prompt.split()
+        if not words or len(words) > LEXICAL_ONLY_MAX_TERMS or not all(is_exact_token(w) for w in words):
+            return False
+        terms = tokenize(prompt)
+        if not terms:
+            return False
+        self._ensure_loaded()
+        with self._lock:
+            return all(term in self._postings for term in terms)
+
+    def search(self, terms: List[str], n_results: int, where: Optional[Dict] = None) -> List[Tuple[str, float]]:
+        """Top n_results (id, BM25 score) for the query terms, best first"""
+        self._ensure_loaded()
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not terms:
+                return []
+            avg_len = self._total_len / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for id_, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[id_] / avg_len)
+                    scores[id_] = scores.get(id_, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            if where:
+                scores = {i: s for i, s in scores.items() if metadata_matches(self._docs[i]["metadata"], where)}
+            return sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:n_results]
+
+    def stats(self) -> Dict:
+        self._ensure_loaded()
+        with self._lock:
+            return {"chunks": len(self._docs), "terms": len(self._postings),
+                    "avg_chunk_terms": round(self._total_len / len(self._docs), 1) if self._docs else 0.0}
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int) -> List[Tuple[str, float]]:
+    """Merge ranked id lists: each id scores sum(1 / (k + rank)) over the lists it appears in"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, 1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
+
+
+LEXICAL = LexicalIndex()
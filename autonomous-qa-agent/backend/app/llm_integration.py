@@ -5,10 +5,25 @@
 # =====================================================
 
 import os
+import re
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict) -> List[Dict]:
+from . import script_templates
+from .step_rules import KeywordMatcher, compile_step
+
+# Prompt keywords that trigger each group of test cases (substring match)
+COUPON_WORDS = frozenset(['coupon', 'discount', 'save15', 'code'])
+CART_WORDS = frozenset(['cart', 'add', 'product', 'shopping'])
+SHIPPING_WORDS = frozenset(['shipping', 'express', 'standard', 'delivery'])
+PAYMENT_WORDS = frozenset(['payment', 'pay', 'checkout', 'card', 'paypal', 'upi'])
+VALIDATION_WORDS = frozenset(['validation', 'form', 'required', 'error', 'field'])
+FLOW_WORDS = frozenset(['complete', 'full', 'end-to-end', 'entire', 'whole'])
+PROMPT_MATCHER = KeywordMatcher(COUPON_WORDS | CART_WORDS | SHIPPING_WORDS | PAYMENT_WORDS
+                                | VALIDATION_WORDS | FLOW_WORDS)
+
+def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict,
+                                 grounded_in: Optional[str] = None) -> List[Dict]:
     """
     Generate test cases in EXACT format required by Assignment 1:
     
@@ -17,20 +32,24 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
     Test_Scenario: [scenario]
     Expected_Result: [result]
     Grounded_In: [document]
+
+    grounded_in is the source document of the retrieved context (from the
+    chunk metadata); without it the context text is scanned for keywords.
     """
     
     selectors = html_structure.get('selectors', {})
     features = html_structure.get('features', [])
     
     prompt_lower = prompt.lower()
+    found = PROMPT_MATCHER.find(prompt_lower)
     test_cases = []
     test_counter = 1
     
     # Extract grounding document
-    grounded_in = extract_source_doc(context)
+    grounded_in = grounded_in or extract_source_doc(context)
     
     # Coupon/Discount tests
-    if any(word in prompt_lower for word in ['coupon', 'discount', 'save15', 'code']):
+    if found & COUPON_WORDS:
         
         # Positive test case
         test_cases.append({
@@ -82,7 +101,7 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
         test_counter += 1
     
     # Shopping Cart tests
-    if any(word in prompt_lower for word in ['cart', 'add', 'product', 'shopping']):
+    if found & CART_WORDS:
         test_cases.append({
             "Test_ID": f"TC-{test_counter:03d}",
             "Feature": "Shopping Cart",
@@ -108,7 +127,7 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
         test_counter += 1
     
     # Shipping method tests
-    if any(word in prompt_lower for word in ['shipping', 'express', 'standard', 'delivery']):
+    if found & SHIPPING_WORDS:
         test_cases.append({
             "Test_ID": f"TC-{test_counter:03d}",
             "Feature": "Shipping Method Selection",
@@ -153,7 +172,7 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
         test_counter += 1
     
     # Payment method tests
-    if any(word in prompt_lower for word in ['payment', 'pay', 'checkout', 'card', 'paypal', 'upi']):
+    if found & PAYMENT_WORDS:
         test_cases.append({
             "Test_ID": f"TC-{test_counter:03d}",
             "Feature": "Payment Method Selection",
@@ -215,7 +234,7 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
         test_counter += 1
     
     # Form validation tests
-    if any(word in prompt_lower for word in ['validation', 'form', 'required', 'error', 'field']):
+    if found & VALIDATION_WORDS:
         test_cases.append({
             "Test_ID": f"TC-{test_counter:03d}",
             "Feature": "Form Validation",
@@ -265,7 +284,7 @@ def generate_test_cases_with_llm(prompt: str, context: str, html_structure: Dict
         test_counter += 1
     
     # Complete checkout flow
-    if any(word in prompt_lower for word in ['complete', 'full', 'end-to-end', 'entire', 'whole']):
+    if found & FLOW_WORDS:
         test_cases.append({
             "Test_ID": f"TC-{test_counter:03d}",
             "Feature": "Complete Checkout Flow",
@@ -371,267 +390,93 @@ def format_test_case_for_display(test_case: Dict) -> str:
 # Keep existing selenium generation functions...
 # (Copy the rest from previous llm_integration.py)
 
-def generate_selenium_with_html(test_case: Dict, html_structure: Dict) -> str:
-    """Generate high-quality Selenium script"""
-    
-    test_id = test_case.get("Test_ID", "TC-000")
-    feature = test_case.get("Feature", "Test")
-    scenario = test_case.get("Test_Scenario", "")
-    steps = test_case.get("Steps", [])
-    expected = test_case.get("Expected_Result", "")
-    grounded_in = test_case.get("Grounded_In", "documentation")
-    
-    script = f'''"""
-NetCart Checkout - Automated Test
-=====================================
-Test ID: {test_id}
-Feature: {feature}
-Scenario: {scenario}
-Expected Result: {expected}
-Grounded In: {grounded_in}
-
-This test script was automatically generated from documentation-grounded test cases.
-All selectors are extracted from the actual checkout.html file.
-"""
-
-from selenium import webdriver
+# Update this path to match your local checkout.html location
+DEFAULT_BASE_URL = "file:///C:/Users/prave/Projects/autonomous-qa-agent/target_site/checkout.html"
+
+SELENIUM_IMPORTS = """from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
 import sys
+import os"""
 
+# Test_IDs come from clients; they only reach code as identifiers and file names built from these
+NOT_IDENTIFIER = re.compile(r"[^A-Za-z0-9_]")
+FILE_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def _header_values(test_case: Dict, fast: bool = False, html_structure: Optional[Dict] = None) -> Dict:
+    test_id = str(test_case.get("Test_ID", "TC-000"))
+    return {
+        "test_id": test_id,
+        "file_id": FILE_UNSAFE.sub("_", test_id),
+        "feature": test_case.get("Feature", "Test"),
+        "scenario": test_case.get("Test_Scenario", ""),
+        "expected": test_case.get("Expected_Result", ""),
+        "grounded_in": test_case.get("Grounded_In", "documentation"),
+        "class_name": selenium_class_name(test_case),
+        "method_name": selenium_method_name(test_case),
+        "imports": SELENIUM_IMPORTS,
+        "default_base_url": (html_structure or {}).get("url") or DEFAULT_BASE_URL,
+        # Leaves the final state on screen for a moment when watching a run
+        "final_pause": "" if fast else "            time.sleep(2)\n",
+    }
+
+
+def selenium_script_header(test_case: Dict) -> str:
+    """Module docstring and imports of a generated script"""
+    return script_templates.HEADER.render(**_header_values(test_case))
+
+
+def selenium_class_name(test_case: Dict) -> str:
+    """Python identifier for the Test_ID: TC-001 -> TC_001 (anything but [A-Za-z0-9_] becomes _)"""
+    name = NOT_IDENTIFIER.sub("_", str(test_case.get("Test_ID", "TC-000")))
+    return name if name[:1].isalpha() or name[:1] == "_" else "TC_" + name
+
+
+def selenium_method_name(test_case: Dict) -> str:
+    return "test_" + NOT_IDENTIFIER.sub("_", str(test_case.get("Test_ID", "TC-000"))).lower()
+
+
+def _render_selenium_class(out: List[str], values: Dict, steps: List[str], html_structure: Dict,
+                           fast: bool = False):
+    script_templates.CLASS_HEAD.render_into(out, values)
 
-class {test_id.replace("-", "_")}:
-    """Test class for {feature}"""
-    
-    def __init__(self):
-        """Initialize WebDriver and test configuration"""
-        self.driver = webdriver.Chrome()
-        self.driver.maximize_window()
-        self.wait = WebDriverWait(self.driver, 10)
-        
-        # Update this path to match your local checkout.html location
-        self.base_url = "file:///C:/Users/prave/Projects/autonomous-qa-agent/target_site/checkout.html"
-        
-        self.test_passed = True
-        self.errors = []
-    
-    def log(self, message):
-        """Log test progress"""
-        print(f"[{test_id}] {{message}}")
-    
-    def assert_element(self, by, selector, message="Element should be present"):
-        """Assert element exists"""
-        try:
-            element = self.wait.until(EC.presence_of_element_located((by, selector)))
-            self.log(f"✓ {{message}}")
-            return element
-        except TimeoutException:
-            self.log(f"✗ FAILED: {{message}} - Selector: {{selector}}")
-            self.errors.append(f"Element not found: {{selector}}")
-            self.test_passed = False
-            return None
-    
-    def test_{test_id.lower().replace("-", "_")}(self):
-        """
-        Test Scenario: {scenario}
-        
-        Expected Result: {expected}
-        """
-        driver = self.driver
-        wait = self.wait
-        
-        try:
-            self.log("=" * 60)
-            self.log(f"Starting Test: {test_id}")
-            self.log(f"Feature: {feature}")
-            self.log("=" * 60)
-            
-'''
-    
     # Generate step-by-step code
     for i, step in enumerate(steps, 1):
-        script += f'''            # Step {i}: {step}
-            self.log("Step {i}: {step}")
-'''
-        script += generate_selenium_code_for_step(step, html_structure)
-        script += "\n"
-    
-    script += f'''            
-            # Final Verification
-            self.log("=" * 60)
-            if self.test_passed:
-                self.log("✓✓✓ TEST PASSED ✓✓✓")
-                self.log(f"Expected Result Achieved: {expected}")
-            else:
-                self.log("✗✗✗ TEST FAILED ✗✗✗")
-                for error in self.errors:
-                    self.log(f"  - {{error}}")
-            
-            self.log("=" * 60)
-            time.sleep(2)
-            
-            return self.test_passed
-            
-        except TimeoutException as e:
-            self.log(f"✗ Test Failed - Element Timeout: {{e}}")
-            driver.save_screenshot(f"{test_id}_timeout.png")
-            self.log(f"Screenshot saved: {test_id}_timeout.png")
-            return False
-            
-        except Exception as e:
-            self.log(f"✗ Test Failed - Unexpected Error: {{e}}")
-            driver.save_screenshot(f"{test_id}_error.png")
-            self.log(f"Screenshot saved: {test_id}_error.png")
-            return False
-            
-        finally:
-            self.log("Closing browser...")
-            driver.quit()
-
-
-def main():
-    """Main test execution"""
-    test = {test_id.replace("-", "_")}()
-    result = test.test_{test_id.lower().replace("-", "_")}()
-    
-    sys.exit(0 if result else 1)
+        script_templates.STEP_HEAD.render_into(out, {"number": i, "step": step})
+        out.append(generate_selenium_code_for_step(step, html_structure, fast))
+        out.append("\n")
 
+    script_templates.CLASS_TAIL.render_into(out, values)
 
-if __name__ == "__main__":
-    main()
-'''
-    
-    return script
 
+def generate_selenium_class(test_case: Dict, html_structure: Dict, fast: bool = False) -> str:
+    """
+    Generate the test class for one test case. The class starts its own
+    Chrome unless a driver (e.g. from a pytest fixture) is passed in.
+    fast=True leaves out every fixed time.sleep() pause.
+    """
+    out = []
+    _render_selenium_class(out, _header_values(test_case, fast, html_structure), test_case.get("Steps", []),
+                           html_structure, fast)
+    return "".join(out)
+
+
+def generate_selenium_with_html(test_case: Dict, html_structure: Dict, fast: bool = False) -> str:
+    """Generate high-quality Selenium script"""
+    values = _header_values(test_case, fast, html_structure)
 
-def generate_selenium_code_for_step(step: str, html_structure: Dict) -> str:
+    out = []
+    script_templates.HEADER.render_into(out, values)
+    out.append("\n\n")
+    _render_selenium_class(out, values, test_case.get("Steps", []), html_structure, fast)
+    script_templates.MAIN.render_into(out, values)
+    return "".join(out)
+
+
+def generate_selenium_code_for_step(step: str, html_structure: Dict, fast: bool = False) -> str:
     """Generate Selenium code for each step using actual selectors"""
-    
-    step_lower = step.lower()
-    
-    # Navigate
-    if "navigate" in step_lower or "open" in step_lower:
-        return '''            driver.get(self.base_url)
-            time.sleep(1)
-'''
-    
-    # Add to cart
-    if ("add" in step_lower or "click" in step_lower) and "cart" in step_lower:
-        return '''            add_btn = self.assert_element(By.CSS_SELECTOR, ".btn-add", "Add to Cart button found")
-            if add_btn:
-                add_btn.click()
-                time.sleep(1)
-'''
-    
-    # Enter coupon
-    if "coupon" in step_lower and ("enter" in step_lower or "save15" in step_lower):
-        return '''            coupon_input = self.assert_element(By.ID, "coupon", "Coupon input field found")
-            if coupon_input:
-                coupon_input.clear()
-                coupon_input.send_keys("SAVE15")
-                time.sleep(0.5)
-'''
-    
-    # Click Apply coupon
-    if "apply" in step_lower and "coupon" in step_lower:
-        return '''            apply_btn = self.assert_element(By.ID, "apply-coupon", "Apply Coupon button found")
-            if apply_btn:
-                apply_btn.click()
-                time.sleep(1)
-'''
-    
-    # Fill name
-    if "name" in step_lower and ("fill" in step_lower or "enter" in step_lower):
-        return '''            name_input = self.assert_element(By.ID, "name", "Name field found")
-            if name_input:
-                name_input.clear()
-                name_input.send_keys("John Doe")
-'''
-    
-    # Fill email
-    if "email" in step_lower and ("fill" in step_lower or "enter" in step_lower):
-        return '''            email_input = self.assert_element(By.ID, "email", "Email field found")
-            if email_input:
-                email_input.clear()
-                email_input.send_keys("john.doe@example.com")
-'''
-    
-    # Fill address
-    if "address" in step_lower and ("fill" in step_lower or "enter" in step_lower):
-        return '''            address_input = self.assert_element(By.ID, "address", "Address field found")
-            if address_input:
-                address_input.clear()
-                address_input.send_keys("123 Main Street, City, State 12345")
-'''
-    
-    # Express shipping
-    if "express" in step_lower and "shipping" in step_lower:
-        return '''            express_radio = self.assert_element(By.ID, "ship-express", "Express shipping option found")
-            if express_radio:
-                express_radio.click()
-                time.sleep(0.5)
-'''
-    
-    # Standard shipping verify
-    if "standard" in step_lower and ("verify" in step_lower or "default" in step_lower):
-        return '''            standard_radio = driver.find_element(By.ID, "ship-standard")
-            if standard_radio.is_selected():
-                self.log("✓ Standard shipping is selected by default")
-            else:
-                self.log("✗ Standard shipping should be default")
-                self.test_passed = False
-'''
-    
-    # Credit card
-    if ("credit" in step_lower or "card" in step_lower) and "select" in step_lower:
-        return '''            card_radio = self.assert_element(By.ID, "pay-card", "Credit card option found")
-            if card_radio:
-                card_radio.click()
-                time.sleep(0.5)
-'''
-    
-    # Card number
-    if "card number" in step_lower or "enter card" in step_lower:
-        return '''            card_input = self.assert_element(By.ID, "card-number", "Card number field found")
-            if card_input:
-                card_input.clear()
-                card_input.send_keys("4111111111111111")
-'''
-    
-    # Pay Now
-    if "pay now" in step_lower:
-        return '''            pay_btn = self.assert_element(By.ID, "pay-now", "Pay Now button found")
-            if pay_btn:
-                pay_btn.click()
-                time.sleep(2)
-'''
-    
-    # Verify success
-    if "success" in step_lower or ("verify" in step_lower and "message" in step_lower):
-        return '''            success_msg = self.assert_element(By.ID, "payment-result", "Success message found")
-            if success_msg and "Successful" in success_msg.text:
-                self.log("✓ Payment success message verified")
-            else:
-                self.log("✗ Success message not displayed correctly")
-                self.test_passed = False
-'''
-    
-    # Verify discount/total
-    if "verify" in step_lower and ("discount" in step_lower or "total" in step_lower):
-        return '''            cart_total = driver.find_element(By.ID, "cart-total")
-            self.log(f"Cart total: {cart_total.text}")
-'''
-    
-    # Generic verification
-    if "verify" in step_lower:
-        return '''            # Verification step
-            time.sleep(0.5)
-'''
-    
-    # Default
-    return f'''            # {step}
-            time.sleep(0.5)
-'''
\ No newline at end of file
+    return compile_step(step, fast=fast, html_structure=html_structure)
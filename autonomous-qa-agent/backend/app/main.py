@@ -1,16 +1,44 @@
 # backend/app/main.py
 
-from .rag import set_html_structure
 from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from typing import List
+import asyncio
+import io
 import os
-from .ingest_new import save_uploaded_file, extract_text_from_path, build_vector_store_from_texts
-from .rag import generate_test_cases_from_prompt
-from .generator import create_selenium_script
+from .ingest_new import save_uploaded_file, extract_batch_async, build_vector_store_from_texts, item_size, shutdown_extract_pool
+from .rag import generate_grounded_test_cases, generate_test_cases_batch, load_query_cache, save_query_cache, QUERY_CACHE, RESULT_CACHE
+from .generator import (
+    create_selenium_script, create_selenium_test_module, create_selenium_bundle_zip, unique_test_cases, DRIVER_MODES
+)
+from .resources import warm_up, shutdown
+from .embedding_service import EMBEDDINGS
+from .jobs import Job, JobManager
+from .manifest import get_kb_version
+from .runner import scripts_from_test_cases, select_shard, run_scripts, serve_directory, summarize, write_reports
+from .dom_sim import simulate_test_cases, summarize_simulation, PAGE_MODELS
+from .targets import TARGETS, is_url, deep_sizeof
+from .config import MAX_BATCH_SIZE, RUN_WORKERS, RUN_MAX_WORKERS, RUN_TEST_TIMEOUT, TARGET_SITE_DIR
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and vector store before serving requests
+    await run_in_threadpool(warm_up)
+    load_query_cache()
+    yield
+    save_query_cache()
+    JOBS.shutdown()
+    TEST_RUNS.shutdown()
+    shutdown_extract_pool()
+    EMBEDDINGS.shutdown()
+    shutdown()
 
-app = FastAPI(title="Autonomous QA Agent")
+
+app = FastAPI(title="Autonomous QA Agent", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,13 +49,17 @@ app.add_middleware(
 )
 
 UPLOADED_DOCS = []
+JOBS = JobManager()
+# Test runs get their own queue so they never wait behind a KB build
+TEST_RUNS = JobManager()
 UPLOAD_DIR = "uploaded_docs"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-HTML_PATH = "target_site/checkout.html"
+HTML_PATH = os.path.join(TARGET_SITE_DIR, "checkout.html")
 if os.path.exists(HTML_PATH):
-    set_html_structure(HTML_PATH)
-    print(f"✓ HTML structure loaded from {HTML_PATH}")
+    # Parsed on first use, like every other target page
+    TARGETS.register(HTML_PATH, default=True)
+    print(f"✓ HTML structure registered from {HTML_PATH}")
 else:
     print(f"⚠ Warning: {HTML_PATH} not found")
 
@@ -40,39 +72,317 @@ def health():
 @app.post("/upload_docs")
 async def upload_docs(files: List[UploadFile] = File(...)):
     global UPLOADED_DOCS
-    UPLOADED_DOCS = []
 
-    paths = []
-    for file in files:
-        saved = await save_uploaded_file(file, UPLOAD_DIR)
-        text = extract_text_from_path(saved)
+    saved = await asyncio.gather(*(save_uploaded_file(file, UPLOAD_DIR) for file in files))
+    results = await extract_batch_async(saved)
 
-        UPLOADED_DOCS.append({"filename": os.path.basename(saved), "text": text})
-        paths.append(str(saved))
+    UPLOADED_DOCS = [r for r in results if "error" not in r]
+    paths = [str(path) for path in saved]
+    errors = {r["filename"]: r["error"] for r in results if "error" in r}
 
-    return {"status": "uploaded", "files": paths}
+    response = {"status": "uploaded", "files": paths}
+    if errors:
+        response["errors"] = errors
+    return response
 
 
 @app.post("/build_kb")
-def build_kb():
+def build_kb(prune: bool = False):
     if not UPLOADED_DOCS:
         return {"error": "Upload documents first"}
 
-    added = build_vector_store_from_texts(UPLOADED_DOCS)
-    return {"status": "kb_built", "added": added}
+    docs = UPLOADED_DOCS
+    job = Job("build_kb", total_docs=len(docs), total_bytes=sum(item_size(d) for d in docs))
+
+    def run(job: Job):
+        stats = build_vector_store_from_texts(docs, prune=prune, progress=job.report)
+        return {"status": "kb_built", "documents": len(docs), **stats}
+
+    JOBS.submit(job, run)
+    return {"status": "queued", "job_id": job.id}
+
+
+def _find_job(job_id: str):
+    return JOBS.get(job_id) or TEST_RUNS.get(job_id)
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = _find_job(job_id)
+    if job is None:
+        return {"error": "job not found"}
+    return job.to_dict()
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = _find_job(job_id)
+    if job is None:
+        return {"error": "job not found"}
+    job.cancel()
+    return job.to_dict()
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return {
+        "kb_version": get_kb_version(),
+        "query_embeddings": QUERY_CACHE.stats(),
+        "retrieval_results": RESULT_CACHE.stats(),
+    }
+
+
+def _target_error(target: str):
+    """Parse the target page up front (or check its cached parse) so a bad name fails cleanly"""
+    try:
+        TARGETS.get(target)
+    except (ValueError, OSError) as e:
+        return {"error": f"target page: {e}"}
+    return None
+
+
+@app.get("/targets")
+def list_targets():
+    return {"targets": TARGETS.list()}
+
+
+@app.get("/targets/memory")
+def targets_memory():
+    """Bytes held in memory per cached page; the raw HTML itself stays on disk"""
+    models = dict(PAGE_MODELS.items())
+    pages = TARGETS.memory()
+    for page in pages:
+        model = models.get(page["sha256"])
+        page["dom_model_bytes"] = deep_sizeof(model) if model else 0
+        page["total_bytes"] = page["structure_bytes"] + page["dom_model_bytes"]
+    return {"pages": pages, "total_bytes": sum(page["total_bytes"] for page in pages)}
+
+
+@app.get("/embeddings/stats")
+def embedding_stats():
+    return EMBEDDINGS.stats()
+
+
+@app.post("/embeddings/config")
+def embedding_config(body: dict):
+    """Tune the query batcher at runtime: {"max_batch": int, "max_wait_ms": float}"""
+    try:
+        EMBEDDINGS.configure(body.get("max_batch"), body.get("max_wait_ms"))
+    except (TypeError, ValueError):
+        return {"error": "max_batch and max_wait_ms must be numbers"}
+    if body.get("reset_stats"):
+        EMBEDDINGS.reset_stats()
+    return EMBEDDINGS.stats()
 
 
 @app.post("/generate_tests")
 def generate_tests(body: dict):
+    """
+    Test cases for {"prompt": str, "target": optional page}.
+
+    Returns {"tests": [...], "context": [...]}. context lists the documentation
+    chunks the tests were grounded in, best first: {"source", "text_start",
+    "text_end", "score"}. text_start/text_end are character offsets into the
+    text extracted from the source document (as chunked: stripped segments
+    joined by blank lines), not byte or character offsets into the uploaded
+    file. They are null for chunks indexed without offsets.
+    """
     prompt = body.get("prompt")
     if not prompt:
         return {"error": "prompt missing"}
 
-    tests = generate_test_cases_from_prompt(prompt)
-    return {"tests": tests}
+    # Optional page under test: a path relative to target_site/ or a URL
+    target = body.get("target")
+    error = _target_error(target)
+    if error:
+        return error
+
+    tests, context = generate_grounded_test_cases(prompt, target)
+    return {"tests": tests, "context": context}
+
+
+@app.post("/generate_tests/batch")
+def generate_tests_batch(body: dict):
+    prompts = body.get("prompts")
+    if not prompts or not isinstance(prompts, list):
+        return {"error": "prompts missing"}
+    if len(prompts) > MAX_BATCH_SIZE:
+        return {"error": f"at most {MAX_BATCH_SIZE} prompts per batch"}
+
+    prompts = [p for p in prompts if isinstance(p, str) and p.strip()]
+    target = body.get("target")
+    error = _target_error(target)
+    if error:
+        return error
+
+    return {"results": generate_test_cases_batch(prompts, target)}
 
 
 @app.post("/generate_script")
-def generate_script(test_case: dict):
-    script = create_selenium_script(test_case)
+def generate_script(test_case: dict, fast: bool = False, target: str = None):
+    error = _target_error(target)
+    if error:
+        return error
+
+    script = create_selenium_script(test_case, fast, target)
     return {"script": script}
+
+
+@app.post("/generate_script/batch")
+def generate_script_batch(body: dict):
+    test_cases = body.get("test_cases")
+    if not test_cases or not isinstance(test_cases, list):
+        return {"error": "test_cases missing"}
+    if len(test_cases) > MAX_BATCH_SIZE:
+        return {"error": f"at most {MAX_BATCH_SIZE} test cases per batch"}
+
+    # "per_test" starts a browser per test, "pool" reuses browsers across tests
+    driver_mode = body.get("driver", "per_test")
+    if driver_mode not in DRIVER_MODES:
+        return {"error": f"driver must be one of {sorted(DRIVER_MODES)}"}
+
+    # Fast mode: condition waits only, no fixed pauses
+    fast = bool(body.get("fast", False))
+    target = body.get("target")
+    error = _target_error(target)
+    if error:
+        return error
+
+    if body.get("format", "zip") == "module":
+        module = create_selenium_test_module(test_cases, driver_mode, fast, target)
+        return Response(
+            module,
+            media_type="text/x-python",
+            headers={"Content-Disposition": 'attachment; filename="test_netcart.py"'},
+        )
+
+    bundle = create_selenium_bundle_zip(test_cases, driver_mode, fast, target)
+    return StreamingResponse(
+        io.BytesIO(bundle),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="netcart_selenium_tests.zip"'},
+    )
+
+
+def _queue_test_run(scripts: List[dict], workers: int, timeout: float, base_url: str = None,
+                    site_page: str = "checkout.html") -> Job:
+    job = Job("run_tests", total_docs=len(scripts))
+
+    def run(job: Job):
+        def progress(result):
+            job.report(docs=1)
+
+        if base_url:
+            results = run_scripts(scripts, base_url, workers, timeout, progress)
+        else:
+            with serve_directory(TARGET_SITE_DIR) as root:
+                results = run_scripts(scripts, root + site_page, workers, timeout, progress)
+
+        return {
+            "status": "tests_run",
+            "summary": summarize(results),
+            "results": [{k: v for k, v in r.items() if k != "output"} for r in results],
+            "reports": write_reports(results, job.id),
+        }
+
+    return TEST_RUNS.submit(job, run)
+
+
+@app.post("/run_tests")
+def run_tests(body: dict):
+    """
+    Run generated scripts for a batch of test cases in parallel headless
+    browsers. Without a base_url the bundled target_site is served locally;
+    target picks the page (default checkout.html). A base_url has to be
+    allowed like a target URL (QA_AGENT_TARGET_URLS or registered), and
+    workers is capped at QA_AGENT_RUN_MAX_WORKERS.
+    Progress counts finished tests in docs_extracted / docs_total.
+
+    executor "dom" simulates the tests in-process instead and answers
+    immediately; tests the simulator cannot judge are queued for Selenium
+    (fallback_job_id) unless fallback is false.
+    """
+    test_cases = body.get("test_cases")
+    if not test_cases or not isinstance(test_cases, list):
+        return {"error": "test_cases missing"}
+    if len(test_cases) > MAX_BATCH_SIZE:
+        return {"error": f"at most {MAX_BATCH_SIZE} test cases per batch"}
+
+    executor = body.get("executor", "selenium")
+    if executor not in ("selenium", "dom"):
+        return {"error": "executor must be selenium or dom"}
+
+    try:
+        workers = int(body.get("workers", RUN_WORKERS))
+        timeout = float(body.get("timeout", RUN_TEST_TIMEOUT))
+    except (TypeError, ValueError):
+        return {"error": "workers and timeout must be numbers"}
+    # Every worker is a Chrome process
+    workers = max(1, min(workers, RUN_MAX_WORKERS))
+
+    test_cases = unique_test_cases(test_cases)
+
+    # Optional [index, count]: run only this shard of the suite (split by Test_ID)
+    shard = body.get("shard")
+    if shard is not None:
+        if not (isinstance(shard, list) and len(shard) == 2
+                and all(isinstance(n, int) and not isinstance(n, bool) for n in shard)
+                and 0 <= shard[0] < shard[1]):
+            return {"error": "shard must be [index, count] with 0 <= index < count"}
+        test_cases = select_shard(test_cases, shard[0], shard[1])
+
+    target = body.get("target")
+    error = _target_error(target)
+    if error:
+        return error
+
+    fast = bool(body.get("fast", True))
+    base_url = body.get("base_url")
+    # The server's browsers open this URL, so it is held to the same allowlist as targets
+    if base_url and not (isinstance(base_url, str) and TARGETS.allows_url(base_url)):
+        return {"error": "base_url is not registered or allowed by QA_AGENT_TARGET_URLS"}
+    site_page = "checkout.html"
+    if target:
+        page = TARGETS.resolve(target)
+        if is_url(page.source):
+            base_url = base_url or page.url
+        else:
+            site_page = page.key
+
+    if executor == "dom":
+        results = simulate_test_cases(test_cases, TARGETS.get(target))
+        response = {
+            "status": "simulated",
+            "summary": summarize_simulation(results),
+            "results": results,
+        }
+
+        browser_ids = {r["test_id"] for r in results if r["status"] == "needs_browser"}
+        if browser_ids and body.get("fallback", True):
+            scripts = scripts_from_test_cases([tc for tc in test_cases if tc.get("Test_ID") in browser_ids],
+                                              fast, target)
+            response["fallback_job_id"] = _queue_test_run(scripts, workers, timeout, base_url, site_page).id
+        return response
+
+    job = _queue_test_run(scripts_from_test_cases(test_cases, fast, target), workers, timeout, base_url, site_page)
+    return {"status": "queued", "job_id": job.id}
+
+
+@app.get("/run_tests/{job_id}/report")
+def run_tests_report(job_id: str, format: str = "junit"):
+    job = TEST_RUNS.get(job_id)
+    if job is None:
+        return {"error": "job not found"}
+    if job.status != "completed":
+        return {"error": f"test run is {job.status}"}
+    if format not in ("junit", "json"):
+        return {"error": "format must be junit or json"}
+
+    path = job.result["reports"][format]
+    with open(path, "rb") as f:
+        content = f.read()
+
+    media_type = "application/xml" if format == "junit" else "application/json"
+    filename = os.path.basename(path)
+    return Response(content, media_type=media_type,
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"'})
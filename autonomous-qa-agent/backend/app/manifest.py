@@ -0,0 +1,73 @@
+# backend/app/manifest.py
+
+import hashlib
+import json
+import os
+from typing import Dict
+
+from .config import KB_MANIFEST_PATH, EMBEDDING_ID, CHUNK_SIZE, CHUNK_OVERLAP
+
+# Bumped when the metadata stored with each chunk changes
+# (2: character offsets, 3: offsets renamed text_start/text_end)
+CHUNK_METADATA_VERSION = 3
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def new_manifest() -> Dict:
+    return {"model": EMBEDDING_ID, "chunking": [CHUNK_SIZE, CHUNK_OVERLAP],
+            "metadata_version": CHUNK_METADATA_VERSION, "documents": {}}
+
+
+def manifest_compatible(manifest: Dict) -> bool:
+    """Vectors built with another model, chunking setup or chunk metadata cannot be reused"""
+    return (manifest.get("model") == EMBEDDING_ID
+            and manifest.get("chunking") == [CHUNK_SIZE, CHUNK_OVERLAP]
+            and manifest.get("metadata_version", 1) == CHUNK_METADATA_VERSION)
+
+
+def load_manifest(path: str = KB_MANIFEST_PATH) -> Dict:
+    """
+    Load the KB manifest:
+    {"model": ..., "documents": {filename: {"hash": ..., "chunks": {chunk_id: hash}}}}
+    """
+    if not os.path.exists(path):
+        return new_manifest()
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Warning: could not read KB manifest ({e}), starting fresh")
+        return new_manifest()
+
+    manifest.setdefault("documents", {})
+    return manifest
+
+
+def save_manifest(manifest: Dict, path: str = KB_MANIFEST_PATH):
+    """Write the manifest atomically so a crash never leaves it half written"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+_KB_VERSION = None
+
+
+def get_kb_version() -> int:
+    """Monotonic version of the docs collection, bumped by every build that changes it"""
+    global _KB_VERSION
+    if _KB_VERSION is None:
+        _KB_VERSION = load_manifest().get("kb_version", 0)
+    return _KB_VERSION
+
+
+def set_kb_version(version: int):
+    global _KB_VERSION
+    _KB_VERSION = version
@@ -0,0 +1,12 @@
+# backend/app/processes.py
+#
+# Start method for the worker processes of ingest_new.extract_batch and
+# runner.run_scripts. Kept apart so neither module has to import the other.
+
+import multiprocessing
+
+
+def mp_context():
+    # Never fork the (multi-threaded) server process itself
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
@@ -1,67 +1,221 @@
 import os
-from typing import List, Dict
+import json
+import hashlib
+from array import array
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
-try:
-    from sentence_transformers import SentenceTransformer
-    import chromadb
-    DEPS_AVAILABLE = True
-except ImportError:
-    DEPS_AVAILABLE = False
-
-from .html_parser import parse_html_structure
+from .targets import TARGETS, get_html_structure
 from .llm_integration import generate_test_cases_with_llm
+from .resources import DEPS_AVAILABLE, get_collection
+from .embedding_service import EMBEDDINGS
+from .lexical_index import LEXICAL, tokenize, reciprocal_rank_fusion
+from .context import Hit, make_hit, mmr_select, trim_to_budget, assemble_context, grounding_source, hit_provenance
+from .cache import LRUCache
+from .config import EMBEDDING_ID, QUERY_CACHE_SIZE, QUERY_CACHE_PATH, RESULT_CACHE_SIZE, RRF_K
+from .manifest import get_kb_version
 
-# Initialize
-if DEPS_AVAILABLE:
-    try:
-        MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-        CHROMA_DIR = os.path.join(os.getcwd(), "vector_store")
-        os.makedirs(CHROMA_DIR, exist_ok=True)
-        
-        client = chromadb.PersistentClient(path=CHROMA_DIR)
-        collection = client.get_or_create_collection("docs")
-    except Exception as e:
-        print(f"Error initializing RAG: {e}")
-        DEPS_AVAILABLE = False
+# Query embeddings keyed on (model/backend id, normalized prompt)
+QUERY_CACHE = LRUCache(QUERY_CACHE_SIZE)
 
-# Global HTML structure
-HTML_STRUCTURE = {}
+# Retrieved hits keyed on (KB version, embedding hash, query terms, n_results, filters)
+RESULT_CACHE = LRUCache(RESULT_CACHE_SIZE)
+_RESULT_CACHE_VERSION = None
 
 def set_html_structure(html_path: str):
-    """Parse and store YOUR checkout.html structure"""
-    global HTML_STRUCTURE
-    HTML_STRUCTURE = parse_html_structure(html_path)
-    print(f"✓ Parsed HTML - Found {len(HTML_STRUCTURE.get('features', []))} features")
+    """Register YOUR checkout.html as the default target page (parsed on first use)"""
+    TARGETS.register(html_path, default=True)
 
 
-def retrieve_context(prompt: str, n_results: int = 5) -> str:
-    """Retrieve relevant context from vector store"""
-    if not DEPS_AVAILABLE:
-        return ""
-    
+def normalize_prompt(prompt: str) -> str:
+    # all-MiniLM-L6-v2 is uncased and ignores extra whitespace, so these prompts embed identically
+    return " ".join(prompt.lower().split())
+
+
+def encode_queries(prompts: List[str]) -> List[List[float]]:
+    """
+    Embed prompts, reusing cached vectors. Misses go to the shared batcher,
+    so concurrent requests share one forward pass.
+    """
+    texts = [normalize_prompt(p) for p in prompts]
+
+    found = {}
+    for text in dict.fromkeys(texts):
+        emb = QUERY_CACHE.get((EMBEDDING_ID, text))
+        if emb is not None:
+            found[text] = emb
+
+    missing = [t for t in dict.fromkeys(texts) if t not in found]
+    if missing:
+        for text, emb in zip(missing, EMBEDDINGS.encode(missing)):
+            QUERY_CACHE.put((EMBEDDING_ID, text), emb)
+            found[text] = emb
+
+    return [found[t] for t in texts]
+
+
+def encode_query(prompt: str) -> List[float]:
+    """Embed a prompt, reusing the cached vector for repeated prompts"""
+    return encode_queries([prompt])[0]
+
+
+def load_query_cache():
+    if QUERY_CACHE_PATH:
+        loaded = QUERY_CACHE.load(QUERY_CACHE_PATH)
+        print(f"✓ Loaded {loaded} cached query embeddings")
+
+
+def save_query_cache():
+    if QUERY_CACHE_PATH:
+        try:
+            QUERY_CACHE.save(QUERY_CACHE_PATH)
+        except OSError as e:
+            print(f"⚠ Warning: could not save query cache: {e}")
+
+
+def _embedding_key(emb: List[float]) -> str:
+    return hashlib.sha1(array("f", emb).tobytes()).hexdigest()
+
+
+def _result_cache_key(emb: Optional[List[float]], terms: List[str], n_results: int,
+                      where: Optional[Dict]) -> Tuple:
+    global _RESULT_CACHE_VERSION
+    version = get_kb_version()
+
+    # The collection changed since these results were cached - drop them all
+    if version != _RESULT_CACHE_VERSION:
+        RESULT_CACHE.clear()
+        _RESULT_CACHE_VERSION = version
+
+    filters = json.dumps(where, sort_keys=True) if where else None
+    emb_key = _embedding_key(emb) if emb is not None else None
+    return (version, emb_key, " ".join(terms), n_results, filters)
+
+
+def _hybrid_search(queries: List[Tuple[Optional[List[float]], List[str]]], n_results: int,
+                   where: Optional[Dict]) -> List[List[Hit]]:
+    """
+    Hits for each (embedding, terms) query: vector and BM25 rankings merged
+    with reciprocal rank fusion, then picked by MMR without near-duplicates
+    and cut to the context token budget. Queries without an embedding are
+    keyword-only and use BM25 alone.
+    """
+    collection = get_collection()
+    # Each ranking contributes a deeper pool than n_results for fusion and MMR to choose from
+    pool = n_results * 2
+    include = ["documents", "metadatas", "embeddings"]
+
+    found = {}  # id -> (document, metadata, embedding)
+    vector_ids = [[] for _ in queries]
+    embedded = [(i, emb) for i, (emb, _) in enumerate(queries) if emb is not None]
+    if embedded:
+        res = collection.query(query_embeddings=[emb for _, emb in embedded], n_results=pool,
+                               where=where, include=include)
+        for (i, _), ids, docs, metas, vecs in zip(embedded, res["ids"], res["documents"],
+                                                  res["metadatas"], res["embeddings"]):
+            vector_ids[i] = ids
+            found.update(zip(ids, zip(docs, metas, vecs)))
+
+    ranked = []
+    for (_, terms), ids in zip(queries, vector_ids):
+        lexical = [id_ for id_, _ in LEXICAL.search(terms, pool, where)]
+        ranked.append(reciprocal_rank_fusion([ids, lexical], RRF_K))
+
+    # BM25-only hits were not returned by the vector query
+    missing = list(dict.fromkeys(id_ for fused in ranked for id_, _ in fused if id_ not in found))
+    if missing:
+        got = collection.get(ids=missing, include=include)
+        found.update(zip(got["ids"], zip(got["documents"], got["metadatas"], got["embeddings"])))
+
+    results = []
+    for fused in ranked:
+        fused = [(id_, score) for id_, score in fused if id_ in found]
+        hits = [make_hit(id_, found[id_][0], found[id_][1], score) for id_, score in fused]
+        picked = mmr_select(hits, [found[id_][2] for id_, _ in fused], n_results)
+        results.append(trim_to_budget(picked))
+    return results
+
+
+def retrieve_hits(prompts: List[str], n_results: int = 5,
+                  where: Optional[Dict] = None) -> List[List[Hit]]:
+    """
+    Retrieve hits for several prompts: one batched encode and one
+    multi-embedding collection.query for everything not already cached,
+    fused with BM25 hits. Keyword-only prompts are not embedded at all.
+    """
+    if not DEPS_AVAILABLE or not prompts:
+        return [[] for _ in prompts]
+
     try:
-        emb = MODEL.encode(prompt).tolist()
-        res = collection.query(query_embeddings=[emb], n_results=n_results)
+        terms = [tokenize(p) for p in prompts]
+        to_embed = list(dict.fromkeys(p for p in prompts if not LEXICAL.keyword_only(p)))
+        embedded = dict(zip(to_embed, encode_queries(to_embed))) if to_embed else {}
+        embs = [embedded.get(p) for p in prompts]
+        keys = [_result_cache_key(emb, t, n_results, where) for emb, t in zip(embs, terms)]
+
+        results = {}
+        to_query = {}
+        for key, emb, t in zip(keys, embs, terms):
+            if key in results or key in to_query:
+                continue
+            hits = RESULT_CACHE.get(key)
+            if hits is None:
+                to_query[key] = (emb, t)
+            else:
+                results[key] = hits
 
-        docs = []
-        if "documents" in res and len(res["documents"]) > 0:
-            docs = res["documents"][0]
+        if to_query:
+            for key, hits in zip(to_query, _hybrid_search(list(to_query.values()), n_results, where)):
+                RESULT_CACHE.put(key, hits)
+                results[key] = hits
 
-        return "\n\n".join(docs)
+        return [results[key] for key in keys]
     except Exception as e:
         print(f"Error retrieving context: {e}")
-        return ""
+        return [[] for _ in prompts]
+
+
+def retrieve_contexts(prompts: List[str], n_results: int = 5,
+                      where: Optional[Dict] = None) -> List[str]:
+    """Retrieve context strings for several prompts (see retrieve_hits)"""
+    return [assemble_context(hits) for hits in retrieve_hits(prompts, n_results, where)]
+
+
+def retrieve_context(prompt: str, n_results: int = 5, where: Optional[Dict] = None) -> str:
+    """Retrieve relevant context from vector store"""
+    return retrieve_contexts([prompt], n_results, where)[0]
 
 
-def generate_test_cases_from_prompt(prompt: str) -> List[Dict]:
+def generate_grounded_test_cases(prompt: str, target: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
     """
     Generate test cases using documentation context and HTML structure.
     This is GROUNDED in your actual documents and HTML.
+    target names the page under test; the default page when empty.
+    Returns the test cases and the provenance of the context chunks used.
     """
-    context = retrieve_context(prompt)
+    html_structure = get_html_structure(target)
+    hits = retrieve_hits([prompt])[0]
     
-    # Use LLM integration with YOUR HTML structure
-    test_cases = generate_test_cases_with_llm(prompt, context, HTML_STRUCTURE)
+    # Use LLM integration with YOUR HTML structure, grounded in the best hit's document
+    test_cases = generate_test_cases_with_llm(prompt, assemble_context(hits), html_structure,
+                                              grounding_source(hits))
     
-    return test_cases
\ No newline at end of file
+    return test_cases, [hit_provenance(hit) for hit in hits]
+
+
+def generate_test_cases_from_prompt(prompt: str, target: Optional[str] = None) -> List[Dict]:
+    """Test cases for a prompt (see generate_grounded_test_cases)"""
+    return generate_grounded_test_cases(prompt, target)[0]
+
+
+def generate_test_cases_batch(prompts: List[str], target: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """Generate test cases for many prompts with batched retrieval, keyed by prompt"""
+    html_structure = get_html_structure(target)
+    unique = list(dict.fromkeys(prompts))
+    all_hits = retrieve_hits(unique)
+
+    return {
+        prompt: generate_test_cases_with_llm(prompt, assemble_context(hits), html_structure,
+                                             grounding_source(hits))
+        for prompt, hits in zip(unique, all_hits)
+    }
@@ -0,0 +1,93 @@
+# backend/app/resources.py
+#
+# Process-wide registry for the embedding model and the vector store
+# (a Chroma client, or the in-process store in vector_store.py).
+# Everything is created lazily on first use and shared by rag.py and
+# ingest_new.py; main.py calls warm_up()/shutdown() from the app lifespan.
+
+import importlib.util
+import os
+import threading
+
+from .config import EMBEDDING_MODEL_NAME, EMBEDDING_BACKEND, CHROMA_DIR, COLLECTION_NAME, VECTOR_BACKEND
+from .embedding_backends import backend_available, load_backend
+
+VECTOR_BACKENDS = ("chroma", "local")
+
+# The local store only needs numpy (hnswlib is optional), so chromadb is required only for "chroma"
+DEPS_AVAILABLE = (
+    backend_available(EMBEDDING_BACKEND)
+    and VECTOR_BACKEND in VECTOR_BACKENDS
+    and (VECTOR_BACKEND != "chroma" or importlib.util.find_spec("chromadb") is not None)
+)
+
+_LOCK = threading.RLock()
+_MODEL = None
+_CLIENT = None
+_COLLECTION = None
+
+
+def get_embedding_model():
+    """Return the shared embedding backend (see embedding_backends.py), loading it on first use"""
+    global _MODEL
+    if _MODEL is None:
+        with _LOCK:
+            if _MODEL is None:
+                _MODEL = load_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME)
+    return _MODEL
+
+
+def get_chroma_client():
+    """Return the shared Chroma PersistentClient"""
+    global _CLIENT
+    if _CLIENT is None:
+        with _LOCK:
+            if _CLIENT is None:
+                import chromadb
+
+                os.makedirs(CHROMA_DIR, exist_ok=True)
+                _CLIENT = chromadb.PersistentClient(path=CHROMA_DIR)
+    return _CLIENT
+
+
+def get_collection():
+    """Return the shared documents collection"""
+    global _COLLECTION
+    if _COLLECTION is None:
+        with _LOCK:
+            if _COLLECTION is None:
+                if VECTOR_BACKEND == "local":
+                    from .vector_store import LocalCollection
+
+                    _COLLECTION = LocalCollection(os.path.join(CHROMA_DIR, "local", COLLECTION_NAME))
+                else:
+                    _COLLECTION = get_chroma_client().get_or_create_collection(COLLECTION_NAME)
+    return _COLLECTION
+
+
+def warm_up() -> bool:
+    """Load the model and open the store up front so the first request is fast"""
+    if not DEPS_AVAILABLE:
+        print(f"⚠ Warning: the '{VECTOR_BACKEND}' vector store or the '{EMBEDDING_BACKEND}' embedding backend "
+              f"is not available, RAG disabled")
+        return False
+
+    try:
+        get_embedding_model().encode(["warm up"])
+        get_collection()
+        print(f"✓ Embedding model '{EMBEDDING_MODEL_NAME}' ({EMBEDDING_BACKEND}) and {VECTOR_BACKEND} vector store ready")
+        return True
+    except Exception as e:
+        print(f"Error initializing RAG: {e}")
+        return False
+
+
+def shutdown():
+    """Drop shared references so the model and client can be released"""
+    global _MODEL, _CLIENT, _COLLECTION
+    with _LOCK:
+        if hasattr(_COLLECTION, "close"):
+            _COLLECTION.close()
+        _COLLECTION = None
+        _CLIENT = None
+        _MODEL = None
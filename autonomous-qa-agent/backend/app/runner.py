@@ -0,0 +1,320 @@
+# backend/app/runner.py
+#
+# Runs generated Selenium scripts in parallel worker processes. Each worker
+# keeps one headless Chrome for its whole shard; the parent enforces
+# per-test timeouts, restarts workers that hang or crash, and writes
+# JUnit XML / JSON reports.
+
+import io
+import json
+import multiprocessing.connection
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .config import RUN_WORKERS, RUN_TEST_TIMEOUT, REPORTS_DIR
+from .generator import unique_test_cases
+from .llm_integration import generate_selenium_with_html, selenium_class_name, selenium_method_name
+from .processes import mp_context
+from .script_check import check_script
+from .targets import get_html_structure
+
+
+def scripts_from_test_cases(test_cases: List[Dict], fast: bool = True, target: Optional[str] = None) -> List[Dict]:
+    """Generate the runnable scripts for a batch of test cases against one target page"""
+    html_structure = get_html_structure(target)
+    return [
+        {
+            "test_id": tc.get("Test_ID", "TC-000"),
+            "class_name": selenium_class_name(tc),
+            "method_name": selenium_method_name(tc),
+            "source": generate_selenium_with_html(tc, html_structure, fast),
+        }
+        for tc in unique_test_cases(test_cases)
+    ]
+
+
+def shard_of(test_id: str, shard_count: int) -> int:
+    """Stable shard of a Test_ID, the same on every run and machine"""
+    return zlib.crc32(test_id.encode("utf-8")) % shard_count
+
+
+def select_shard(test_cases: List[Dict], shard_index: int, shard_count: int) -> List[Dict]:
+    """The test cases belonging to one shard, e.g. to split a suite across CI machines"""
+    return [tc for tc in test_cases if shard_of(tc.get("Test_ID", "TC-000"), shard_count) == shard_index]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_directory(directory: str, host: str = "127.0.0.1") -> Iterator[str]:
+    """Serve a directory over HTTP on a free port for the duration of the block; yields the root URL"""
+    server = ThreadingHTTPServer((host, 0), partial(_QuietHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_address[1]}/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# ------------------------------------------------------------------
+# Worker process
+# ------------------------------------------------------------------
+
+def _new_driver():
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--window-size=1366,900")
+    return webdriver.Chrome(options=options)
+
+
+def _reset_driver(driver):
+    """Clear what the previous test left behind; each script loads the page itself"""
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        driver.switch_to.alert.dismiss()
+    except WebDriverException:
+        pass
+    driver.delete_all_cookies()
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except WebDriverException:
+        pass
+
+
+def _run_script(driver, script: Dict, base_url: str) -> Dict:
+    output = io.StringIO()
+    start = time.perf_counter()
+
+    try:
+        # Scripts are built from client-supplied test cases: refuse anything but template code
+        check_script(script["source"])
+        namespace = {"__name__": f"netcart_{script['method_name']}"}
+        with redirect_stdout(output):
+            exec(compile(script["source"], f"{script['method_name']}.py", "exec"), namespace)
+            test = namespace[script["class_name"]](driver=driver, base_url=base_url)
+            passed = getattr(test, script["method_name"])()
+        status = "passed" if passed else "failed"
+        message = "; ".join(test.errors) if not passed else ""
+    except Exception as e:
+        status, message = "error", f"{type(e).__name__}: {e}"
+
+    return {
+        "test_id": script["test_id"],
+        "status": status,
+        "message": message,
+        "duration": round(time.perf_counter() - start, 3),
+        "output": output.getvalue(),
+    }
+
+
+def _worker(scripts: List[Dict], base_url: str, conn):
+    try:
+        driver = _new_driver()
+    except Exception as e:
+        for script in scripts:
+            conn.send(("result", {"test_id": script["test_id"], "status": "error",
+                                  "message": f"could not start browser: {e}", "duration": 0.0, "output": ""}))
+        conn.close()
+        return
+
+    try:
+        for script in scripts:
+            conn.send(("start", script["test_id"]))
+            try:
+                _reset_driver(driver)
+            except Exception:
+                # Browser session is gone - replace it rather than failing the rest of the shard
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = _new_driver()
+            conn.send(("result", _run_script(driver, script, base_url)))
+    finally:
+        driver.quit()
+        conn.close()
+
+
+# ------------------------------------------------------------------
+# Parent side
+# ------------------------------------------------------------------
+
+def _failed(test_id: str, status: str, message: str, duration: float = 0.0) -> Dict:
+    return {"test_id": test_id, "status": status, "message": message,
+            "duration": round(duration, 3), "output": ""}
+
+
+class _Shard:
+    """Parent-side view of one worker process and the scripts it has left"""
+
+    def __init__(self, scripts: List[Dict]):
+        self.remaining = list(scripts)
+        self.proc = None
+        self.conn = None
+        self.current = None
+        self.deadline = None
+        self.started = None
+
+    def start(self, ctx, base_url: str):
+        recv, send = ctx.Pipe(duplex=False)
+        self.proc = ctx.Process(target=_worker, args=(self.remaining, base_url, send), daemon=True)
+        self.proc.start()
+        send.close()
+        self.conn = recv
+        self.current = self.deadline = None
+
+    def stop(self):
+        if self.proc is not None:
+            if self.proc.is_alive():
+                self.proc.terminate()
+            self.proc.join()
+            self.conn.close()
+        self.proc = self.conn = None
+
+    def pop(self, test_id: str):
+        self.remaining = [s for s in self.remaining if s["test_id"] != test_id]
+        self.current = self.deadline = None
+
+
+def run_scripts(scripts: List[Dict],
+                base_url: str,
+                workers: int = RUN_WORKERS,
+                timeout: float = RUN_TEST_TIMEOUT,
+                progress: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    Run scripts across `workers` processes, sharded by Test_ID, and return one
+    result per script in input order: {"test_id", "status", "message",
+    "duration", "output"} with status passed / failed / error / timeout.
+
+    A test running longer than `timeout` seconds gets its worker killed; the
+    worker is restarted for the rest of its shard, as it is after a crash.
+    progress(result) is called as results come in and may raise to abort the run.
+    """
+    if not scripts:
+        return []
+
+    workers = max(1, min(workers, len(scripts)))
+    ctx = mp_context()
+    shards = [_Shard([s for s in scripts if shard_of(s["test_id"], workers) == i]) for i in range(workers)]
+    shards = [shard for shard in shards if shard.remaining]
+    results = {}
+
+    def record(shard: _Shard, result: Dict):
+        results[result["test_id"]] = result
+        shard.pop(result["test_id"])
+        if progress:
+            progress(result)
+
+    try:
+        for shard in shards:
+            shard.start(ctx, base_url)
+
+        while any(shard.proc for shard in shards):
+            active = [shard for shard in shards if shard.proc]
+            deadlines = [shard.deadline for shard in active if shard.deadline]
+            wait_for = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            handles = [h for shard in active for h in (shard.conn, shard.proc.sentinel)]
+            multiprocessing.connection.wait(handles, timeout=wait_for)
+
+            for shard in active:
+                while shard.conn.poll():
+                    try:
+                        kind, payload = shard.conn.recv()
+                    except EOFError:
+                        break
+                    if kind == "start":
+                        shard.current = payload
+                        shard.started = time.monotonic()
+                        shard.deadline = shard.started + timeout
+                    else:
+                        record(shard, payload)
+
+                now = time.monotonic()
+                if shard.deadline and now >= shard.deadline:
+                    shard.stop()
+                    record(shard, _failed(shard.current, "timeout", f"timed out after {timeout:g}s",
+                                          now - shard.started))
+                elif not shard.proc.is_alive():
+                    exitcode = shard.proc.exitcode
+                    shard.stop()
+                    if shard.remaining:
+                        # Crashed mid-test (or before the first one): blame that test, go on with the rest
+                        test_id = shard.current or shard.remaining[0]["test_id"]
+                        record(shard, _failed(test_id, "error", f"worker crashed (exit code {exitcode})"))
+                else:
+                    continue
+
+                if shard.remaining:
+                    shard.start(ctx, base_url)
+    finally:
+        for shard in shards:
+            shard.stop()
+
+    return [results.get(s["test_id"]) or _failed(s["test_id"], "error", "not run") for s in scripts]
+
+
+# ------------------------------------------------------------------
+# Reports
+# ------------------------------------------------------------------
+
+def summarize(results: List[Dict]) -> Dict:
+    counts = {status: 0 for status in ("passed", "failed", "error", "timeout")}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    return {"total": len(results), **counts,
+            "duration": round(sum(r["duration"] for r in results), 3)}
+
+
+def junit_xml(results: List[Dict], suite_name: str = "netcart") -> str:
+    summary = summarize(results)
+    suite = ET.Element("testsuite", {
+        "name": suite_name,
+        "tests": str(summary["total"]),
+        "failures": str(summary["failed"]),
+        "errors": str(summary["error"] + summary["timeout"]),
+        "skipped": "0",
+        "time": f"{summary['duration']:.3f}",
+    })
+
+    for r in results:
+        case = ET.SubElement(suite, "testcase", {
+            "classname": suite_name,
+            "name": r["test_id"],
+            "time": f"{r['duration']:.3f}",
+        })
+        if r["status"] == "failed":
+            ET.SubElement(case, "failure", {"message": r["message"] or "test failed"})
+        elif r["status"] in ("error", "timeout"):
+            ET.SubElement(case, "error", {"type": r["status"], "message": r["message"]})
+        if r["output"]:
+            ET.SubElement(case, "system-out").text = r["output"]
+
+    return ET.tostring(suite, encoding="unicode", xml_declaration=True)
+
+
+def write_reports(results: List[Dict], run_id: str, reports_dir: str = REPORTS_DIR) -> Dict:
+    """Write junit.xml and report.json for a run; returns their paths"""
+    directory = os.path.join(reports_dir, run_id)
+    os.makedirs(directory, exist_ok=True)
+
+    paths = {"junit": os.path.join(directory, "junit.xml"), "json": os.path.join(directory, "report.json")}
+    with open(paths["junit"], "w", encoding="utf-8") as f:
+        f.write(junit_xml(results))
+    with open(paths["json"], "w", encoding="utf-8") as f:
+        json.dump({"summary": summarize(results), "results": results}, f, indent=2)
+    return paths
@@ -0,0 +1,110 @@
+# backend/app/script_check.py
+#
+# Static check of a generated Selenium script before the runner executes it
+# in-process. Scripts only ever contain the template code plus escaped
+# literals, so anything outside that vocabulary - other imports, dunder
+# attributes, calls into os/sys beyond what the templates use - means the
+# script did not come from the generator unchanged and is refused.
+
+import ast
+import builtins
+from typing import Optional
+
+# Modules the templates import, and the dotted names used from each
+MODULE_NAMES = {
+    "webdriver": frozenset({"webdriver.ChromeOptions", "webdriver.Chrome"}),
+    "os": frozenset({"os.environ.get"}),
+    "sys": frozenset({"sys.exit"}),
+    "time": frozenset({"time.sleep"}),
+}
+
+# Modules whose direct attributes (By.ID, EC.presence_of_element_located) may all be used
+FLAT_MODULES = frozenset({"By", "EC"})
+
+# (module, name, alias) of every import in SELENIUM_IMPORTS; name is None for `import module`
+ALLOWED_IMPORTS = frozenset({
+    ("selenium", "webdriver", None),
+    ("selenium.webdriver.common.by", "By", None),
+    ("selenium.webdriver.support.ui", "WebDriverWait", None),
+    ("selenium.webdriver.support", "expected_conditions", "EC"),
+    ("selenium.common.exceptions", "TimeoutException", None),
+    ("selenium.common.exceptions", "NoSuchElementException", None),
+    ("time", None, None),
+    ("sys", None, None),
+    ("os", None, None),
+})
+
+# Functions that may be called by bare name, besides those the script defines
+ALLOWED_CALLS = frozenset({
+    "print", "str", "len", "int", "float", "bool", "any", "all", "min", "max",
+    "range", "enumerate", "isinstance", "WebDriverWait",
+})
+
+# Builtins that may be referenced at all: no open, eval, getattr, type, ...
+ALLOWED_BUILTINS = ALLOWED_CALLS | {"True", "False", "None", "Exception"}
+FORBIDDEN_BUILTINS = frozenset(n for n in dir(builtins) if not n.startswith("_")) - ALLOWED_BUILTINS
+
+
+def _dotted(node: ast.AST) -> Optional[str]:
+    """a.b.c for a chain of attributes on a name, None for anything else"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def check_script(source: str):
+    """Raise ValueError if source is not made only of what generated scripts use"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        raise ValueError(f"script does not parse: {e}")
+
+    defined = {node.name for node in ast.walk(tree) if isinstance(node, (ast.FunctionDef, ast.ClassDef))}
+    parents = {child: node for node in ast.walk(tree) for child in ast.iter_child_nodes(node)}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if (alias.name, None, alias.asname) not in ALLOWED_IMPORTS:
+                    raise ValueError(f"import of {alias.name} not allowed")
+
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if (node.module, alias.name, alias.asname) not in ALLOWED_IMPORTS:
+                    raise ValueError(f"import of {node.module}.{alias.name} not allowed")
+
+        elif isinstance(node, ast.Attribute):
+            if node.attr.startswith("__"):
+                raise ValueError(f"access to {node.attr} not allowed")
+            if isinstance(parents.get(node), ast.Attribute):
+                continue
+            # Outermost attribute of a chain: check it against the module it starts from
+            name = _dotted(node)
+            root = name.split(".", 1)[0] if name else None
+            if root in MODULE_NAMES and name not in MODULE_NAMES[root]:
+                raise ValueError(f"use of {name} not allowed")
+            if root in FLAT_MODULES and name.count(".") != 1:
+                raise ValueError(f"use of {name} not allowed")
+
+        elif isinstance(node, ast.Name):
+            if (node.id.startswith("__") and node.id != "__name__") or node.id in FORBIDDEN_BUILTINS:
+                raise ValueError(f"use of {node.id} not allowed")
+            # Modules may only be reached through the attribute chains checked above
+            if (node.id in MODULE_NAMES or node.id in FLAT_MODULES) and not isinstance(parents.get(node), ast.Attribute):
+                raise ValueError(f"bare use of module {node.id} not allowed")
+
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id not in ALLOWED_CALLS and func.id not in defined:
+                    raise ValueError(f"call to {func.id} not allowed")
+            elif not isinstance(func, ast.Attribute):
+                raise ValueError("only calls of names and methods are allowed")
+
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            raise ValueError("global/nonlocal not allowed")
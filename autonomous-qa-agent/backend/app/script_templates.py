@@ -0,0 +1,199 @@
+# backend/app/script_templates.py
+#
+# Skeletons of generated Selenium scripts. Each one is parsed once at import;
+# rendering a script is then a single join over prebuilt parts.
+#
+# Test case text (steps, scenario, ids) comes from clients, so it only ever
+# enters a script through an escaping conversion: {name!r} as a string
+# literal, {name!d} inside a docstring, {name!c} inside a # comment.
+# Plain {name} fields are reserved for code the generator builds itself.
+
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def comment_text(text) -> str:
+    """text on one line, safe to follow a # in generated code"""
+    return " ".join(str(text).splitlines())
+
+
+def docstring_text(text) -> str:
+    """text on one line, safe inside a triple-quoted docstring"""
+    return comment_text(text).replace("\\", "\\\\").replace('"', '\\"')
+
+
+CONVERSIONS: Dict[str, Callable] = {"": str, "r": lambda value: repr(str(value)),
+                                    "d": docstring_text, "c": comment_text}
+
+
+class ScriptTemplate:
+    """
+    A str.format-style template ({name} fields, {{ }} for literal braces)
+    split into literal text and field names up front.
+    """
+
+    def __init__(self, text: str):
+        self.parts: List[Tuple[str, Optional[str], Callable]] = [
+            (literal, field, CONVERSIONS[conversion or ""])
+            for literal, field, _, conversion in Formatter().parse(text)
+        ]
+        self.fields = frozenset(field for _, field, _ in self.parts if field is not None)
+
+    def render_into(self, out: List[str], values: dict):
+        """Append the rendered pieces to out, so callers can join a whole script once"""
+        for literal, field, convert in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(convert(values[field]))
+
+    def render(self, **values) -> str:
+        out = []
+        self.render_into(out, values)
+        return "".join(out)
+
+
+HEADER = ScriptTemplate('''"""
+NetCart Checkout - Automated Test
+=====================================
+Test ID: {test_id!d}
+Feature: {feature!d}
+Scenario: {scenario!d}
+Expected Result: {expected!d}
+Grounded In: {grounded_in!d}
+
+This test script was automatically generated from documentation-grounded test cases.
+All selectors are extracted from the actual checkout.html file.
+"""
+
+{imports}
+''')
+
+CLASS_HEAD = ScriptTemplate('''class {class_name}:
+    """Test class for {feature!d}"""
+
+    def __init__(self, driver=None, base_url=None):
+        """Initialize WebDriver and test configuration"""
+        self.owns_driver = driver is None
+        if self.owns_driver:
+            options = webdriver.ChromeOptions()
+            if os.environ.get("NETCART_HEADLESS") == "1":
+                options.add_argument("--headless=new")
+            driver = webdriver.Chrome(options=options)
+            driver.maximize_window()
+        self.driver = driver
+        self.wait = WebDriverWait(self.driver, 10)
+        self.test_id = {test_id!r}
+
+        # Set NETCART_BASE_URL or update this path to match your local checkout.html location
+        self.base_url = base_url or os.environ.get("NETCART_BASE_URL", {default_base_url!r})
+
+        self.test_passed = True
+        self.errors = []
+
+    def log(self, message):
+        """Log test progress"""
+        print(f"[{{self.test_id}}] {{message}}")
+
+    def assert_element(self, by, selector, message="Element should be present"):
+        """Assert element exists"""
+        try:
+            element = self.wait.until(EC.presence_of_element_located((by, selector)))
+            self.log(f"✓ {{message}}")
+            return element
+        except TimeoutException:
+            self.log(f"✗ FAILED: {{message}} - Selector: {{selector}}")
+            self.errors.append(f"Element not found: {{selector}}")
+            self.test_passed = False
+            return None
+
+    def wait_for_text_change(self, by, selector, old_text):
+        """Wait until an element's text differs from old_text"""
+        return self.wait.until(lambda d: d.find_element(by, selector).text != old_text)
+
+    def accept_alert(self, timeout=10):
+        """Accept a JavaScript alert if one shows up within timeout seconds and return its text"""
+        try:
+            alert = WebDriverWait(self.driver, timeout).until(EC.alert_is_present())
+        except TimeoutException:
+            return None
+        text = alert.text
+        alert.accept()
+        self.log(f"Alert: {{text}}")
+        return text
+
+    def wait_for_checkout_result(self, by, selector):
+        """After Pay Now: wait for the result element to show, a field error or an alert"""
+        self.wait.until(EC.any_of(
+            EC.visibility_of_element_located((by, selector)),
+            EC.visibility_of_any_elements_located((By.CSS_SELECTOR, ".input-error")),
+            EC.alert_is_present(),
+        ))
+        self.accept_alert(timeout=0)
+
+    def {method_name}(self):
+        """
+        Test Scenario: {scenario!d}
+
+        Expected Result: {expected!d}
+        """
+        driver = self.driver
+        wait = self.wait
+
+        try:
+            self.log("=" * 60)
+            self.log("Starting Test: " + self.test_id)
+            self.log("Feature: " + {feature!r})
+            self.log("=" * 60)
+
+''')
+
+STEP_HEAD = ScriptTemplate('''            # Step {number}: {step!c}
+            self.log("Step {number}: " + {step!r})
+''')
+
+CLASS_TAIL = ScriptTemplate('''
+            # Final Verification
+            self.log("=" * 60)
+            if self.test_passed:
+                self.log("✓✓✓ TEST PASSED ✓✓✓")
+                self.log("Expected Result Achieved: " + {expected!r})
+            else:
+                self.log("✗✗✗ TEST FAILED ✗✗✗")
+                for error in self.errors:
+                    self.log(f"  - {{error}}")
+
+            self.log("=" * 60)
+{final_pause}
+            return self.test_passed
+
+        except TimeoutException as e:
+            self.log(f"✗ Test Failed - Element Timeout: {{e}}")
+            driver.save_screenshot({file_id!r} + "_timeout.png")
+            self.log("Screenshot saved: " + {file_id!r} + "_timeout.png")
+            return False
+
+        except Exception as e:
+            self.log(f"✗ Test Failed - Unexpected Error: {{e}}")
+            driver.save_screenshot({file_id!r} + "_error.png")
+            self.log("Screenshot saved: " + {file_id!r} + "_error.png")
+            return False
+
+        finally:
+            if self.owns_driver:
+                self.log("Closing browser...")
+                driver.quit()
+''')
+
+MAIN = ScriptTemplate('''
+
+def main():
+    """Main test execution"""
+    test = {class_name}()
+    result = test.{method_name}()
+
+    sys.exit(0 if result else 1)
+
+
+if __name__ == "__main__":
+    main()
+''')
@@ -0,0 +1,346 @@
+# backend/app/step_rules.py
+#
+# Rule table that maps test-step text to Selenium code templates.
+# Register extra rules with register_step_rule(); they are picked up on
+# the next compile.
+
+import json
+import re
+import threading
+from functools import lru_cache
+from string import Template
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .script_templates import comment_text
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex for a set of words, factored as a trie so matching cost is independent of the word count"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional suffix: the longest keyword starting at a position wins
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds which keywords occur as substrings of a text in a single regex pass.
+    Same result as `[k for k in keywords if k in text]`, but the cost does not
+    grow with the number of keywords.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = set(keywords)
+        self._regex = re.compile("(?=(" + _trie_pattern(keywords) + "))") if keywords else None
+
+        # The regex reports the longest keyword at each position; every keyword
+        # contained in it (e.g. "add" in "address") is present as well.
+        self._implied = {k: frozenset(o for o in keywords if o in k) for k in keywords}
+
+    def find(self, text: str) -> FrozenSet[str]:
+        if self._regex is None:
+            return frozenset()
+
+        found = set()
+        for m in self._regex.finditer(text):
+            if m.group(1):
+                found |= self._implied[m.group(1)]
+        return frozenset(found)
+
+
+class StepRule(NamedTuple):
+    name: str
+    # Every group needs at least one of its keywords in the step text
+    all_of: Tuple[FrozenSet[str], ...]
+    # string.Template code; $selector (a string literal) / $locator stand for the target element,
+    # lines reading just $before / $wait for the code around the action
+    template: str
+    priority: int
+    selector: str = ""
+    # (before, wait) code used when the page has an element with id wait_id
+    # ($wait_locator); otherwise fallback, which waits on the element acted on
+    wait_id: str = ""
+    wait: Tuple[str, str] = ("", "")
+    fallback: Tuple[str, str] = ("", "")
+
+
+_RULES: List[StepRule] = []
+_RULES_LOCK = threading.Lock()
+_COMPILED = None
+
+# How long an optional alert is waited for before moving on
+ALERT_PROBE_SECONDS = 0.5
+
+
+def register_step_rule(name: str, all_of: Sequence[Iterable[str]], template: str,
+                       priority: int = 500, selector: str = "", wait_id: str = "",
+                       wait: Tuple[str, str] = ("", ""), fallback: Tuple[str, str] = ("", "")):
+    """
+    Register a step pattern. The rule matches when, for every keyword group
+    in all_of, at least one keyword occurs in the lower-cased step text.
+    Among matching rules the lowest priority wins (built-ins use 10-140,
+    the generic "verify" fallback 1000). selector is the CSS selector of the
+    element the template acts on. When the target page has an element with
+    id wait_id, the wait code (before, after the action) waits on it; pages
+    without it get the fallback code instead.
+    """
+    global _COMPILED
+    rule = StepRule(name, tuple(frozenset(k.lower() for k in group) for group in all_of),
+                    template, priority, selector, wait_id, tuple(wait), tuple(fallback))
+    with _RULES_LOCK:
+        _RULES.append(rule)
+        _COMPILED = None
+    render_rule.cache_clear()
+    _compile_default_step.cache_clear()
+
+
+class _CompiledRules:
+    def __init__(self, rules: List[StepRule]):
+        # Stable sort keeps registration order between equal priorities
+        self.rules = sorted(rules, key=lambda r: r.priority)
+        self.matcher = KeywordMatcher(k for r in self.rules for group in r.all_of for k in group)
+
+        self.by_name = {r.name: r for r in self.rules}
+        self.wait_ids = frozenset(r.wait_id for r in self.rules if r.wait_id)
+
+        # keyword -> indexes of rules whose first group contains it
+        self.index = {}
+        for i, rule in enumerate(self.rules):
+            for keyword in rule.all_of[0]:
+                self.index.setdefault(keyword, []).append(i)
+
+    def match(self, step_lower: str) -> Optional[StepRule]:
+        found = self.matcher.find(step_lower)
+        candidates = sorted({i for k in found for i in self.index.get(k, ())})
+
+        for i in candidates:
+            rule = self.rules[i]
+            if all(group & found for group in rule.all_of[1:]):
+                return rule
+        return None
+
+
+def _compiled() -> _CompiledRules:
+    global _COMPILED
+    with _RULES_LOCK:
+        if _COMPILED is None:
+            _COMPILED = _CompiledRules(_RULES)
+        return _COMPILED
+
+
+def match_step_rule(step: str) -> Optional[StepRule]:
+    return _compiled().match(step.lower())
+
+
+def locator_for(selector: str) -> str:
+    """Python source of the (By, value) pair for a CSS selector"""
+    if re.fullmatch(r"#[\w-]+", selector):
+        return f'By.ID, {json.dumps(selector[1:])}'
+    return f'By.CSS_SELECTOR, {json.dumps(selector)}'
+
+
+def page_ids(html_structure: Optional[Dict]) -> FrozenSet[str]:
+    """Element ids the HTML parser found on the target page"""
+    selectors = (html_structure or {}).get("selectors") or ()
+    return frozenset(s.id for group in selectors for s in group if s.id)
+
+
+PAUSE_LINE = re.compile(r"^[ \t]*time\.sleep\([^)]*\)\n", re.MULTILINE)
+
+
+def strip_pauses(code: str) -> str:
+    """Drop fixed time.sleep() lines (fast mode)"""
+    return PAUSE_LINE.sub("", code)
+
+
+def _place(template: str, slots: Dict[str, str]) -> str:
+    """Replace lines reading just $name with the slot's code at that indentation, or drop them"""
+    lines = []
+    for line in template.splitlines(keepends=True):
+        name = line.strip()
+        if name[1:] in slots and name.startswith("$"):
+            indent = line[:len(line) - len(line.lstrip())]
+            lines += [indent + code + "\n" for code in slots[name[1:]].splitlines() if code]
+        else:
+            lines.append(line)
+    return "".join(lines)
+
+
+@lru_cache(maxsize=4096)
+def render_rule(rule_name: str, selector: str, fast: bool = False, page_has_wait: bool = False) -> str:
+    """
+    Code fragment of a rule for a given target element, cached per
+    (rule, selector, fast, page_has_wait); page_has_wait tells whether the
+    page has the element the rule waits on.
+    """
+    rule = _compiled().by_name[rule_name]
+    before, wait = rule.wait if page_has_wait and rule.wait_id else rule.fallback
+    code = Template(_place(rule.template, {"before": before, "wait": wait})).substitute(
+        selector=json.dumps(selector), locator=locator_for(selector),
+        wait_locator=locator_for("#" + rule.wait_id) if rule.wait_id else "")
+    return strip_pauses(code) if fast else code
+
+
+def _compile_step(step: str, selector: Optional[str], fast: bool, wait_ids: FrozenSet[str]) -> str:
+    rule = match_step_rule(step)
+    if rule is None:
+        code = DEFAULT_TEMPLATE.format(step=comment_text(step))
+        return strip_pauses(code) if fast else code
+    return render_rule(rule.name, rule.selector if selector is None else selector, fast,
+                       rule.wait_id in wait_ids)
+
+
+@lru_cache(maxsize=8192)
+def _compile_default_step(step: str, fast: bool, wait_ids: FrozenSet[str]) -> str:
+    # Batches repeat the same step texts, so skip matching on repeats
+    return _compile_step(step, None, fast, wait_ids)
+
+
+def compile_step(step: str, selector: Optional[str] = None, fast: bool = False,
+                 html_structure: Optional[Dict] = None) -> str:
+    """
+    Selenium code for one test step; selector overrides the rule's target element.
+    Actions wait on elements parsed from html_structure (the cart total, the
+    payment result, ...) when the page has them, and on the element acted
+    on otherwise. fast=True also drops the fixed pauses left on steps that
+    have nothing to wait for.
+    """
+    # Only the ids some rule waits on matter, which keeps the cache key small
+    wait_ids = page_ids(html_structure) & _compiled().wait_ids
+    if selector is None:
+        return _compile_default_step(step, fast, wait_ids)
+    return _compile_step(step, selector, fast, wait_ids)
+
+
+DEFAULT_TEMPLATE = '''            # {step}
+            time.sleep(0.5)
+'''
+
+
+# Built-in rules, in the order the original if-chain checked them
+
+register_step_rule("navigate", [("navigate", "open")], '''            driver.get(self.base_url)
+            wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
+''', priority=10)
+
+register_step_rule("add_to_cart", [("add", "click"), ("cart",)], '''            add_btn = self.assert_element($locator, "Add to Cart button found")
+            if add_btn:
+                $before
+                add_btn.click()
+                $wait
+''', priority=20, selector=".btn-add", wait_id="cart-total",
+   wait=("total_before = driver.find_element($wait_locator).text",
+         "self.wait_for_text_change($wait_locator, total_before)"),
+   fallback=("", "wait.until(EC.presence_of_element_located(($locator)))"))
+
+register_step_rule("enter_coupon", [("coupon",), ("enter", "save15")], '''            coupon_input = self.assert_element($locator, "Coupon input field found")
+            if coupon_input:
+                coupon_input.clear()
+                coupon_input.send_keys("SAVE15")
+''', priority=30, selector="#coupon")
+
+APPLY_COUPON_TEMPLATE = '''            apply_btn = self.assert_element($locator, "Apply Coupon button found")
+            if apply_btn:
+                apply_btn.click()
+                $wait
+'''
+# Only steps that expect an alert wait the full timeout for one; otherwise
+# it is probed briefly so pages without alerts do not stall
+register_step_rule("apply_coupon_alert", [("apply",), ("coupon",), ("alert",)], APPLY_COUPON_TEMPLATE,
+                   priority=35, selector="#apply-coupon", fallback=("", "self.accept_alert()"))
+register_step_rule("apply_coupon", [("apply",), ("coupon",)], APPLY_COUPON_TEMPLATE, priority=40,
+                   selector="#apply-coupon", fallback=("", f"self.accept_alert(timeout={ALERT_PROBE_SECONDS})"))
+
+register_step_rule("fill_name", [("name",), ("fill", "enter")], '''            name_input = self.assert_element($locator, "Name field found")
+            if name_input:
+                name_input.clear()
+                name_input.send_keys("John Doe")
+''', priority=50, selector="#name")
+
+register_step_rule("fill_email", [("email",), ("fill", "enter")], '''            email_input = self.assert_element($locator, "Email field found")
+            if email_input:
+                email_input.clear()
+                email_input.send_keys("john.doe@example.com")
+''', priority=60, selector="#email")
+
+register_step_rule("fill_address", [("address",), ("fill", "enter")], '''            address_input = self.assert_element($locator, "Address field found")
+            if address_input:
+                address_input.clear()
+                address_input.send_keys("123 Main Street, City, State 12345")
+''', priority=70, selector="#address")
+
+register_step_rule("express_shipping", [("express",), ("shipping",)], '''            express_radio = self.assert_element($locator, "Express shipping option found")
+            if express_radio:
+                $before
+                express_radio.click()
+                $wait
+''', priority=80, selector="#ship-express", wait_id="shipping",
+   # Clicking an already selected radio changes nothing, so only wait when it was not
+   wait=("shipping_before = driver.find_element($wait_locator).text\n"
+         "already_express = express_radio.is_selected()",
+         "if not already_express:\n"
+         "    self.wait_for_text_change($wait_locator, shipping_before)"),
+   fallback=("", "wait.until(EC.element_located_to_be_selected(($locator)))"))
+
+register_step_rule("standard_shipping_default", [("standard",), ("verify", "default")], '''            standard_radio = driver.find_element($locator)
+            if standard_radio.is_selected():
+                self.log("✓ Standard shipping is selected by default")
+            else:
+                self.log("✗ Standard shipping should be default")
+                self.test_passed = False
+''', priority=90, selector="#ship-standard")
+
+register_step_rule("select_card", [("credit", "card"), ("select",)], '''            card_radio = self.assert_element($locator, "Credit card option found")
+            if card_radio:
+                card_radio.click()
+                $wait
+''', priority=100, selector="#pay-card", wait_id="card-fields",
+   wait=("", "wait.until(EC.visibility_of_element_located(($wait_locator)))"),
+   fallback=("", "wait.until(EC.element_located_to_be_selected(($locator)))"))
+
+register_step_rule("card_number", [("card number", "enter card")], '''            card_input = self.assert_element($locator, "Card number field found")
+            if card_input:
+                card_input.clear()
+                card_input.send_keys("4111111111111111")
+''', priority=110, selector="#card-number")
+
+register_step_rule("pay_now", [("pay now",)], '''            pay_btn = self.assert_element($locator, "Pay Now button found")
+            if pay_btn:
+                pay_btn.click()
+                $wait
+''', priority=120, selector="#pay-now", wait_id="payment-result",
+   wait=("", "self.wait_for_checkout_result($wait_locator)"),
+   fallback=("", "wait.until(EC.presence_of_element_located(($locator)))\n"
+                 f"self.accept_alert(timeout={ALERT_PROBE_SECONDS})"))
+
+VERIFY_SUCCESS_TEMPLATE = '''            success_msg = self.assert_element($locator, "Success message found")
+            if success_msg and "Successful" in success_msg.text:
+                self.log("✓ Payment success message verified")
+            else:
+                self.log("✗ Success message not displayed correctly")
+                self.test_passed = False
+'''
+register_step_rule("verify_success", [("success",)], VERIFY_SUCCESS_TEMPLATE, priority=130,
+                   selector="#payment-result")
+register_step_rule("verify_message", [("verify",), ("message",)], VERIFY_SUCCESS_TEMPLATE, priority=130,
+                   selector="#payment-result")
+
+register_step_rule("verify_total", [("verify",), ("discount", "total")], '''            cart_total = driver.find_element($locator)
+            self.log(f"Cart total: {cart_total.text}")
+''', priority=140, selector="#cart-total")
+
+register_step_rule("verify", [("verify",)], '''            # Verification step
+            time.sleep(0.5)
+''', priority=1000)
@@ -0,0 +1,340 @@
+# backend/app/targets.py
+#
+# Registry of the pages under test. A page is named by its path relative to
+# the target site directory (e.g. "checkout.html", "account/login.html") or
+# by an http(s) URL. URLs are only fetched when they were registered by the
+# server or match QA_AGENT_TARGET_URLS, so clients cannot point the server at
+# arbitrary hosts. Pages are parsed on first use and the parsed structure
+# is reused until the file's mtime/size change and its content hash with it.
+# Cached structures hold selectors and features only; the HTML itself stays
+# on disk (fetched pages are spooled to TARGET_CACHE_DIR) and is read back
+# with html_parser.load_raw_html() when something needs it.
+
+import hashlib
+import os
+import posixpath
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config import (TARGET_SITE_DIR, TARGET_URL_REVALIDATE, TARGET_FETCH_TIMEOUT, TARGET_CACHE_DIR,
+                     TARGET_URL_ALLOWLIST, TARGET_MAX_PAGES, TARGET_MAX_BYTES)
+from .html_parser import parse_html_content
+from .llm_integration import DEFAULT_BASE_URL
+
+# Local pages are opened from the same place as the default checkout page
+SITE_URL = DEFAULT_BASE_URL.rsplit("/", 1)[0] + "/"
+
+
+def is_url(target: str) -> bool:
+    return target.startswith(("http://", "https://"))
+
+
+def _normalized_path(path: str) -> str:
+    """URL path with %-escapes decoded and . / .. segments resolved, as a server would see it"""
+    path = urllib.parse.unquote(path).replace("\\", "/")
+    normalized = posixpath.normpath("/" + path.lstrip("/"))
+    if path.endswith("/") and normalized != "/":
+        normalized += "/"
+    return normalized
+
+
+def _under(path: str, prefix: str) -> bool:
+    """True if path is prefix or below it, matching whole segments (/shop does not cover /shop-admin)"""
+    if prefix.endswith("/"):
+        return path.startswith(prefix) or path == prefix.rstrip("/")
+    return path == prefix or path.startswith(prefix + "/")
+
+
+def url_allowed(url: str, allowlist: List[str] = TARGET_URL_ALLOWLIST) -> bool:
+    """True if url has the scheme, host and port of an allowlisted prefix and its path lies under the prefix's path"""
+    try:
+        parsed = urllib.parse.urlsplit(url)
+        port = parsed.port
+    except ValueError:
+        return False
+    if parsed.username is not None or parsed.password is not None:
+        return False
+    path = _normalized_path(parsed.path)
+    for prefix in allowlist:
+        allowed = urllib.parse.urlsplit(prefix)
+        if (parsed.scheme == allowed.scheme and parsed.hostname == allowed.hostname and port == allowed.port
+                and _under(path, _normalized_path(allowed.path))):
+            return True
+    return False
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could lead anywhere, including hosts that are not allowed
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_OPENER = urllib.request.build_opener(_NoRedirect)
+
+
+def _inside(path: Path, directory: Path) -> bool:
+    # Path.is_relative_to() needs Python 3.9
+    return path == directory or directory in path.parents
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Bytes held by obj and everything it contains (each object counted once)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class TargetPage:
+    """One registered page and its cached parse"""
+
+    def __init__(self, key: str, source: str, url: str):
+        self.key = key
+        self.source = source  # file path or URL
+        self.url = url        # where generated scripts open the page
+        self.structure = None
+        self.digest = None
+        self.signature = None  # (mtime_ns, size) of a file, (ETag, Last-Modified) of a URL
+        self.checked = 0.0
+        self.parses = 0
+        self.hits = 0
+        self.lock = threading.Lock()
+        # Spool files belong to this page object: an evicted page cannot delete
+        # the file of another page (or of a re-added page with the same key)
+        self.spool_id = uuid.uuid4().hex[:16]
+
+    def _read(self) -> Optional[bytes]:
+        """Current content, or None when it is known to be unchanged"""
+        if not is_url(self.source):
+            st = os.stat(self.source)
+            signature = (st.st_mtime_ns, st.st_size)
+            if self.structure is not None and signature == self.signature:
+                return None
+            with open(self.source, "rb") as f:
+                content = f.read()
+            self.signature = signature
+            return content
+
+        if self.structure is not None and time.monotonic() - self.checked < TARGET_URL_REVALIDATE:
+            return None
+
+        request = urllib.request.Request(self.source)
+        if self.structure is not None and self.signature:
+            etag, last_modified = self.signature
+            if etag:
+                request.add_header("If-None-Match", etag)
+            if last_modified:
+                request.add_header("If-Modified-Since", last_modified)
+        try:
+            with _OPENER.open(request, timeout=TARGET_FETCH_TIMEOUT) as response:
+                content = response.read(TARGET_MAX_BYTES + 1)
+                if len(content) > TARGET_MAX_BYTES:
+                    raise ValueError(f"{self.source} is larger than {TARGET_MAX_BYTES} bytes")
+                self.signature = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                raise ValueError(f"fetching {self.source} failed: HTTP {e.code}")
+            content = None
+        self.checked = time.monotonic()
+        return content
+
+    def _keep(self, content: bytes, digest: str) -> str:
+        """Where the parsed HTML can be read back from"""
+        if not is_url(self.source):
+            return self.source
+
+        # Named by page and content, so a spooled page never changes under a structure
+        # and pages serving the same HTML never share a file
+        os.makedirs(TARGET_CACHE_DIR, exist_ok=True)
+        path = os.path.join(TARGET_CACHE_DIR, f"{self.spool_id}-{digest}.html")
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(content)
+            os.replace(path + ".tmp", path)
+        if self.structure is not None and self.structure["html_path"] != path:
+            try:
+                os.remove(self.structure["html_path"])
+            except OSError:
+                pass
+        return path
+
+    def get(self) -> Dict:
+        with self.lock:
+            content = self._read()
+            if content is not None:
+                digest = hashlib.sha256(content).hexdigest()
+                # A file touched or re-served without edits keeps its parse
+                if digest != self.digest:
+                    structure = parse_html_content(content.decode("utf-8", errors="replace"))
+                    structure["url"] = self.url
+                    structure["sha256"] = digest
+                    structure["html_path"] = self._keep(content, digest)
+                    self.structure, self.digest = structure, digest
+                    self.parses += 1
+                    print(f"✓ Parsed {self.key} - Found {len(structure.get('features', []))} features")
+                    return self.structure
+            self.hits += 1
+            return self.structure
+
+    def discard(self):
+        """Remove the spooled copy of a fetched page"""
+        if is_url(self.source) and self.structure is not None:
+            try:
+                os.remove(self.structure["html_path"])
+            except OSError:
+                pass
+
+    def memory(self) -> Dict:
+        structure = self.structure
+        html_path = structure["html_path"] if structure else None
+        return {
+            "target": self.key,
+            "sha256": self.digest,
+            "structure_bytes": deep_sizeof(structure) if structure else 0,
+            "selectors": sum(len(group) for group in structure["selectors"]) if structure else 0,
+            "raw_html_bytes_on_disk": os.path.getsize(html_path) if html_path and os.path.exists(html_path) else 0,
+        }
+
+    def info(self) -> Dict:
+        return {
+            "target": self.key,
+            "url": self.url,
+            "parsed": self.structure is not None,
+            "sha256": self.digest,
+            "parses": self.parses,
+            "cache_hits": self.hits,
+        }
+
+
+class TargetRegistry:
+    """
+    Pages by name. Pages inside the site directory and URLs matching the
+    allowlist are added on first use and kept in an LRU of max_pages;
+    other files and URLs have to be registered explicitly, and registered
+    pages are never evicted.
+    """
+
+    def __init__(self, site_dir: str = TARGET_SITE_DIR, max_pages: int = TARGET_MAX_PAGES,
+                 url_allowlist: List[str] = TARGET_URL_ALLOWLIST):
+        self.site_dir = Path(site_dir).resolve()
+        self.max_pages = max_pages
+        self.url_allowlist = url_allowlist
+        self.default = None
+        self._pages: "OrderedDict[str, TargetPage]" = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def _page(self, key: str, source: str, url: str, pin: bool = False) -> TargetPage:
+        evicted = []
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None:
+                page = self._pages[key] = TargetPage(key, source, url)
+            self._pages.move_to_end(key)
+            if pin:
+                self._pinned.add(key)
+
+            unpinned = [k for k in self._pages if k not in self._pinned]
+            while len(unpinned) > self.max_pages:
+                evicted.append(self._pages.pop(unpinned.pop(0)))
+        for old in evicted:
+            old.discard()
+        return page
+
+    def _drop(self, page: TargetPage):
+        with self._lock:
+            if self._pages.get(page.key) is page and page.key not in self._pinned:
+                del self._pages[page.key]
+
+    def _local_page(self, path: Path, pin: bool = False) -> TargetPage:
+        if _inside(path, self.site_dir):
+            key = path.relative_to(self.site_dir).as_posix()
+            return self._page(key, str(path), SITE_URL + key, pin)
+        return self._page(str(path), str(path), path.as_uri(), pin)
+
+    def allows_url(self, url: str) -> bool:
+        """True if the server may open url: it matches the allowlist or is a registered page"""
+        if not is_url(url):
+            return False
+        if url_allowed(url, self.url_allowlist):
+            return True
+        with self._lock:
+            return any(self._pages[key].source == url for key in self._pinned)
+
+    def register(self, target: str, default: bool = False) -> str:
+        """Register a URL or a file path (relative to the working directory); returns its name"""
+        if is_url(target):
+            page = self._page(target, target, target, pin=True)
+        else:
+            page = self._local_page(Path(target).resolve(), pin=True)
+        if default or self.default is None:
+            self.default = page.key
+        return page.key
+
+    def resolve(self, target: Optional[str] = None) -> TargetPage:
+        if not target:
+            if self.default is None:
+                raise ValueError("no target page registered")
+            target = self.default
+
+        with self._lock:
+            page = self._pages.get(target)
+            if page is not None:
+                self._pages.move_to_end(target)
+                return page
+        if is_url(target):
+            if not url_allowed(target, self.url_allowlist):
+                raise ValueError(f"unknown target {target!r}: URL is not registered or allowed by QA_AGENT_TARGET_URLS")
+            return self._page(target, target, target)
+
+        path = (self.site_dir / target).resolve()
+        if not _inside(path, self.site_dir):
+            raise ValueError(f"unknown target {target!r}: not inside {self.site_dir}")
+        if not path.is_file():
+            raise ValueError(f"unknown target {target!r}")
+        return self._local_page(path)
+
+    def get(self, target: Optional[str] = None) -> Dict:
+        """Parsed structure of a page (the default page when target is empty)"""
+        if not target and self.default is None:
+            return {}
+        page = self.resolve(target)
+        try:
+            return page.get()
+        except Exception:
+            # A page that never loaded is not kept around
+            if page.structure is None:
+                self._drop(page)
+            raise
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            pages = list(self._pages.items())
+        return [{**page.info(), "default": key == self.default} for key, page in pages]
+
+    def memory(self) -> List[Dict]:
+        with self._lock:
+            pages = list(self._pages.values())
+        return [page.memory() for page in pages]
+
+
+TARGETS = TargetRegistry()
+
+
+def get_html_structure(target: Optional[str] = None) -> Dict:
+    return TARGETS.get(target)
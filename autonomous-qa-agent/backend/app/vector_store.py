@@ -0,0 +1,487 @@
+# backend/app/vector_store.py
+#
+# In-process vector store with the slice of the Chroma collection API that
+# rag.py and ingest_new.py use (upsert / delete / query / get / count), for
+# deployments where a Chroma client + SQLite round trip costs more than the
+# similarity math. Selected with QA_AGENT_VECTOR_BACKEND=local.
+#
+# On disk, in one directory per collection:
+#   vectors.f16    L2-normalized embeddings, float16, one row per write,
+#                  append-only and memory-mapped for search
+#   records.jsonl  append-only log: {"row", "id", "document", "metadata"}
+#                  for writes, {"delete": id} for deletes; the last write
+#                  of an id wins
+#   hnsw.bin       HNSW graph over the rows, once the store is large enough
+#   CURRENT        generation of the files above; generation N > 0 uses
+#                  vectors.N.f16, records.N.jsonl and hnsw.N.bin
+#
+# Upserts and deletes only append; rows they supersede are compacted away
+# once they make up VECTOR_COMPACT_RATIO of the file. Compaction writes the
+# next generation beside the current one and then switches CURRENT, so the
+# three files always change together.
+
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import VECTOR_HNSW_THRESHOLD, VECTOR_COMPACT_RATIO, VECTOR_COMPACT_MIN_ROWS
+
+try:
+    import hnswlib
+    HNSW_AVAILABLE = True
+except ImportError:
+    HNSW_AVAILABLE = False
+
+# Rows converted to float32 at a time during a flat scan
+SCAN_BLOCK_ROWS = 65536
+
+# Data files of any generation, and compaction leftovers
+STORE_FILE = re.compile(r"(vectors|records|hnsw)(\.\d+)?\.(f16|jsonl|bin)(\.tmp)?|CURRENT\.tmp")
+
+
+def _generation_files(path: str, generation: int) -> Dict[str, str]:
+    suffix = f".{generation}" if generation else ""
+    return {kind: os.path.join(path, f"{kind}{suffix}.{ext}")
+            for kind, ext in (("vectors", "f16"), ("records", "jsonl"), ("hnsw", "bin"))}
+
+
+def _fsync_write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+def metadata_matches(metadata: Dict, where: Dict) -> bool:
+    """Chroma-style metadata filter: {"k": v}, {"k": {"$eq"|"$ne"|"$in"|"$nin": ...}}, {"$and"|"$or": [...]}"""
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(metadata_matches(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(metadata_matches(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            for op, operand in cond.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+class LocalCollection:
+    """Chroma-compatible collection backed by a memory-mapped float16 matrix"""
+
+    def __init__(self, path: str,
+                 hnsw_threshold: int = VECTOR_HNSW_THRESHOLD,
+                 compact_ratio: float = VECTOR_COMPACT_RATIO,
+                 compact_min_rows: int = VECTOR_COMPACT_MIN_ROWS):
+        self.path = path
+        self.hnsw_threshold = hnsw_threshold
+        self.compact_ratio = compact_ratio
+        self.compact_min_rows = compact_min_rows
+
+        self._current_path = os.path.join(path, "CURRENT")
+        self._lock = threading.RLock()
+
+        self.dim = None
+        self._rows = 0          # rows in vectors.f16
+        self._mmap = None       # mapping of the first _mapped rows
+        self._mapped = 0
+        self._row_of = {}       # id -> live row
+        self._records = {}      # live row -> (id, document, metadata)
+        self._hnsw = None
+        self._hnsw_rows = 0     # rows added to the graph so far
+
+        os.makedirs(path, exist_ok=True)
+        self._use_generation(self._read_generation())
+        self._remove_stale_files()
+        self._load()
+
+    # --------------------------------------------------------------
+    # Persistence
+    # --------------------------------------------------------------
+
+    def _read_generation(self) -> int:
+        try:
+            with open(self._current_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return 0
+
+    def _use_generation(self, generation: int):
+        self._generation = generation
+        files = _generation_files(self.path, generation)
+        self._vectors_path, self._records_path, self._hnsw_path = files["vectors"], files["records"], files["hnsw"]
+
+    def _remove_stale_files(self):
+        """Delete files of other generations, left by a compaction that did not finish cleaning up"""
+        current = {os.path.basename(p) for p in (self._vectors_path, self._records_path, self._hnsw_path)}
+        for name in os.listdir(self.path):
+            if STORE_FILE.fullmatch(name) and name not in current:
+                os.remove(os.path.join(self.path, name))
+
+    def _load(self):
+        if os.path.exists(self._records_path):
+            good = 0
+            with open(self._records_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash mid-write
+                    good += len(line)
+                    if "delete" in record:
+                        row = self._row_of.pop(record["delete"], None)
+                        self._records.pop(row, None)
+                        continue
+                    self.dim = record.get("dim", self.dim)
+                    old = self._row_of.get(record["id"])
+                    if old is not None:
+                        del self._records[old]
+                    self._row_of[record["id"]] = record["row"]
+                    self._records[record["row"]] = (record["id"], record["document"], record["metadata"])
+                    self._rows = max(self._rows, record["row"] + 1)
+            # Cut a torn line off so the next append starts on a fresh line
+            if good != os.path.getsize(self._records_path):
+                with open(self._records_path, "r+b") as f:
+                    f.truncate(good)
+
+        # Vectors written after the last logged record never committed - cut them off.
+        # Fewer vectors than logged rows cannot come from a crash; refuse rather than pad.
+        if self.dim:
+            row_bytes = self.dim * 2
+            size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+            if size < self._rows * row_bytes:
+                raise ValueError(f"{self._vectors_path} holds {size // row_bytes} vectors but "
+                                 f"{self._records_path} logs {self._rows} rows; delete {self.path} and rebuild the KB")
+            if size > self._rows * row_bytes:
+                with open(self._vectors_path, "r+b") as f:
+                    f.truncate(self._rows * row_bytes)
+
+    def _matrix(self) -> np.ndarray:
+        """float16 view of every row written so far"""
+        if self._rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float16)
+        if self._mmap is None or self._mapped != self._rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float16, mode="r", shape=(self._rows, self.dim))
+            self._mapped = self._rows
+        return self._mmap
+
+    def _append(self, ids: List[str], vectors: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        first = self._rows
+        with open(self._vectors_path, "ab") as f:
+            f.write(vectors.astype(np.float16).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        # The log line is the commit point for its row
+        with open(self._records_path, "a", encoding="utf-8") as f:
+            for offset, (id_, doc, meta) in enumerate(zip(ids, documents, metadatas)):
+                f.write(json.dumps({"row": first + offset, "id": id_, "document": doc,
+                                    "metadata": meta, "dim": self.dim}) + "\n")
+
+        self._rows += len(ids)
+        for offset, (id_, doc, meta) in enumerate(zip(ids, documents, metadatas)):
+            old = self._row_of.get(id_)
+            if old is not None:
+                self._drop_row(old)
+            self._row_of[id_] = first + offset
+            self._records[first + offset] = (id_, doc, meta)
+
+        if self._hnsw is not None:
+            self._hnsw_add(first, self._rows)
+
+    def _drop_row(self, row: int):
+        del self._records[row]
+        if self._hnsw is not None and row < self._hnsw_rows:
+            try:
+                self._hnsw.mark_deleted(row)
+            except RuntimeError:
+                pass
+
+    # --------------------------------------------------------------
+    # Chroma collection API
+    # --------------------------------------------------------------
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._row_of)
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict]] = None):
+        if not ids:
+            return
+        vectors = _normalize(embeddings)
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [{}] * len(ids)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+
+            self._append(list(ids), vectors, list(documents), [m or {} for m in metadatas])
+            self._maybe_compact()
+
+    add = upsert
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None):
+        with self._lock:
+            doomed = [i for i in (ids or []) if i in self._row_of]
+            if where:
+                doomed += [id_ for id_, _, meta in self._records.values() if metadata_matches(meta, where)]
+            doomed = list(dict.fromkeys(doomed))
+            if not doomed:
+                return
+
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                for id_ in doomed:
+                    f.write(json.dumps({"delete": id_}) + "\n")
+            for id_ in doomed:
+                self._drop_row(self._row_of.pop(id_))
+            self._maybe_compact()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            include: Optional[List[str]] = None) -> Dict:
+        with self._lock:
+            if ids is not None:
+                rows = [self._row_of[i] for i in ids if i in self._row_of]
+            else:
+                rows = sorted(self._records)
+            records = [(row, self._records[row]) for row in rows]
+            if where:
+                records = [(row, rec) for row, rec in records if metadata_matches(rec[2], where)]
+
+            result = {
+                "ids": [rec[0] for _, rec in records],
+                "documents": [rec[1] for _, rec in records],
+                "metadatas": [rec[2] for _, rec in records],
+            }
+            if include and "embeddings" in include:
+                matrix = self._matrix()
+                result["embeddings"] = [matrix[row].astype(np.float32).tolist() for row, _ in records]
+            return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              include: Optional[List[str]] = None) -> Dict:
+        """
+        Top n_results per query. distances are squared L2 between normalized
+        vectors (2 - 2 * cosine), matching Chroma's default space.
+        """
+        queries = _normalize(query_embeddings)
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+
+        with self._lock:
+            if where:
+                candidates = np.array([row for row, rec in self._records.items() if metadata_matches(rec[2], where)],
+                                      dtype=np.int64)
+                hits = self._flat_search(queries, n_results, candidates)
+            elif self._use_hnsw():
+                hits = self._hnsw_search(queries, n_results)
+            else:
+                hits = self._flat_search(queries, n_results, None)
+
+            for rows, scores in hits:
+                records = [self._records[row] for row in rows]
+                result["ids"].append([rec[0] for rec in records])
+                result["documents"].append([rec[1] for rec in records])
+                result["metadatas"].append([rec[2] for rec in records])
+                result["distances"].append([float(2 - 2 * s) for s in scores])
+                if include and "embeddings" in include:
+                    matrix = self._matrix()
+                    result.setdefault("embeddings", []).append(
+                        [matrix[row].astype(np.float32).tolist() for row in rows])
+        return result
+
+    # --------------------------------------------------------------
+    # Search
+    # --------------------------------------------------------------
+
+    def _flat_search(self, queries: np.ndarray, k: int, candidates: Optional[np.ndarray]):
+        """Exact inner-product top-k over live rows (or the given candidate rows), scanned in blocks"""
+        rows = candidates if candidates is not None else np.fromiter(self._records, dtype=np.int64)
+        if len(rows) == 0 or self.dim is None:
+            return [([], []) for _ in queries]
+        rows.sort()
+        k = min(k, len(rows))
+        matrix = self._matrix()
+
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(rows), SCAN_BLOCK_ROWS):
+            block = rows[start:start + SCAN_BLOCK_ROWS]
+            # Contiguous live rows (the common case) are a slice, not a gather
+            if block[-1] - block[0] + 1 == len(block):
+                vectors = matrix[block[0]:block[-1] + 1]
+            else:
+                vectors = matrix[block]
+            scores = queries @ np.asarray(vectors, dtype=np.float32).T
+
+            best_rows = np.concatenate([best_rows, np.broadcast_to(block, scores.shape)], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        return [(r.tolist(), s.tolist()) for r, s in zip(best_rows, best_scores)]
+
+    def _use_hnsw(self) -> bool:
+        if not HNSW_AVAILABLE or len(self._records) < self.hnsw_threshold:
+            return False
+        if self._hnsw is None:
+            self._hnsw_build()
+        return True
+
+    def _hnsw_build(self):
+        capacity = max(self._rows * 2, 1024)
+        index, covered = None, 0
+
+        # A saved graph covers a prefix of the rows; only the rows after it are added
+        if os.path.exists(self._hnsw_path):
+            try:
+                index = hnswlib.Index(space="ip", dim=self.dim)
+                index.load_index(self._hnsw_path, max_elements=capacity)
+                covered = index.element_count
+            except RuntimeError:
+                index = None
+            if index is not None and covered > self._rows:
+                index, covered = None, 0
+        if index is None:
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            index.init_index(max_elements=capacity, ef_construction=200, M=16)
+
+        self._hnsw, self._hnsw_rows = index, covered
+        for row in range(covered):
+            if row not in self._records:
+                try:
+                    index.mark_deleted(row)
+                except RuntimeError:
+                    pass
+        self._hnsw_add(covered, self._rows)
+        index.save_index(self._hnsw_path)
+        print(f"✓ HNSW index over {len(self._records)} vectors in {self.path}")
+
+    def _hnsw_add(self, first: int, last: int):
+        if last <= first:
+            return
+        if last > self._hnsw.get_max_elements():
+            self._hnsw.resize_index(max(last * 2, 1024))
+        matrix = self._matrix()
+        for start in range(first, last, SCAN_BLOCK_ROWS):
+            end = min(start + SCAN_BLOCK_ROWS, last)
+            self._hnsw.add_items(np.asarray(matrix[start:end], dtype=np.float32), np.arange(start, end))
+        for row in range(first, last):
+            if row not in self._records:
+                self._hnsw.mark_deleted(row)
+        self._hnsw_rows = last
+
+    def _hnsw_search(self, queries: np.ndarray, k: int):
+        k = min(k, len(self._records))
+        if k == 0:
+            return [([], []) for _ in queries]
+        self._hnsw.set_ef(max(100, k))
+        try:
+            labels, distances = self._hnsw.knn_query(queries, k=k)
+        except RuntimeError:
+            # Too many deleted neighbours to fill k results - answer exactly instead
+            return self._flat_search(queries, k, None)
+        # space="ip" distance is 1 - inner product
+        return [(r.astype(np.int64).tolist(), (1 - d).tolist()) for r, d in zip(labels, distances)]
+
+    # --------------------------------------------------------------
+    # Compaction
+    # --------------------------------------------------------------
+
+    def _maybe_compact(self):
+        dead = self._rows - len(self._records)
+        if dead >= self.compact_min_rows and dead >= self._rows * self.compact_ratio:
+            self.compact()
+
+    def compact(self):
+        """
+        Rewrite the store with only the live rows (renumbered in their current
+        order) as the next generation, then switch CURRENT to it in one
+        os.replace. A crash at any point leaves one complete generation.
+        """
+        with self._lock:
+            live = sorted(self._records)
+            matrix = self._matrix()
+            old = _generation_files(self.path, self._generation)
+            new_generation = self._generation + 1
+            new = _generation_files(self.path, new_generation)
+
+            with open(new["vectors"], "wb") as vf, open(new["records"], "w", encoding="utf-8") as rf:
+                for start in range(0, len(live), SCAN_BLOCK_ROWS):
+                    block = live[start:start + SCAN_BLOCK_ROWS]
+                    vf.write(np.asarray(matrix[block], dtype=np.float16).tobytes())
+                for new_row, row in enumerate(live):
+                    id_, doc, meta = self._records[row]
+                    rf.write(json.dumps({"row": new_row, "id": id_, "document": doc,
+                                         "metadata": meta, "dim": self.dim}) + "\n")
+                for f in (vf, rf):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            # The switch: CURRENT names the new generation from here on
+            _fsync_write(self._current_path + ".tmp", str(new_generation).encode())
+            os.replace(self._current_path + ".tmp", self._current_path)
+
+            # Row numbers changed - the graph is rebuilt on the next query that needs it
+            self._hnsw = None
+            self._hnsw_rows = 0
+            self._mmap = None
+            self._mapped = 0
+            self._use_generation(new_generation)
+            for stale in old.values():
+                if os.path.exists(stale):
+                    os.remove(stale)
+
+            dead = self._rows - len(live)
+            self._records = {new_row: self._records[row] for new_row, row in enumerate(live)}
+            self._row_of = {rec[0]: row for row, rec in self._records.items()}
+            self._rows = len(live)
+            print(f"✓ Compacted {self.path}: dropped {dead} superseded rows, {self._rows} live")
+
+    def close(self):
+        with self._lock:
+            if self._hnsw is not None:
+                self._hnsw.save_index(self._hnsw_path)
+            self._mmap = None
+            self._mapped = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "backend": "local",
+                "count": len(self._records),
+                "rows_on_disk": self._rows,
+                "dim": self.dim,
+                "vectors_bytes": os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0,
+                "index": "hnsw" if self._hnsw is not None else "flat",
+            }
@@ -0,0 +1,158 @@
+# benchmarks/bench_embedding_backends.py
+"""
+Compares the torch and int8 ONNX embedding backends on the support_docs
+corpus: load time, peak RSS, docs/second, single-query latency, and how
+often both backends retrieve the same chunks.
+
+  cd autonomous-qa-agent
+  python benchmarks/bench_embedding_backends.py [--backends torch onnx] [--copies 20]
+
+Each backend runs in its own process so import cost and RSS are not shared.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.chunking import iter_segment_chunks  # noqa: E402
+from backend.app.extractors import iter_text_segments  # noqa: E402
+
+QUERIES = [
+    "apply discount code SAVE15",
+    "invalid coupon code error message",
+    "express shipping cost",
+    "free standard shipping",
+    "pay with credit card",
+    "pay with PayPal or UPI",
+    "required form fields validation",
+    "invalid email address error",
+    "add product to cart and update total",
+    "successful payment confirmation",
+    "pay now button color",
+    "cart total calculation",
+]
+
+
+def load_corpus(docs_dir: str):
+    chunks = []
+    for name in sorted(os.listdir(docs_dir)):
+        path = os.path.join(docs_dir, name)
+        chunks.extend(c["text"] for c in iter_segment_chunks(name, iter_text_segments(path)))
+    return chunks
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(backend: str, docs, queries, batch_size: int, conn):
+    start = time.perf_counter()
+    from backend.app.embedding_backends import load_backend
+
+    try:
+        model = load_backend(backend)
+    except Exception as e:
+        conn.send({"backend": backend, "error": f"{type(e).__name__}: {e}"})
+        conn.close()
+        return
+    model.encode(["warm up"])
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vecs = np.asarray(model.encode(docs, batch_size=batch_size), dtype=np.float32)
+    docs_s = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(3):
+        for q in queries:
+            start = time.perf_counter()
+            model.encode([q])
+            latencies.append((time.perf_counter() - start) * 1000)
+    query_vecs = np.asarray(model.encode(queries), dtype=np.float32)
+
+    conn.send({
+        "backend": backend,
+        "load_s": load_s,
+        "rss_mb": _peak_rss_mb(),
+        "docs_per_s": len(docs) / docs_s,
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "doc_vecs": doc_vecs,
+        "query_vecs": query_vecs,
+    })
+    conn.close()
+
+
+def run_backend(backend: str, docs, queries, batch_size: int):
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=measure, args=(backend, docs, queries, batch_size, send))
+    proc.start()
+    send.close()
+    result = recv.recv()
+    proc.join()
+    return result
+
+
+def top_k(doc_vecs, query_vecs, k: int):
+    scores = query_vecs @ doc_vecs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def agreement(base, other, n_unique: int, k: int):
+    """Top-k overlap and top-1 match rate over the unique corpus, and mean cosine of paired doc vectors"""
+    a = top_k(base["doc_vecs"][:n_unique], base["query_vecs"], k)
+    b = top_k(other["doc_vecs"][:n_unique], other["query_vecs"], k)
+    overlap = np.mean([len(set(x) & set(y)) / k for x, y in zip(a, b)])
+    top1 = np.mean(a[:, 0] == b[:, 0])
+    cosine = np.mean(np.sum(base["doc_vecs"][:n_unique] * other["doc_vecs"][:n_unique], axis=1))
+    return overlap, top1, cosine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--docs-dir", default="support_docs")
+    parser.add_argument("--copies", type=int, default=20, help="repeat the corpus to get a stable docs/s figure")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.docs_dir)
+    docs = corpus * args.copies
+    print(f"{len(corpus)} chunks from {args.docs_dir} x {args.copies} copies, {len(QUERIES)} queries\n")
+
+    results = []
+    for backend in args.backends:
+        result = run_backend(backend, docs, QUERIES, args.batch_size)
+        if "error" in result:
+            print(f"skipping {backend}: {result['error']}")
+        else:
+            results.append(result)
+    if not results:
+        return
+
+    print(f"{'backend':<8} {'load s':>8} {'RSS MB':>8} {'docs/s':>9} {'query p50':>10} {'query p95':>10}")
+    for r in results:
+        print(f"{r['backend']:<8} {r['load_s']:>8.2f} {r['rss_mb']:>8.0f} {r['docs_per_s']:>9.1f} "
+              f"{r['query_p50_ms']:>8.2f}ms {r['query_p95_ms']:>8.2f}ms")
+
+    base = results[0]
+    k = min(args.k, len(corpus))
+    for other in results[1:]:
+        overlap, top1, cosine = agreement(base, other, len(corpus), k)
+        print(f"\n{other['backend']} vs {base['backend']}: top-{k} overlap {overlap:.1%}, "
+              f"top-1 agreement {top1:.1%}, mean doc-vector cosine {cosine:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_script_generation.py
+"""
+Measures Selenium script generation throughput.
+
+  cd autonomous-qa-agent
+  python benchmarks/bench_script_generation.py [--sizes 1 100 10000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.app.llm_integration import generate_test_cases_with_llm, generate_selenium_with_html  # noqa: E402
+from backend.app.generator import create_selenium_test_files  # noqa: E402
+from backend.app.step_rules import render_rule, _compile_default_step  # noqa: E402
+
+PROMPT = "complete checkout with coupon, cart, express shipping, payment and form validation"
+
+
+def make_test_cases(n: int):
+    """n test cases cycled from the built-in checkout scenarios, with unique ids"""
+    base = generate_test_cases_with_llm(PROMPT, "", {})
+    return [{**base[i % len(base)], "Test_ID": f"TC-{i + 1:05d}"} for i in range(n)]
+
+
+def bench(label: str, fn, test_cases, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(test_cases)
+        best = min(best, time.perf_counter() - start)
+
+    rate = len(test_cases) / best if best else float("inf")
+    print(f"{label:<12} {len(test_cases):>7} cases  {best * 1000:>9.1f} ms  {rate:>10.0f} scripts/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        test_cases = make_test_cases(n)
+        bench("scripts", lambda tcs: [generate_selenium_with_html(tc, {}) for tc in tcs], test_cases, args.repeat)
+        bench("pytest files", create_selenium_test_files, test_cases, args.repeat)
+
+    for name, cached in (("step code", _compile_default_step), ("rule fragment", render_rule)):
+        info = cached.cache_info()
+        print(f"{name} cache: {info.hits} hits, {info.misses} misses, {info.currsize} entries")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import time
 from pathlib import Path
 
 BACKEND_URL = "http://127.0.0.1:8000"
@@ -64,9 +65,28 @@ st.markdown("---")
 st.markdown("### Build Knowledge Base")
 
 if st.button("Build KB"):
-    with st.spinner("Building KB…"):
-        resp = requests.post(f"{BACKEND_URL}/build_kb")
-    st.write(resp.json())
+    resp = requests.post(f"{BACKEND_URL}/build_kb").json()
+
+    if "job_id" not in resp:
+        st.write(resp)
+    else:
+        bar = st.progress(0.0, text="Building KB…")
+        job = resp
+        while job.get("status") in ("queued", "running"):
+            time.sleep(1)
+            job = requests.get(f"{BACKEND_URL}/jobs/{resp['job_id']}").json()
+
+            progress = job.get("progress", {})
+            done = progress.get("bytes_processed", 0) / max(progress.get("bytes_total", 0), 1)
+            eta = job.get("eta_seconds")
+            bar.progress(min(done, 1.0), text=(
+                f"{progress.get('docs_extracted', 0)}/{progress.get('docs_total', 0)} docs · "
+                f"{progress.get('chunks_embedded', 0)} chunks · "
+                f"{job.get('chunks_per_second', 0)} chunks/s"
+                + (f" · ETA {eta}s" if eta is not None else "")
+            ))
+
+        st.write(job.get("result") or job)
 
 # -------------------------------------------------------
 # GENERATE TEST CASES
@@ -75,29 +95,107 @@ st.markdown("---")
 st.markdown("### Generate Test Cases")
 
 prompt = st.text_area("Describe what tests you want:", height=120)
+target_page = st.text_input("Target page (optional)", "",
+                            help="Path under target_site/ or a URL; empty uses checkout.html")
 
 if st.button("Generate Test Cases"):
     if not prompt.strip():
         st.warning("Please enter a test prompt.")
     else:
         with st.spinner("Generating tests…"):
-            resp = requests.post(f"{BACKEND_URL}/generate_tests", json={"prompt": prompt})
+            resp = requests.post(f"{BACKEND_URL}/generate_tests",
+                                 json={"prompt": prompt, "target": target_page.strip() or None})
         st.write(resp.json())
         if "tests" in resp.json():
             st.session_state["latest_tests"] = resp.json()["tests"]
+            st.session_state["latest_target"] = target_page.strip() or None
 
 # -------------------------------------------------------
 # SHOW TEST CASES + SELENIUM EXPORT
 # -------------------------------------------------------
 tests = st.session_state.get("latest_tests", [])
+tests_target = st.session_state.get("latest_target")
 
 if tests:
     st.markdown("### Generated Test Cases")
+    fast_mode = st.checkbox("Fast mode (no fixed pauses in scripts)",
+                            help="Scripts always wait on page conditions; fast mode also drops the remaining time.sleep() pauses")
 
     for idx, test in enumerate(tests):
         st.json(test)  # OLD WAY
 
         if st.button(f"Generate Selenium Script #{idx+1}"):
+            resp = requests.post(f"{BACKEND_URL}/generate_script", json=test,
+                                 params={"fast": fast_mode, "target": tests_target})
+            script = resp.json().get("script", "")
+            st.code(script, language="python")
+            st.download_button(
+                "Download Python Script",
+                script,
+                file_name=f"{test.get('Test_ID', 'test')}.py",
+                key=f"download-{idx}"
+            )
+
+    st.markdown("### Export All")
+    bundle_format = st.radio("Bundle format", ["zip", "module"], horizontal=True,
+                             help="zip: one pytest file per test + shared conftest.py · module: a single pytest file")
+    reuse_browsers = st.checkbox("Reuse browsers between tests (driver pool)",
+                                 help="Set NETCART_DRIVER_POOL_SIZE when running tests in parallel threads")
+
+    if st.button("Generate All Selenium Scripts"):
+        with st.spinner("Generating scripts…"):
+            resp = requests.post(f"{BACKEND_URL}/generate_script/batch",
+                                 json={"test_cases": tests, "format": bundle_format,
+                                       "driver": "pool" if reuse_browsers else "per_test",
+                                       "fast": fast_mode, "target": tests_target})
+        if bundle_format == "zip":
+            st.download_button("Download Test Bundle (.zip)", resp.content,
+                               file_name="netcart_selenium_tests.zip", mime="application/zip")
+        else:
+            st.download_button("Download Test Module (.py)", resp.content,
+                               file_name="test_netcart.py", mime="text/x-python")
+
+    st.markdown("### Run Tests")
+    executor = st.radio("Executor", ["selenium", "dom"], horizontal=True,
+                        help="selenium: real headless Chrome · dom: in-process simulation of checkout.html, "
+                             "falling back to Selenium for steps it cannot judge")
+    run_workers = st.number_input("Parallel browsers", min_value=1, max_value=16, value=2)
+
+    if st.button("Run All Tests"):
+        resp = requests.post(f"{BACKEND_URL}/run_tests",
+                             json={"test_cases": tests, "workers": int(run_workers), "fast": True,
+                                   "executor": executor, "target": tests_target}).json()
+
+        if executor == "dom" and "results" in resp:
+            st.write(resp["summary"])
+            st.dataframe([{k: v for k, v in r.items() if k != "steps"} for r in resp["results"]])
+
+        job_id = resp.get("job_id") or resp.get("fallback_job_id")
+        if job_id:
+            bar = st.progress(0.0, text="Running tests in Chrome…")
+            job = {"status": "queued"}
+            while job.get("status") in ("queued", "running"):
+                time.sleep(1)
+                job = requests.get(f"{BACKEND_URL}/jobs/{job_id}").json()
+
+                progress = job.get("progress", {})
+                done = progress.get("docs_extracted", 0) / max(progress.get("docs_total", 0), 1)
+                bar.progress(min(done, 1.0), text=(
+                    f"{progress.get('docs_extracted', 0)}/{progress.get('docs_total', 0)} tests finished"
+                ))
+
+            result = job.get("result")
+            if not result:
+                st.write(job)
+            else:
+                st.write(result["summary"])
+                st.dataframe(result["results"])
+                report = requests.get(f"{BACKEND_URL}/run_tests/{job_id}/report",
+                                      params={"format": "junit"})
+                st.download_button("Download JUnit Report", report.content,
+                                   file_name="junit.xml", mime="application/xml")
+        elif "results" not in resp:
+            st.write(resp)
 
 # -------------------------------------------------------
 # SIDEBAR HEALTH CHECK
@@ -0,0 +1,13 @@
+# tests/conftest.py
+#
+#   cd autonomous-qa-agent
+#   python -m pytest tests
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Resolve target pages against the bundled site wherever pytest is started from
+os.environ.setdefault("QA_AGENT_TARGET_SITE", os.path.join(ROOT, "target_site"))
@@ -0,0 +1,57 @@
+# tests/test_context.py
+
+from backend.app.context import MIN_TRIMMED_TOKENS, estimate_tokens, make_hit, mmr_select, trim_to_budget
+
+
+def hit(id_, score, text="chunk text", start=None):
+    metadata = {"source": "product_specs.md"}
+    if start is not None:
+        metadata.update(text_start=start, text_end=start + len(text))
+    return make_hit(id_, text, metadata, score)
+
+
+def test_mmr_drops_near_duplicates():
+    hits = [hit("a", 1.0), hit("a-copy", 0.9), hit("b", 0.8)]
+    vectors = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+    assert [h.id for h in mmr_select(hits, vectors, k=3)] == ["a", "b"]
+
+
+def test_mmr_prefers_a_different_hit_over_a_similar_better_one():
+    hits = [hit("a", 1.0), hit("similar", 0.95), hit("other", 0.8)]
+    vectors = [[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]]
+    assert [h.id for h in mmr_select(hits, vectors, k=2)] == ["a", "other"]
+    assert [h.id for h in mmr_select(hits, vectors, k=2, lambda_=1.0)] == ["a", "similar"]
+
+
+def test_hits_without_vectors_are_kept():
+    hits = [hit("a", 1.0), hit("lexical", 0.5), hit("b", 0.4)]
+    picked = mmr_select(hits, [[1.0, 0.0], None, [1.0, 0.0]], k=3)
+    assert [h.id for h in picked] == ["a", "lexical"]
+
+
+def test_trim_keeps_whole_hits_that_fit():
+    hits = [hit("a", 1.0, "x" * 40), hit("b", 0.5, "y" * 40)]
+    assert trim_to_budget(hits, budget=20) == hits
+
+
+def test_trim_cuts_the_first_hit_that_does_not_fit_and_moves_text_end():
+    document = " ".join(f"word{i}" for i in range(200))
+    start = document.index("word50")
+    first = hit("a", 1.0, "intro " * 10)
+    second = hit("b", 0.5, document[start:], start=start)
+    budget = estimate_tokens(first.text) + MIN_TRIMMED_TOKENS + 5
+
+    kept = trim_to_budget([first, second, hit("c", 0.1)], budget=budget)
+    assert [h.id for h in kept] == ["a", "b"]
+    trimmed = kept[1]
+    assert len(trimmed.text) < len(second.text)
+    assert not trimmed.text.endswith(" ") and trimmed.text.split()[-1].startswith("word")
+    assert trimmed.text_start == start
+    assert trimmed.text_end == start + len(trimmed.text)
+    assert document[trimmed.text_start:trimmed.text_end] == trimmed.text
+
+
+def test_trim_leaves_out_a_hit_with_too_little_room():
+    first = hit("a", 1.0, "x" * 40)
+    budget = estimate_tokens(first.text) + MIN_TRIMMED_TOKENS - 1
+    assert trim_to_budget([first, hit("b", 0.5, "word " * 100, start=0)], budget=budget) == [first]
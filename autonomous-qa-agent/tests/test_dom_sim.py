@@ -0,0 +1,86 @@
+# tests/test_dom_sim.py
+
+import pytest
+
+from backend.app.dom_sim import CheckoutSimulation, page_model_for, run_step, simulate_test_case
+from backend.app.targets import get_html_structure
+
+
+@pytest.fixture(scope="module")
+def page():
+    return page_model_for(get_html_structure("checkout.html"))
+
+
+def run(page, *steps):
+    test_case = {"Test_ID": "TC-SIM", "Steps": list(steps)}
+    return simulate_test_case(test_case, page)
+
+
+def test_save15_takes_15_percent_off_the_total(page):
+    sim = CheckoutSimulation(page)
+    run_step(sim, "Add 'Smart Watch' to cart")
+    ok, detail = run_step(sim, "Apply coupon code 'SAVE15'")
+    assert ok and detail == "alert: Coupon applied: 15% OFF"
+    assert sim.element_text("cart-total") == "$67.99"
+    assert run_step(sim, "Verify the 15% discount is applied to the total")[0]
+
+
+def test_invalid_coupon_is_not_applied(page):
+    sim = CheckoutSimulation(page)
+    run_step(sim, "Add an item to cart")
+    assert run_step(sim, "Apply coupon code 'SAVE99'") == (True, "alert: Invalid coupon")
+    assert sim.applied_coupon is None
+    assert run_step(sim, "Verify an error is shown and the coupon discount not applied")[0]
+    assert not run_step(sim, "Verify the 15% discount is applied")[0]
+
+
+def test_express_shipping_adds_10_dollars(page):
+    sim = CheckoutSimulation(page)
+    run_step(sim, "Add an item to cart")
+    total = sim.total()
+    assert sim.element_text("shipping") == "Free"
+    run_step(sim, "Select express shipping")
+    assert sim.element_text("shipping") == "$10.00"
+    assert sim.total() == pytest.approx(total + 10)
+    assert run_step(sim, "Verify the total increases by $10")[0]
+
+
+def test_express_shipping_is_discounted_with_the_coupon(page):
+    result = run(page, "Add an item to cart", "Select express shipping", "Apply coupon code 'SAVE15'",
+                 "Verify the 15% discount is applied to the total")
+    assert result["status"] == "passed", result["message"]
+
+
+def test_standard_shipping_is_selected_by_default(page):
+    sim = CheckoutSimulation(page)
+    assert run_step(sim, "Verify Standard shipping is selected by default (id='ship-standard')")[0]
+    run_step(sim, "Select express shipping")
+    assert not run_step(sim, "Verify Standard shipping is selected by default (id='ship-standard')")[0]
+
+
+def test_missing_name_and_bad_email_show_both_errors(page):
+    result = run(page, "Add an item to cart", "Leave the name field empty", "Enter email 'not-an-email'",
+                 "Click Pay Now", "Verify error messages are displayed (id='err-name') (id='err-email')")
+    assert result["status"] == "passed", result["message"]
+    assert result["steps"][3]["detail"] == "payment blocked"
+
+
+def test_valid_form_pays(page):
+    result = run(page, "Add an item to cart", "Enter name", "Enter email", "Enter card number",
+                 "Click Pay Now", "Verify 'Payment Successful' message is displayed")
+    assert result["status"] == "passed", result["message"]
+
+
+def test_empty_cart_blocks_payment(page):
+    sim = CheckoutSimulation(page)
+    run_step(sim, "Enter name")
+    run_step(sim, "Enter email")
+    _, detail = run_step(sim, "Click Pay Now")
+    assert detail == "payment blocked · alert: Cart is empty. Add items before checkout."
+    assert not sim.visible("payment-result")
+
+
+def test_wrong_expectation_fails_and_unknown_step_needs_browser(page):
+    failed = run(page, "Add an item to cart", "Click Pay Now", "Verify 'Payment Successful' message is displayed")
+    assert failed["status"] == "failed"
+    assert run(page, "Drag the slider to 50%")["status"] == "needs_browser"
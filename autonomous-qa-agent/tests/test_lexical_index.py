@@ -0,0 +1,84 @@
+# tests/test_lexical_index.py
+
+import pytest
+
+from backend.app.lexical_index import LexicalIndex, is_exact_token, reciprocal_rank_fusion, tokenize
+
+CORPUS = {
+    "coupon": ("Coupon SAVE15 gives 15% off the cart total. Invalid codes show an error.", "product_specs.md"),
+    "shipping": ("Express shipping costs $10. Standard shipping is free.", "product_specs.md"),
+    "payment": ("Pay with card, PayPal or UPI. The pay-now button submits the form.", "ui_ux_guide.txt"),
+    "errors": ("Error messages are shown in red below the name and email fields.", "ui_ux_guide.txt"),
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = LexicalIndex(str(tmp_path / "lexical.json"))
+    ids = list(CORPUS)
+    idx.upsert(ids, [CORPUS[i][0] for i in ids], [{"source": CORPUS[i][1]} for i in ids], ["h-" + i for i in ids])
+    return idx
+
+
+def ranked(index, query, **kwargs):
+    return [id_ for id_, _ in index.search(tokenize(query), 10, **kwargs)]
+
+
+def test_bm25_ranks_the_document_with_the_rare_term_first(index):
+    assert ranked(index, "SAVE15 coupon") == ["coupon"]
+    assert ranked(index, "express shipping cost") == ["shipping"]
+    assert ranked(index, "error")[0] == "errors"
+
+
+def test_repeated_terms_outscore_a_single_mention(index):
+    index.upsert(["shipping-faq"], ["Shipping shipping shipping: ask about shipping."], [{}], ["h"])
+    assert ranked(index, "shipping")[0] == "shipping-faq"
+
+
+def test_search_filters_by_metadata_and_forgets_deleted_chunks(index):
+    assert ranked(index, "error", where={"source": "product_specs.md"}) == ["coupon"]
+    index.delete(where={"source": "ui_ux_guide.txt"})
+    assert ranked(index, "error") == ["coupon"]
+    assert index.stats()["chunks"] == 2
+
+
+def test_saved_index_reloads(tmp_path, index):
+    index.save()
+    reloaded = LexicalIndex(index.path)
+    assert reloaded.covers({"coupon": "h-coupon", "payment": "h-payment"})
+    assert not reloaded.covers({"coupon": "other"})
+    assert ranked(reloaded, "upi") == ["payment"]
+
+
+def test_rrf_prefers_ids_ranked_well_by_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]], k=60)
+    assert [id_ for id_, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_rrf_k_damps_the_lead_of_the_top_rank():
+    # x tops one list, y is fifth in both: a small k rewards the top spot, a large one agreement
+    rankings = [["x", "a", "b", "c", "y"], ["z", "d", "e", "f", "y"]]
+    assert reciprocal_rank_fusion(rankings, k=1)[0][0] != "y"
+    assert reciprocal_rank_fusion(rankings, k=60)[0][0] == "y"
+
+
+@pytest.mark.parametrize("word", ["SAVE15", "'SAVE15'", "TC-001", "cart-total", "pay_now", "#coupon", ".btn-add", "UPI"])
+def test_exact_tokens(word):
+    assert is_exact_token(word)
+
+
+@pytest.mark.parametrize("word", ["apply", "discount", "Express", "-", "''", "A"])
+def test_ordinary_words_are_not_exact_tokens(word):
+    assert not is_exact_token(word)
+
+
+def test_keyword_only_needs_short_prompts_of_indexed_exact_tokens(index):
+    assert index.keyword_only("SAVE15")
+    assert index.keyword_only("'SAVE15' UPI")
+    assert index.keyword_only("pay-now")
+    assert not index.keyword_only("apply discount code")
+    assert not index.keyword_only("express shipping cost")
+    assert not index.keyword_only("SAVE20")
+    assert not index.keyword_only("SAVE15 UPI PAYPAL TC-001")
+    assert not index.keyword_only("")
@@ -0,0 +1,117 @@
+# tests/test_runner.py
+
+import importlib.util
+import os
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from backend.app.llm_integration import generate_test_cases_with_llm
+from backend.app.runner import (junit_xml, run_scripts, scripts_from_test_cases, select_shard,
+                                serve_directory, shard_of)
+
+SITE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "target_site")
+
+PROMPT = "complete checkout with coupon, cart, express shipping, payment and form validation"
+
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+
+def _result(test_id, status, message="", duration=0.5, output=""):
+    return {"test_id": test_id, "status": status, "message": message, "duration": duration, "output": output}
+
+
+# ------------------------------------------------------------------
+# Sharding
+# ------------------------------------------------------------------
+
+def test_shard_of_is_stable():
+    # crc32, not hash(): the same on every run, machine and PYTHONHASHSEED
+    assert shard_of("TC-001", 4) == 1
+    assert shard_of("TC-042", 7) == 0
+    assert [shard_of(f"TC-00{i}", 2) for i in range(1, 8)] == [1, 1, 1, 0, 0, 0, 0]
+
+
+@pytest.mark.parametrize("shard_count", [1, 2, 3, 5])
+def test_select_shard_partitions_test_cases(shard_count):
+    test_cases = [{"Test_ID": f"TC-{i:03d}"} for i in range(1, 41)]
+    shards = [select_shard(test_cases, i, shard_count) for i in range(shard_count)]
+
+    # Every test case lands in exactly one shard, in its original order
+    assert sorted(tc["Test_ID"] for shard in shards for tc in shard) == [tc["Test_ID"] for tc in test_cases]
+    for shard in shards:
+        assert shard == [tc for tc in test_cases if tc in shard]
+    if shard_count > 1:
+        assert all(shards), "40 ids should reach every shard"
+
+
+def test_select_shard_repeats_identically():
+    test_cases = [{"Test_ID": f"TC-{i:03d}"} for i in range(1, 21)]
+    assert select_shard(test_cases, 1, 3) == select_shard(list(test_cases), 1, 3)
+
+
+# ------------------------------------------------------------------
+# JUnit XML
+# ------------------------------------------------------------------
+
+def test_junit_xml_shape():
+    results = [
+        _result("TC-001", "passed", output="✓ ok\n"),
+        _result("TC-002", "failed", "cart total not updated", 1.25),
+        _result("TC-003", "error", "NoSuchElementException: #pay-now"),
+        _result("TC-004", "timeout", "timed out after 60s", 60.0),
+    ]
+    suite = ET.fromstring(junit_xml(results, suite_name="suite"))
+
+    assert suite.tag == "testsuite"
+    assert suite.attrib == {"name": "suite", "tests": "4", "failures": "1", "errors": "2",
+                            "skipped": "0", "time": "62.250"}
+
+    cases = suite.findall("testcase")
+    assert [c.get("name") for c in cases] == ["TC-001", "TC-002", "TC-003", "TC-004"]
+    assert all(c.get("classname") == "suite" for c in cases)
+    assert cases[1].get("time") == "1.250"
+
+    passed, failed, error, timeout = cases
+    assert passed.find("failure") is None and passed.find("error") is None
+    assert passed.find("system-out").text == "✓ ok\n"
+    assert failed.find("failure").get("message") == "cart total not updated"
+    assert failed.find("system-out") is None
+    assert error.find("error").attrib == {"type": "error", "message": "NoSuchElementException: #pay-now"}
+    assert timeout.find("error").get("type") == "timeout"
+
+
+def test_junit_xml_empty_run():
+    suite = ET.fromstring(junit_xml([]))
+    assert suite.get("tests") == "0"
+    assert suite.findall("testcase") == []
+
+
+# ------------------------------------------------------------------
+# End to end: two generated scripts on two workers against target_site
+# ------------------------------------------------------------------
+
+def _browser_available() -> bool:
+    return (importlib.util.find_spec("selenium") is not None
+            and shutil.which("chromedriver") is not None
+            and any(shutil.which(name) for name in CHROME_BINARIES))
+
+
+@pytest.mark.skipif(not _browser_available(), reason="needs selenium, Chrome and chromedriver")
+def test_run_scripts_on_two_workers():
+    test_cases = [tc for tc in generate_test_cases_with_llm(PROMPT, "", {})
+                  if tc["Test_ID"] in ("TC-003", "TC-004")]
+    # One script per worker
+    assert {shard_of(tc["Test_ID"], 2) for tc in test_cases} == {0, 1}
+
+    scripts = scripts_from_test_cases(test_cases, target="checkout.html")
+    with serve_directory(SITE_DIR) as root:
+        results = run_scripts(scripts, root + "checkout.html", workers=2, timeout=120)
+
+    assert [r["test_id"] for r in results] == ["TC-003", "TC-004"]
+    for r in results:
+        # Ran to completion in a browser: no crash, timeout or setup error
+        assert r["status"] in ("passed", "failed"), r["message"]
+        assert r["output"]
+        assert r["duration"] > 0
@@ -0,0 +1,60 @@
+# tests/test_script_check.py
+
+import ast
+
+import pytest
+
+from backend.app.generator import create_selenium_test_files
+from backend.app.llm_integration import generate_selenium_with_html, generate_test_cases_with_llm
+from backend.app.script_check import check_script
+from backend.app.targets import get_html_structure
+
+PROMPT = "complete checkout with coupon, cart, express shipping, payment and form validation"
+
+HOSTILE = {
+    "Test_ID": 'X"); import os #\nclass Y:',
+    "Feature": 'f"""\nimport os\n"""',
+    "Test_Scenario": "a\nimport os",
+    "Expected_Result": '{x} \\ """',
+    "Steps": ['verify x"); __import__("os").system("echo PWNED"); ("', "Click {pay} now\nimport os",
+              'Apply coupon "SAVE15" \\'],
+}
+
+
+def _called(source: str):
+    return {ast.dump(node.func) for node in ast.walk(ast.parse(source)) if isinstance(node, ast.Call)}
+
+
+@pytest.mark.parametrize("structure", [get_html_structure("checkout.html"), {}])
+def test_generated_scripts_pass_the_check(structure):
+    for test_case in generate_test_cases_with_llm(PROMPT, "", {}):
+        check_script(generate_selenium_with_html(test_case, structure))
+
+
+def test_test_case_text_stays_in_literals():
+    source = generate_selenium_with_html(HOSTILE, {})
+    check_script(source)
+    assert "PWNED" in source
+    assert not any("system" in call or "__import__" in call for call in _called(source))
+
+    for name, text in create_selenium_test_files([HOSTILE]):
+        assert "/" not in name
+        compile(text, name, "exec")
+
+
+@pytest.mark.parametrize("code", [
+    "import subprocess",
+    "import os as o",
+    "from os import system",
+    '__import__("os")',
+    'os.system("x")',
+    'os.environ["A"] = "b"',
+    "x = os",
+    "self.f = open",
+    'getattr(driver, "quit")',
+    "driver.__class__",
+    "(lambda: 1)()",
+])
+def test_check_rejects_other_code(code):
+    with pytest.raises(ValueError):
+        check_script(code)
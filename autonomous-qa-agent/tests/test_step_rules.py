@@ -0,0 +1,31 @@
+# tests/test_step_rules.py
+
+from backend.app.step_rules import ALERT_PROBE_SECONDS, compile_step
+from backend.app.targets import get_html_structure
+
+
+def test_waits_use_ids_from_the_page():
+    code = compile_step("Click 'Add to Cart'", html_structure=get_html_structure("checkout.html"))
+    assert 'self.wait_for_text_change(By.ID, "cart-total", total_before)' in code
+
+
+def test_waits_fall_back_to_the_element_acted_on():
+    code = compile_step("Select credit card payment", html_structure={})
+    assert "card-fields" not in code
+    assert 'EC.element_located_to_be_selected((By.ID, "pay-card"))' in code
+
+
+def test_express_shipping_only_waits_when_the_radio_changes():
+    code = compile_step("Select express shipping", html_structure=get_html_structure("checkout.html"))
+    lines = [line.strip() for line in code.splitlines()]
+    selected = lines.index("already_express = express_radio.is_selected()")
+    assert lines[selected + 1] == "express_radio.click()"
+    assert lines[selected + 2:selected + 4] == [
+        "if not already_express:",
+        'self.wait_for_text_change(By.ID, "shipping", shipping_before)',
+    ]
+
+
+def test_coupon_alert_is_only_probed_unless_expected():
+    assert f"self.accept_alert(timeout={ALERT_PROBE_SECONDS})" in compile_step("Click Apply coupon")
+    assert "self.accept_alert()" in compile_step("Apply coupon and accept the alert")
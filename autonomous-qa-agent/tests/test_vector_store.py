@@ -0,0 +1,112 @@
+# tests/test_vector_store.py
+
+import os
+
+import numpy as np
+import pytest
+
+from backend.app.vector_store import LocalCollection
+
+
+def unit(i, dim=8):
+    v = np.zeros(dim, dtype=np.float32)
+    v[i] = 1.0
+    return v
+
+
+def collection(path, **kwargs):
+    # Flat search and no automatic compaction unless a test asks for it
+    kwargs.setdefault("hnsw_threshold", 10 ** 9)
+    kwargs.setdefault("compact_min_rows", 10 ** 9)
+    return LocalCollection(str(path), **kwargs)
+
+
+@pytest.fixture
+def store(tmp_path):
+    col = collection(tmp_path)
+    col.upsert(ids=["a", "b", "c"], embeddings=[unit(0), unit(1), unit(2)],
+               documents=["doc a", "doc b", "doc c"],
+               metadatas=[{"source": "x.md"}, {"source": "y.md"}, {"source": "x.md"}])
+    return col
+
+
+def test_query_returns_nearest_first(store):
+    result = store.query([unit(1) + 0.1 * unit(2)], n_results=2)
+    assert result["ids"] == [["b", "c"]]
+    assert result["documents"] == [["doc b", "doc c"]]
+    assert result["distances"][0][0] < result["distances"][0][1]
+
+
+def test_upsert_replaces_an_existing_id(store):
+    store.upsert(ids=["a"], embeddings=[unit(3)], documents=["doc a v2"], metadatas=[{"source": "z.md"}])
+    assert store.count() == 3
+    assert store.get(ids=["a"])["documents"] == ["doc a v2"]
+    assert store.query([unit(3)], n_results=1)["ids"] == [["a"]]
+    assert store.query([unit(0)], n_results=1)["ids"] != [["a"]]
+
+
+def test_hnsw_search_sees_upserts_and_deletes(tmp_path):
+    pytest.importorskip("hnswlib")
+    col = collection(tmp_path, hnsw_threshold=1)
+    col.upsert(ids=["a", "b"], embeddings=[unit(0), unit(1)])
+    assert col.query([unit(1)], n_results=1)["ids"] == [["b"]]
+    assert col.stats()["index"] == "hnsw"
+    col.upsert(ids=["c"], embeddings=[unit(2)])
+    col.delete(ids=["b"])
+    assert col.query([unit(1) + unit(2)], n_results=2)["ids"] == [["c", "a"]]
+
+
+def test_upsert_rejects_a_different_dimension(store):
+    with pytest.raises(ValueError):
+        store.upsert(ids=["d"], embeddings=[np.ones(4)])
+
+
+def test_delete_by_where(store):
+    store.delete(where={"source": "x.md"})
+    assert store.count() == 1
+    assert store.get()["ids"] == ["b"]
+    assert store.query([unit(0)], n_results=3)["ids"] == [["b"]]
+
+
+def test_where_filters_queries(store):
+    result = store.query([unit(1)], n_results=3, where={"source": {"$in": ["x.md"]}})
+    assert sorted(result["ids"][0]) == ["a", "c"]
+
+
+def test_reload_from_disk_keeps_the_last_write_of_each_id(tmp_path, store):
+    store.upsert(ids=["b"], embeddings=[unit(4)], documents=["doc b v2"], metadatas=[{"source": "y.md"}])
+    store.delete(ids=["c"])
+    store.close()
+
+    reopened = collection(tmp_path)
+    assert reopened.count() == 2
+    assert reopened.get()["documents"] == ["doc a", "doc b v2"]
+    assert reopened.query([unit(4)], n_results=1)["ids"] == [["b"]]
+    embedding = reopened.get(ids=["a"], include=["embeddings"])["embeddings"][0]
+    assert np.allclose(embedding, unit(0))
+
+
+def test_compaction_drops_superseded_rows_and_survives_reload(tmp_path):
+    col = collection(tmp_path, compact_min_rows=4, compact_ratio=0.5)
+    col.upsert(ids=["a", "b"], embeddings=[unit(0), unit(1)], documents=["a", "b"])
+    for version in range(3):
+        col.upsert(ids=["a"], embeddings=[unit(2 + version)], documents=[f"a{version}"])
+    col.delete(ids=["b"])
+
+    stats = col.stats()
+    assert stats["count"] == 1 and stats["rows_on_disk"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["CURRENT", "records.1.jsonl", "vectors.1.f16"]
+
+    col.upsert(ids=["c"], embeddings=[unit(7)], documents=["c"])
+    reopened = collection(tmp_path)
+    assert reopened.get()["documents"] == ["a2", "c"]
+    assert reopened.query([unit(4)], n_results=1)["ids"] == [["a"]]
+    assert reopened.query([unit(7)], n_results=1)["ids"] == [["c"]]
+
+
+def test_a_truncated_vectors_file_is_refused(tmp_path, store):
+    store.close()
+    with open(os.path.join(tmp_path, "vectors.f16"), "r+b") as f:
+        f.truncate(os.path.getsize(f.name) - 2)
+    with pytest.raises(ValueError):
+        collection(tmp_path)